@@ -1,24 +1,35 @@
+import json
+import sys
+
 import openai
 
+from design_diff import build_prompt, diff_design
+from figma_stream import find_frame
+from webextractor import extract_page
+
 openai.api_key = "your_grok_api_key"
 
-prompt = """
-Compare the following Figma design and actual website properties:
+# Usage: python Frontend_agent.py <website-url> [figma-dump] [frame-name]
+url = sys.argv[1] if len(sys.argv) > 1 else "https://yourwebsite.com"
+figma_path = sys.argv[2] if len(sys.argv) > 2 else "website.json"
+frame_name = sys.argv[3] if len(sys.argv) > 3 else None
+
+with open(figma_path, "r", encoding="utf-8") as file:
+    figma = json.load(file)
 
-Figma Button:
-- Text: "Sign Up"
-- Color: "#FF5733"
+# Compare the first matching frame against the rendered page; raises ValueError naming a missing frame
+frame = find_frame(figma, frame_name)
+report = diff_design(frame, extract_page(url, selector="body *"))
 
-Website Button:
-- Text: "Register"
-- Color: "#FF0000"
+print(f"Matched {report['matched']} elements, {len(report['mismatches'])} mismatches")
 
-Generate test cases to validate the differences.
-"""
+# Only the real mismatches are sent to the LLM
+if report["mismatches"]:
+    prompt = build_prompt(report)
 
-response = openai.ChatCompletion.create(
-    model="grok-1",
-    messages=[{"role": "system", "content": prompt}]
-)
+    response = openai.ChatCompletion.create(
+        model="grok-1",
+        messages=[{"role": "system", "content": prompt}]
+    )
 
-print(response["choices"][0]["message"]["content"])
+    print(response["choices"][0]["message"]["content"])
@@ -0,0 +1,277 @@
+"""ASGI serving mode for the test case generator.
+
+Holds many pending generations on one event loop instead of one thread each,
+and sheds load with 429 + Retry-After once the bounded queue is full. Every
+other route (``/``, downloads, ``/generate/stream``, ``/metrics``) is served
+by the Flask app in a worker thread, so results stay downloadable.
+
+Run with: uvicorn async_server:app --port 5001
+"""
+import asyncio
+import io
+import json
+import logging
+import os
+import queue as queue_module
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Tuple
+
+from metrics import HTTP_IN_FLIGHT, HTTP_REQUESTS, HTTP_SECONDS, trace_id_var
+from summary_stats import SummaryStats
+from test_case_generator import app as flask_app, generator, result_store
+
+logger = logging.getLogger(__name__)
+
+
+class GenerationQueue:
+    """Bounded admission queue in front of the LLM.
+
+    At most ``max_concurrency`` generations run at once; up to ``max_pending``
+    requests (running plus waiting) are admitted, the rest are rejected.
+    """
+
+    def __init__(self, max_concurrency: int = 32, max_pending: int = 512, retry_after: int = 5):
+        self.max_concurrency = max_concurrency
+        self.max_pending = max_pending
+        self.retry_after = retry_after
+        self.pending = 0
+        self._semaphore = None
+
+    def try_admit(self) -> bool:
+        if self.pending >= self.max_pending:
+            return False
+        self.pending += 1
+        return True
+
+    async def run(self, coro_fn, *args):
+        """Run an admitted request once a concurrency slot frees up"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        try:
+            async with self._semaphore:
+                return await coro_fn(*args)
+        finally:
+            self.pending -= 1
+
+
+queue = GenerationQueue(
+    max_concurrency=int(os.environ.get("ASYNC_MAX_CONCURRENCY", 32)),
+    max_pending=int(os.environ.get("ASYNC_MAX_PENDING", 512)),
+    retry_after=int(os.environ.get("ASYNC_RETRY_AFTER", 5))
+)
+
+
+# Body chunks buffered between the Flask worker thread and the event loop
+WSGI_BUFFER_CHUNKS = 8
+
+
+async def _read_body(receive) -> bytes:
+    body = b''
+    while True:
+        message = await receive()
+        body += message.get('body', b'')
+        if not message.get('more_body'):
+            return body
+
+
+async def _send_json(send, status: int, payload: Dict[str, Any], headers: List[Tuple[bytes, bytes]] = ()):
+    body = json.dumps(payload).encode('utf-8')
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(body)).encode()),
+            *headers
+        ]
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+def _finish_result(test_cases: Dict[str, Any]) -> Dict[str, Any]:
+    """Deduplicate, summarise and persist a generation; CPU and disk work, so run in a thread"""
+    test_cases = generator.deduplicate(test_cases)
+    stats = SummaryStats.from_test_cases(test_cases)
+    detailed_summary = generator.generate_detailed_summary(test_cases, stats)
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    return {
+        'result_id': result_store.save(test_cases, detailed_summary, timestamp, stats.to_dict()),
+        'timestamp': timestamp,
+        'test_cases': test_cases,
+        'summary': detailed_summary,
+        'stats': stats.to_dict()
+    }
+
+
+def _wsgi_environ(scope, body: bytes) -> Dict[str, Any]:
+    server = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': str(server[0]),
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False
+    }
+    for name, value in scope.get('headers', []):
+        key = name.decode('latin-1').upper().replace('-', '_')
+        if key == 'CONTENT_LENGTH':
+            continue
+        key = key if key == 'CONTENT_TYPE' else f'HTTP_{key}'
+        value = value.decode('latin-1')
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+async def _serve_flask(scope, receive, send):
+    """Serve a request with the Flask app in one worker thread, streaming its body back.
+
+    The whole response is produced in the same thread, so ``stream_with_context``
+    generators keep their request context.
+    """
+    environ = _wsgi_environ(scope, await _read_body(receive))
+    chunks = queue_module.Queue(maxsize=WSGI_BUFFER_CHUNKS)
+    abandoned = threading.Event()
+    started = {}
+
+    def start_response(status, headers, exc_info=None):
+        started['status'] = int(status.split(' ', 1)[0])
+        started['headers'] = [(key.lower().encode('latin-1'), value.encode('latin-1')) for key, value in headers]
+
+    def put(item):
+        # Give up once the client is gone instead of blocking on a full buffer
+        while not abandoned.is_set():
+            try:
+                chunks.put(item, timeout=0.5)
+                return True
+            except queue_module.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            result = flask_app.wsgi_app(environ, start_response)
+            try:
+                for chunk in result:
+                    if chunk and not put(chunk):
+                        break
+            finally:
+                if hasattr(result, 'close'):
+                    result.close()
+        except Exception as e:
+            logger.error(f"Error serving {scope['path']}: {str(e)}")
+        finally:
+            put(None)
+
+    def take():
+        while True:
+            try:
+                return chunks.get(timeout=0.5)
+            except queue_module.Empty:
+                if abandoned.is_set():
+                    return None
+
+    worker = asyncio.create_task(asyncio.to_thread(produce))
+    try:
+        chunk = await asyncio.to_thread(take)
+        if 'status' not in started:
+            return await _send_json(send, 500, {'error': 'Internal server error'})
+        await send({'type': 'http.response.start', 'status': started['status'], 'headers': started['headers']})
+        while chunk is not None:
+            await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            chunk = await asyncio.to_thread(take)
+        await send({'type': 'http.response.body', 'body': b''})
+    finally:
+        abandoned.set()
+        await worker
+
+
+async def _generate(receive, send):
+    try:
+        data = json.loads(await _read_body(receive) or b'{}')
+    except ValueError:
+        return await _send_json(send, 400, {'error': 'Request body must be JSON'})
+    if not isinstance(data, dict):
+        return await _send_json(send, 400, {'error': 'Request body must be a JSON object'})
+
+    ui_description = data.get('ui_description', '')
+    srs_description = data.get('srs_description', '')
+    if not ui_description or not srs_description:
+        return await _send_json(send, 400, {'error': 'Both UI and SRS descriptions are required'})
+
+    if not queue.try_admit():
+        logger.warning("Generation queue full, rejecting request")
+        return await _send_json(
+            send, 429, {'error': 'Too many pending generations, retry later'},
+            headers=[(b'retry-after', str(queue.retry_after).encode())]
+        )
+
+    try:
+        test_cases = await queue.run(generator.agenerate_test_cases, ui_description, srs_description)
+        result = await asyncio.to_thread(_finish_result, test_cases)
+    except Exception as e:
+        logger.error(f"Error processing request: {str(e)}")
+        return await _send_json(send, 500, {'error': str(e)})
+    await _send_json(send, 200, result)
+
+
+async def _instrumented_generate(scope, receive, send):
+    """POST /generate with the request metrics and trace ids Flask's ``instrument_app`` adds"""
+    headers = dict(scope.get('headers', []))
+    trace_id = headers.get(b'x-trace-id', b'').decode('latin-1') or None
+    trace_id_var.set(trace_id)
+    start = time.perf_counter()
+    status = {}
+
+    async def send_instrumented(message):
+        if message['type'] == 'http.response.start':
+            status['code'] = message['status']
+            HTTP_SECONDS.observe(time.perf_counter() - start, app="generator_async", endpoint="/generate")
+            if trace_id:
+                message = dict(message, headers=[*message.get('headers', []),
+                                                 (b'x-trace-id', trace_id.encode('latin-1'))])
+        await send(message)
+
+    HTTP_IN_FLIGHT.inc(app="generator_async")
+    try:
+        await _generate(receive, send_instrumented)
+    finally:
+        HTTP_IN_FLIGHT.dec(app="generator_async")
+        HTTP_REQUESTS.inc(app="generator_async", endpoint="/generate", status=status.get('code', 500))
+
+
+async def app(scope, receive, send):
+    """ASGI application: POST /generate on the event loop, every other route through Flask"""
+    if scope['type'] == 'lifespan':
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    if scope['type'] != 'http':
+        return
+
+    if scope['path'] == '/generate' and scope['method'] == 'POST':
+        return await _instrumented_generate(scope, receive, send)
+    await _serve_flask(scope, receive, send)
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(app, host='0.0.0.0', port=int(os.environ.get('PORT', 5001)))
@@ -0,0 +1,40 @@
+"""Crash-safe file writes shared by the on-disk caches and stores.
+
+Data is written to a temporary file in the same directory tree and renamed
+over the destination only once complete, so readers never see a partial
+file. The temporary file is removed if writing fails.
+"""
+import os
+import tempfile
+from contextlib import contextmanager
+from typing import Callable, Iterator, IO, Optional, Union
+
+
+@contextmanager
+def atomic_writer(path: Union[str, Callable[[], str]], directory: Optional[str] = None,
+                  mode: str = 'wb', encoding: Optional[str] = None) -> Iterator[IO]:
+    """Yield a temporary file that replaces ``path`` when the block completes.
+
+    ``path`` may be a callable evaluated after writing, for content-addressed
+    files named after what was written; pass ``directory`` for the temporary
+    file then (it must be on the same file system as the destination).
+    """
+    if directory is None:
+        directory = os.path.dirname(path) or '.'
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, mode, encoding=encoding) as fp:
+            yield fp
+        if callable(path):
+            path = path()
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def write_atomic(path: str, data: bytes, directory: Optional[str] = None):
+    """Write ``data`` to ``path`` in one atomic replace"""
+    with atomic_writer(path, directory) as fp:
+        fp.write(data)
@@ -0,0 +1,176 @@
+"""Headless bulk generation over many Figma dumps.
+
+Reads a directory of Figma JSON dumps (each paired with ``<name>.srs.txt``,
+``<name>.txt`` or ``<name>.md``, or with ``--srs``) or a manifest, generates
+test cases for every item on a bounded pool and appends one NDJSON line per
+finished item to the output file. The output doubles as the checkpoint:
+rerunning the same command skips items already written there. With
+``--retry-failed`` errored items run again and their new record is appended,
+so readers should take the last record per id.
+
+Usage:
+    python batch_generate.py designs/ -o suites.ndjson --workers 4
+    python batch_generate.py manifest.json -o suites.ndjson --mode fanout
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Dict, List, NamedTuple, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Extensions tried, in order, for the SRS file next to a Figma dump
+SRS_SUFFIXES = (".srs.txt", ".srs.md", ".txt", ".md")
+
+
+class BatchItem(NamedTuple):
+    id: str
+    figma: str
+    srs: Optional[str]
+
+
+def _read(path: str) -> str:
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def items_from_directory(directory: str, default_srs: Optional[str] = None) -> List[BatchItem]:
+    """One item per ``*.json`` dump, paired with the SRS file of the same name"""
+    items = []
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith(".json"):
+            continue
+        stem = name[:-len(".json")]
+        srs = next((os.path.join(directory, stem + suffix) for suffix in SRS_SUFFIXES
+                    if os.path.isfile(os.path.join(directory, stem + suffix))), default_srs)
+        items.append(BatchItem(stem, os.path.join(directory, name), srs))
+    return items
+
+
+def items_from_manifest(path: str, default_srs: Optional[str] = None) -> List[BatchItem]:
+    """Items from a JSON list or NDJSON of ``{"id", "figma", "srs"}``; paths are relative to the manifest"""
+    base = os.path.dirname(os.path.abspath(path))
+    text = _read(path)
+    entries = json.loads(text) if text.lstrip().startswith("[") else \
+        [json.loads(line) for line in text.splitlines() if line.strip()]
+
+    items = []
+    for entry in entries:
+        figma = os.path.join(base, entry["figma"])
+        srs = os.path.join(base, entry["srs"]) if entry.get("srs") else default_srs
+        item_id = entry.get("id") or os.path.splitext(os.path.basename(figma))[0]
+        items.append(BatchItem(item_id, figma, srs))
+    return items
+
+
+def completed_ids(output_path: str, retry_failed: bool = False) -> Set[str]:
+    """Ids already present in the output; a torn last line from a crash is ignored"""
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get("status") == "ok" or not retry_failed:
+                done.add(record["id"])
+    return done
+
+
+def generate_item(generator, item: BatchItem, mode: str = "single") -> Dict[str, Any]:
+    """Generate one item and return its output record; failures are recorded, not raised"""
+    start = time.monotonic()
+    record = {"id": item.id, "figma": item.figma, "srs": item.srs}
+    try:
+        if item.srs is None:
+            raise FileNotFoundError(f"No SRS file found for {item.figma}")
+        ui_description, srs_description = _read(item.figma), _read(item.srs)
+        if mode == "fanout":
+            test_cases = generator.generate_test_cases_fanout(ui_description, srs_description)
+        else:
+            generator.rate_limiter.acquire()
+            test_cases = generator.generate_test_cases(ui_description, srs_description)
+        record.update(status="ok", test_cases=generator.deduplicate(test_cases))
+    except Exception as e:
+        logger.error(f"Item {item.id} failed: {str(e)}")
+        record.update(status="error", error=str(e))
+    record["seconds"] = round(time.monotonic() - start, 3)
+    return record
+
+
+def run_batch(generator, items: List[BatchItem], output_path: str, workers: int = 4,
+              mode: str = "single", retry_failed: bool = False) -> Dict[str, int]:
+    """Generate every item not yet in ``output_path``, appending each record as it finishes.
+
+    At most ``workers`` items are in flight; records are flushed and fsynced
+    one by one so an interrupted run loses only the items still running.
+    """
+    done = completed_ids(output_path, retry_failed)
+    pending = [item for item in items if item.id not in done]
+    counts = {"skipped": len(items) - len(pending), "ok": 0, "error": 0}
+    logger.info(f"{len(items)} item(s), {counts['skipped']} already done")
+
+    with open(output_path, "a", encoding="utf-8") as out, \
+            ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        if out.tell() and not _ends_with_newline(output_path):
+            # Terminate a line torn by a crash so the next record starts cleanly
+            out.write("\n")
+        # Submit lazily so only ``workers`` items (and their file contents) are in memory at once
+        running = set()
+        for item in pending:
+            running.add(executor.submit(generate_item, generator, item, mode))
+            if len(running) < workers:
+                continue
+            finished, running = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                _write_record(out, future.result(), counts)
+        for future in running:
+            _write_record(out, future.result(), counts)
+    return counts
+
+
+def _ends_with_newline(path: str) -> bool:
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+
+def _write_record(out, record: Dict[str, Any], counts: Dict[str, int]):
+    out.write(json.dumps(record) + "\n")
+    out.flush()
+    os.fsync(out.fileno())
+    counts[record["status"]] += 1
+    logger.info(f"{record['id']}: {record['status']} in {record['seconds']}s")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Generate test cases for many Figma dumps.")
+    parser.add_argument("source", help="Directory of Figma JSON dumps, or a JSON/NDJSON manifest")
+    parser.add_argument("-o", "--output", required=True, help="NDJSON output, also used to resume")
+    parser.add_argument("--srs", help="SRS file used for dumps without their own")
+    parser.add_argument("--workers", type=int, default=4, help="Items generated concurrently")
+    parser.add_argument("--mode", choices=("single", "fanout"), default="single")
+    parser.add_argument("--retry-failed", action="store_true", help="Rerun items recorded with an error")
+    args = parser.parse_args(argv)
+
+    if os.path.isdir(args.source):
+        items = items_from_directory(args.source, args.srs)
+    else:
+        items = items_from_manifest(args.source, args.srs)
+
+    # Imported lazily so --help and argument errors do not build the Groq clients
+    from test_case_generator import generator
+
+    counts = run_batch(generator, items, args.output, args.workers, args.mode, args.retry_failed)
+    print(f"ok: {counts['ok']}, error: {counts['error']}, skipped: {counts['skipped']}")
+    return 1 if counts["error"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,391 @@
+"""End-to-end benchmark harness with local stubs.
+
+Every stage runs in its own subprocess so its peak RSS is measured in
+isolation. External services are replaced by local stand-ins:
+
+* a stub Figma API replaying ``website.json`` (``/files/<key>``) and
+  ``figma_response.json`` (``/files/<key>/nodes``), with optional latency;
+* a fake Groq client with configurable time-to-first-token and token rate,
+  in both blocking and streaming mode.
+
+Usage:
+    python benchmark.py                      # all stages
+    python benchmark.py --stages generate upload --requests 50 --concurrency 8
+    python benchmark.py --json results.json  # also write the raw numbers
+"""
+import argparse
+import json
+import math
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import urlparse
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+FILE_FIXTURE = os.path.join(ROOT, "website.json")
+NODES_FIXTURE = os.path.join(ROOT, "figma_response.json")
+
+STAGES = ["figma_fetch", "figma_fetch_cached", "figma_stream", "generate", "generate_stream", "upload",
+          "upload_cached"]
+
+
+# --- Stub Figma API ---------------------------------------------------------
+
+class StubFigmaServer:
+    """Local HTTP server replaying recorded Figma responses.
+
+    ``/v1/files/<key>?depth=1`` returns only the version, as the real API's
+    top level does for the cache revalidation check.
+    """
+
+    def __init__(self, file_fixture: str = FILE_FIXTURE, nodes_fixture: str = NODES_FIXTURE,
+                 latency: float = 0.0):
+        with open(file_fixture, "rb") as f:
+            self.file_body = f.read()
+        with open(nodes_fixture, "rb") as f:
+            self.nodes_body = f.read()
+        self.version = json.loads(self.file_body).get("version")
+        self.latency = latency
+        self.requests = 0
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                stub.requests += 1
+                time.sleep(stub.latency)
+                url = urlparse(self.path)
+                parts = url.path.strip("/").split("/")
+                if parts[:2] == ["v1", "files"] and len(parts) == 3:
+                    body = json.dumps({"version": stub.version}).encode() if "depth=1" in url.query \
+                        else stub.file_body
+                elif parts[:2] == ["v1", "files"] and parts[3:] == ["nodes"]:
+                    body = stub.nodes_body
+                else:
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.base_url = f"http://127.0.0.1:{self._server.server_address[1]}/v1"
+
+    def __enter__(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+# --- Fake Groq ----------------------------------------------------------------
+
+class FakeGroq:
+    """Stands in for ``Groq``: ``chat.completions.create`` answers with a fixed response.
+
+    Waits ``first_token_latency`` seconds, then produces the response at
+    ``tokens_per_second`` (four characters per token), either all at once or
+    as streamed chunks.
+    """
+
+    def __init__(self, response: str, first_token_latency: float = 0.3, tokens_per_second: float = 500,
+                 chunk_tokens: int = 4):
+        self.response = response
+        self.first_token_latency = first_token_latency
+        self.tokens_per_second = tokens_per_second
+        self.chunk_chars = chunk_tokens * 4
+        self.chat = SimpleNamespace(completions=self)
+
+    def create(self, stream: bool = False, **params):
+        time.sleep(self.first_token_latency)
+        if not stream:
+            time.sleep(len(self.response) / 4 / self.tokens_per_second)
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=self.response))])
+        return self._stream()
+
+    def _stream(self):
+        # Like the real API, the stream opens with a role-only chunk that has no content
+        yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(role="assistant", content=None))])
+        delay = self.chunk_chars / 4 / self.tokens_per_second
+        for start in range(0, len(self.response), self.chunk_chars):
+            time.sleep(delay)
+            delta = SimpleNamespace(content=self.response[start:start + self.chunk_chars])
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=delta)])
+
+
+# --- Load generation ------------------------------------------------------------
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def run_load(call: Callable[[int], Any], total: int, concurrency: int) -> Dict[str, Any]:
+    """Issue ``total`` calls from ``concurrency`` threads and summarize their latency"""
+    latencies, errors = [], []
+
+    def timed(index):
+        start = time.perf_counter()
+        try:
+            call(index)
+        except Exception as e:
+            errors.append(str(e))
+            return
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(timed, range(total)))
+    wall = time.perf_counter() - start
+
+    return {
+        "requests": total,
+        "errors": len(errors),
+        "first_error": errors[0] if errors else None,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "throughput_rps": len(latencies) / wall if wall else 0.0,
+        "wall_s": wall,
+    }
+
+
+class _ServedApp:
+    """Runs a Flask app on a free local port in a background thread"""
+
+    def __init__(self, app):
+        from werkzeug.serving import make_server
+        self._server = make_server("127.0.0.1", 0, app, threaded=True)
+        self.url = f"http://127.0.0.1:{self._server.server_port}"
+
+    def __enter__(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+
+
+# --- Stages -------------------------------------------------------------------------
+
+def _figma_env(stub: StubFigmaServer, cache_dir: str):
+    # figma_api reads these at import time, which happens inside the stage process
+    os.environ["FIGMA_API_BASE_URL"] = stub.base_url
+    os.environ["FIGMA_CACHE_DIR"] = cache_dir
+    os.environ.setdefault("FIGMA_ACCESS_TOKEN", "benchmark")
+
+
+def stage_figma_fetch(args, cached: bool) -> Dict[str, Any]:
+    with StubFigmaServer(latency=args.figma_latency) as stub, tempfile.TemporaryDirectory() as cache_dir:
+        _figma_env(stub, cache_dir)
+        import figma_api
+        if cached:
+            figma_api.fetch_figma_data("files", "website")
+        return run_load(lambda i: _check(figma_api.fetch_figma_data("files", "website", use_cache=cached)),
+                        args.requests, args.concurrency)
+
+
+def stage_figma_stream(args) -> Dict[str, Any]:
+    with StubFigmaServer(latency=args.figma_latency) as stub, tempfile.TemporaryDirectory() as cache_dir:
+        _figma_env(stub, cache_dir)
+        import figma_api
+
+        def call(index):
+            nodes, error = figma_api.stream_figma_nodes("files", "website")
+            if error:
+                raise RuntimeError(error)
+            for _ in nodes:
+                pass
+
+        return run_load(call, args.requests, args.concurrency)
+
+
+def _check(result):
+    data, error = result
+    if error:
+        raise RuntimeError(error)
+    return data
+
+
+def _generator_app(args):
+    import test_case_generator
+    from fanout import RateLimiter
+    from response_parser import sample_response
+
+    generator = test_case_generator.generator
+    generator.client = FakeGroq(sample_response(args.components, 2, 3), args.groq_latency, args.tokens_per_second)
+    # Measure generation, not the response cache or the API rate limit
+    generator.cache = None
+    generator.rate_limiter = RateLimiter(0)
+    return test_case_generator.app
+
+
+def stage_generate(args) -> Dict[str, Any]:
+    import requests
+    with open(NODES_FIXTURE, "r", encoding="utf-8") as f:
+        ui_description = f.read()
+    with _ServedApp(_generator_app(args)) as served:
+        session = requests.Session()
+
+        def call(index):
+            response = session.post(f"{served.url}/generate", json={
+                "ui_description": ui_description, "srs_description": f"Requirement set {index}"
+            })
+            response.raise_for_status()
+
+        return run_load(call, args.requests, args.concurrency)
+
+
+def stage_generate_stream(args) -> Dict[str, Any]:
+    import requests
+    with open(NODES_FIXTURE, "r", encoding="utf-8") as f:
+        ui_description = f.read()
+    first_component = []
+    with _ServedApp(_generator_app(args)) as served:
+        session = requests.Session()
+
+        def call(index):
+            start = time.perf_counter()
+            with session.post(f"{served.url}/generate/stream", stream=True, json={
+                "ui_description": ui_description, "srs_description": f"Requirement set {index}"
+            }) as response:
+                response.raise_for_status()
+                seen_component = False
+                for line in response.iter_lines():
+                    event = json.loads(line)
+                    if event["type"] == "component" and not seen_component:
+                        seen_component = True
+                        first_component.append(time.perf_counter() - start)
+                    elif event["type"] == "error":
+                        raise RuntimeError(event["error"])
+
+        result = run_load(call, args.requests, args.concurrency)
+    result["first_component_p50_ms"] = percentile(first_component, 50) * 1000
+    return result
+
+
+def stage_upload(args, cached: bool) -> Dict[str, Any]:
+    import requests
+    with tempfile.TemporaryDirectory() as workdir:
+        # test.py saves uploads relative to the working directory
+        os.chdir(workdir)
+        import test as upload_app
+        script = b"console.log('benchmark run');\n"
+        with _ServedApp(upload_app.app) as served:
+            session = requests.Session()
+
+            def call(index):
+                # Identical scripts against the same target reuse the stored result unless fresh=1 forces a run
+                response = session.post(f"{served.url}/upload",
+                                        data={"wait": "1", "target": "benchmark", "fresh": "0" if cached else "1"},
+                                        files={"file": (f"bench_{index}.js", script)})
+                response.raise_for_status()
+
+            result = run_load(call, args.requests, args.concurrency)
+        os.chdir(ROOT)
+    result["children_peak_rss_mb"] = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+    return result
+
+
+def run_stage(name: str, args) -> Dict[str, Any]:
+    stages = {
+        "figma_fetch": lambda: stage_figma_fetch(args, cached=False),
+        "figma_fetch_cached": lambda: stage_figma_fetch(args, cached=True),
+        "figma_stream": lambda: stage_figma_stream(args),
+        "generate": lambda: stage_generate(args),
+        "generate_stream": lambda: stage_generate_stream(args),
+        "upload": lambda: stage_upload(args, cached=False),
+        "upload_cached": lambda: stage_upload(args, cached=True),
+    }
+    result = stages[name]()
+    result["peak_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return result
+
+
+# --- Driver ---------------------------------------------------------------------------
+
+def _stage_argv(args) -> List[str]:
+    return [
+        "--requests", str(args.requests), "--concurrency", str(args.concurrency),
+        "--figma-latency", str(args.figma_latency), "--groq-latency", str(args.groq_latency),
+        "--tokens-per-second", str(args.tokens_per_second), "--components", str(args.components),
+    ]
+
+
+def run_isolated(name: str, args) -> Dict[str, Any]:
+    """Run one stage in a fresh interpreter and return its JSON result"""
+    with tempfile.TemporaryDirectory() as results_dir:
+        # Keep stored results and cached responses out of the working tree
+        env = dict(os.environ, RESULTS_DIR=results_dir, GENERATION_CACHE="off")
+        completed = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--run-stage", name] + _stage_argv(args),
+            cwd=ROOT, env=env, capture_output=True, text=True
+        )
+    if completed.returncode != 0:
+        return {"error": completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else "failed"}
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def print_report(results: Dict[str, Dict[str, Any]]):
+    print(f"{'stage':<20} {'reqs':>5} {'err':>4} {'p50 ms':>9} {'p99 ms':>9} {'req/s':>8} {'peak RSS MB':>12}")
+    for name, result in results.items():
+        if "error" in result:
+            print(f"{name:<20} failed: {result['error']}")
+            continue
+        print(f"{name:<20} {result['requests']:>5} {result['errors']:>4} {result['p50_ms']:>9.1f} "
+              f"{result['p99_ms']:>9.1f} {result['throughput_rps']:>8.2f} {result['peak_rss_mb']:>12.1f}")
+        if "first_component_p50_ms" in result:
+            print(f"{'':<20} first component p50: {result['first_component_p50_ms']:.1f} ms")
+        if "children_peak_rss_mb" in result:
+            print(f"{'':<20} test process peak RSS: {result['children_peak_rss_mb']:.1f} MB")
+        if result.get("first_error"):
+            print(f"{'':<20} first error: {result['first_error']}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the Figma, generation and upload paths against local stubs.")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=STAGES)
+    parser.add_argument("--requests", type=int, default=20, help="Requests per stage")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--figma-latency", type=float, default=0.0, help="Stub Figma API delay per request (s)")
+    parser.add_argument("--groq-latency", type=float, default=0.3, help="Fake Groq time to first token (s)")
+    parser.add_argument("--tokens-per-second", type=float, default=500, help="Fake Groq generation speed")
+    parser.add_argument("--components", type=int, default=4, help="Components in the fake Groq response")
+    parser.add_argument("--json", help="Also write the results to this file")
+    parser.add_argument("--run-stage", choices=STAGES, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.run_stage:
+        print(json.dumps(run_stage(args.run_stage, args)))
+        return 0
+
+    results = {}
+    for name in args.stages:
+        results[name] = run_isolated(name, args)
+    print_report(results)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    return 1 if any("error" in result or result["errors"] for result in results.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
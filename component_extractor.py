@@ -0,0 +1,170 @@
+from bisect import bisect_left
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from figma_stream import StreamedNode, document_roots, iter_nodes, walk_nodes
+
+
+class NodeRecord:
+    """Flattened view of a single Figma node"""
+    __slots__ = ('id', 'name', 'type', 'parent_id', 'depth', 'component_id',
+                 'properties', 'characters', 'bbox', 'node')
+
+    def __init__(self, node: Dict[str, Any], parent_id: Optional[str] = None, depth: int = 0,
+                 keep_node: bool = False):
+        self.id = node['id']
+        self.name = node.get('name', '')
+        self.type = node.get('type', '')
+        self.parent_id = parent_id
+        self.depth = depth
+        self.component_id = node.get('componentId')
+        # {"Property 1": {"value": "Default", "type": "VARIANT"}} -> {"Property 1": "Default"}
+        self.properties = {
+            key: prop.get('value') for key, prop in node.get('componentProperties', {}).items()
+        }
+        self.characters = node.get('characters')
+        box = node.get('absoluteBoundingBox')
+        self.bbox = (box['x'], box['y'], box['width'], box['height']) if box else None
+        # The source node, for properties that are not indexed; only kept when it lives in an
+        # already parsed document anyway, so streamed catalogs hold nothing but these fields
+        self.node = node if keep_node else None
+
+    def __repr__(self):
+        return f"NodeRecord({self.id!r}, {self.type}, {self.name!r})"
+
+
+class ComponentCatalog:
+    """In-memory index over the nodes, components and styles of a Figma file"""
+
+    def __init__(self):
+        self.nodes: Dict[str, NodeRecord] = {}
+        self.components: Dict[str, Dict[str, Any]] = {}
+        self.component_sets: Dict[str, Dict[str, Any]] = {}
+        self.styles: Dict[str, Dict[str, Any]] = {}
+        self._by_component: Dict[str, List[str]] = {}
+        self._by_type: Dict[str, List[str]] = {}
+        self._by_variant: Dict[tuple, List[str]] = {}
+        self._children: Dict[str, List[str]] = {}
+        self._names: Optional[List[tuple]] = None
+        self._roots: List[str] = []
+        # Nodes arrive children first, so every subtree is a contiguous run ending at its root
+        self._position: Dict[str, int] = {}
+        self._size: Dict[str, int] = {}
+        self._text_positions: List[int] = []
+        self._text_ids: List[str] = []
+
+    @classmethod
+    def from_document(cls, data: Dict[str, Any]) -> 'ComponentCatalog':
+        """Index an already parsed ``files`` or ``file_nodes`` response, or a single node"""
+        catalog = cls()
+        entries = [data] + [entry for entry in (data.get('nodes') or {}).values() if entry]
+        for entry in entries:
+            catalog.components.update(entry.get('components', {}))
+            catalog.component_sets.update(entry.get('componentSets', {}))
+            catalog.styles.update(entry.get('styles', {}))
+        for root in document_roots(data):
+            catalog.add_nodes(walk_nodes(root), keep_nodes=True)
+        return catalog
+
+    @classmethod
+    def from_file(cls, source) -> 'ComponentCatalog':
+        """Index a saved dump or response body by streaming its nodes.
+
+        Only the document tree is read and records carry no ``node`` dict;
+        use ``from_document`` when the ``components`` and ``styles`` metadata
+        maps or the raw nodes are needed too.
+        """
+        catalog = cls()
+        catalog.add_nodes(iter_nodes(source))
+        return catalog
+
+    def add_nodes(self, nodes: Iterable[StreamedNode], keep_nodes: bool = False):
+        """Add streamed nodes to the index; ids already indexed are skipped.
+
+        A ``file_nodes`` response repeats a subtree when one requested id lies
+        inside another, and every node of the repeat is then a duplicate.
+        """
+        for streamed in nodes:
+            if streamed.node['id'] in self.nodes:
+                continue
+            record = NodeRecord(streamed.node, streamed.parent_id, streamed.depth, keep_nodes)
+            self.nodes[record.id] = record
+            self._position[record.id] = len(self._position)
+            self._size[record.id] = 1 + sum(self._size[child] for child in self._children.get(record.id, []))
+            if record.type == 'TEXT':
+                self._text_positions.append(self._position[record.id])
+                self._text_ids.append(record.id)
+            if record.parent_id is None:
+                self._roots.append(record.id)
+            self._by_type.setdefault(record.type, []).append(record.id)
+            if record.component_id:
+                self._by_component.setdefault(record.component_id, []).append(record.id)
+            for prop, value in record.properties.items():
+                self._by_variant.setdefault((prop, value), []).append(record.id)
+            if record.parent_id is not None:
+                self._children.setdefault(record.parent_id, []).append(record.id)
+        self._names = None
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def __contains__(self, node_id):
+        return node_id in self.nodes
+
+    def get(self, node_id: str) -> Optional[NodeRecord]:
+        return self.nodes.get(node_id)
+
+    def children(self, node_id: str) -> List[NodeRecord]:
+        return [self.nodes[child] for child in self._children.get(node_id, [])]
+
+    def roots(self) -> List[NodeRecord]:
+        return [self.nodes[node_id] for node_id in self._roots]
+
+    def descendants(self, node_id: str) -> Iterator[NodeRecord]:
+        """Yield the nodes below ``node_id`` in document (pre-)order"""
+        stack = list(reversed(self._children.get(node_id, [])))
+        while stack:
+            child = stack.pop()
+            yield self.nodes[child]
+            stack.extend(reversed(self._children.get(child, [])))
+
+    def texts(self, node_id: str) -> List[NodeRecord]:
+        """TEXT nodes within a subtree, in document order, without walking it"""
+        end = self._position[node_id] + 1
+        start = end - self._size[node_id]
+        return [self.nodes[text_id] for text_id in
+                self._text_ids[bisect_left(self._text_positions, start):bisect_left(self._text_positions, end)]]
+
+    def by_type(self, node_type: str) -> List[NodeRecord]:
+        return [self.nodes[node_id] for node_id in self._by_type.get(node_type, [])]
+
+    def instances_of(self, component_id: str) -> List[NodeRecord]:
+        """Return every INSTANCE of the given component"""
+        return [self.nodes[node_id] for node_id in self._by_component.get(component_id, [])]
+
+    def component_name(self, component_id: str) -> Optional[str]:
+        """Resolve a componentId to its name, preferring the component set name"""
+        component = self.components.get(component_id)
+        if component is None:
+            record = self.nodes.get(component_id)
+            return record.name if record else None
+        component_set = self.component_sets.get(component.get('componentSetId'))
+        return component_set['name'] if component_set else component.get('name')
+
+    def component_names(self) -> Dict[str, str]:
+        """Map every known componentId to its readable name"""
+        return {component_id: self.component_name(component_id) or component_id for component_id in self.components}
+
+    def with_variant(self, prop: str, value: Any) -> List[NodeRecord]:
+        """Return nodes whose componentProperties set ``prop`` to ``value``"""
+        return [self.nodes[node_id] for node_id in self._by_variant.get((prop, value), [])]
+
+    def search(self, prefix: str) -> Iterator[NodeRecord]:
+        """Yield nodes whose name starts with ``prefix`` (case-insensitive)"""
+        if self._names is None:
+            self._names = sorted((record.name.lower(), record.id) for record in self.nodes.values())
+        prefix = prefix.lower()
+        index = bisect_left(self._names, (prefix, ''))
+        while index < len(self._names) and self._names[index][0].startswith(prefix):
+            yield self.nodes[self._names[index][1]]
+            index += 1
+
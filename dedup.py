@@ -0,0 +1,197 @@
+import hashlib
+import re
+import zlib
+from collections import defaultdict
+from typing import Any, Dict, List, NamedTuple, Tuple
+
+import numpy as np
+
+# Words per shingle when comparing test case text
+SHINGLE_SIZE = 3
+# Signature length and LSH banding (bands * rows must equal NUM_PERM)
+NUM_PERM = 64
+LSH_BANDS = 16
+
+# Hash family (a * x + b) mod p over the 32-bit shingle hashes, as used by datasketch;
+# the product wraps modulo 2**64 before the reduction
+_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_rng = np.random.RandomState(1)
+_A = _rng.randint(1, (1 << 61) - 1, size=NUM_PERM, dtype=np.uint64)
+_B = _rng.randint(0, (1 << 61) - 1, size=NUM_PERM, dtype=np.uint64)
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+class DedupReport(NamedTuple):
+    test_cases_before: int
+    test_cases_after: int
+    exact_duplicates: int
+    near_duplicates: int
+
+    @property
+    def removed(self) -> int:
+        return self.test_cases_before - self.test_cases_after
+
+
+def _words(test_case: Dict[str, Any]) -> List[str]:
+    text = f"{test_case.get('action', '')} => {test_case.get('expected_result', '')}"
+    return _WORD_RE.findall(text.lower())
+
+
+def normalized_hash(test_case: Dict[str, Any]) -> str:
+    """Hash of a test case ignoring case, punctuation and whitespace"""
+    return hashlib.sha1(" ".join(_words(test_case)).encode("utf-8")).hexdigest()
+
+
+def shingles(words: List[str], size: int = SHINGLE_SIZE) -> set:
+    if len(words) <= size:
+        return {" ".join(words)}
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def minhash_signatures(shingle_sets: List[set]) -> np.ndarray:
+    """MinHash signatures of many shingle sets, one row per set, computed in one batch"""
+    hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for shingle_set in shingle_sets for s in shingle_set),
+                         dtype=np.uint64)
+    offsets = np.cumsum([0] + [len(shingle_set) for shingle_set in shingle_sets[:-1]])
+    permuted = ((np.outer(hashes, _A) + _B) % _PRIME) & _MAX_HASH
+    return np.minimum.reduceat(permuted, offsets, axis=0)
+
+
+def jaccard(a: set, b: set) -> float:
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+
+def near_duplicate_pairs(shingle_sets: List[set], threshold: float) -> List[Tuple[int, int]]:
+    """Pairs whose Jaccard similarity reaches ``threshold``, found via MinHash LSH"""
+    if len(shingle_sets) < 2:
+        return []
+    signatures = minhash_signatures(shingle_sets)
+    rows = NUM_PERM // LSH_BANDS
+
+    candidates = set()
+    for band in range(LSH_BANDS):
+        # Rows whose band slice is byte-identical land in the same bucket
+        keys = np.ascontiguousarray(signatures[:, band * rows:(band + 1) * rows])
+        _, bucket, counts = np.unique(keys.view(np.dtype((np.void, keys.shape[1] * keys.itemsize))).ravel(),
+                                      return_inverse=True, return_counts=True)
+        shared = np.flatnonzero(counts[bucket] > 1)
+        if not len(shared):
+            continue
+        shared = shared[np.argsort(bucket[shared], kind="stable")]
+        for members in np.split(shared, np.flatnonzero(np.diff(bucket[shared])) + 1):
+            members = members.tolist()
+            for i in range(len(members)):
+                for j in range(i + 1, len(members)):
+                    candidates.add((members[i], members[j]))
+
+    # LSH only proposes pairs; confirm each one on the exact shingle sets
+    return [(i, j) for i, j in sorted(candidates) if jaccard(shingle_sets[i], shingle_sets[j]) >= threshold]
+
+
+def representative_clusters(count: int, pairs: List[Tuple[int, int]]) -> Dict[int, List[int]]:
+    """Group items around representatives, each member similar to the representative itself.
+
+    Items are taken in order; an unclaimed item becomes a representative and
+    claims every unclaimed item it is paired with. Unlike transitive closure,
+    a chain a~b~c cannot put a and c together unless they are similar too.
+    """
+    neighbours = defaultdict(list)
+    for i, j in pairs:
+        neighbours[i].append(j)
+        neighbours[j].append(i)
+
+    owner = [-1] * count
+    clusters = {}
+    for i in range(count):
+        if owner[i] != -1:
+            continue
+        owner[i] = i
+        clusters[i] = [i]
+        for j in sorted(neighbours[i]):
+            if owner[j] == -1:
+                owner[j] = i
+                clusters[i].append(j)
+    return clusters
+
+
+def _tags(sub: Dict[str, Any]) -> List[Any]:
+    return sub["tags"] if isinstance(sub["tags"], list) else [sub["tags"]]
+
+
+def priority_rank(priority: Any) -> float:
+    """Lower is more important; unknown priorities sort last"""
+    match = re.fullmatch(r"[Pp](\d+)", str(priority))
+    return int(match.group(1)) if match else float("inf")
+
+
+def deduplicate(test_cases: Dict[str, Any], threshold: float = 0.8) -> Tuple[Dict[str, Any], DedupReport]:
+    """Collapse exact and near-duplicate test cases within each component.
+
+    Only test cases of components with the same ``parent_component`` are
+    compared, so the same step on two different screens is kept twice. Each
+    cluster of duplicates keeps one test case, in the sub-component with the
+    highest priority (the earliest one on ties); that sub-component gains the
+    tags of every sub-component a duplicate was removed from. Near duplicates
+    join a cluster only if they are similar to its first member.
+    Sub-components and components left without test cases are dropped.
+    ``threshold`` is the shingle Jaccard similarity above which two test cases
+    count as the same; 1.0 collapses exact duplicates only.
+    """
+    components = test_cases["components"]
+    subs = [(component["parent_component"], sub)
+            for component in components for sub in component["sub_components"]]
+    entries = [(sub_index, case_index, case)
+               for sub_index, (_, sub) in enumerate(subs)
+               for case_index, case in enumerate(sub["test_cases"])]
+
+    # Exact duplicates share a normalized hash within their component
+    exact_groups = defaultdict(list)
+    for index, (sub_index, _, case) in enumerate(entries):
+        exact_groups[(subs[sub_index][0], normalized_hash(case))].append(index)
+    exact = len(entries) - len(exact_groups)
+
+    unique_by_component = defaultdict(list)
+    for (name, _), members in exact_groups.items():
+        unique_by_component[name].append(members)
+
+    clusters = []
+    near = 0
+    for groups in unique_by_component.values():
+        if threshold >= 1.0:
+            clusters.extend(groups)
+            continue
+        shingle_sets = [shingles(_words(entries[members[0]][2])) for members in groups]
+        for cluster in representative_clusters(len(groups), near_duplicate_pairs(shingle_sets, threshold)).values():
+            near += len(cluster) - 1
+            clusters.append([index for group in cluster for index in groups[group]])
+
+    keep = set()
+    extra_tags = defaultdict(list)
+    for members in clusters:
+        keeper = min(members, key=lambda index: (priority_rank(subs[entries[index][0]][1]["priority"]), index))
+        keep.add(keeper)
+        keeper_sub = entries[keeper][0]
+        for index in members:
+            extra_tags[keeper_sub].extend(_tags(subs[entries[index][0]][1]))
+
+    kept_cases = defaultdict(list)
+    for index in sorted(keep):
+        sub_index, _, case = entries[index]
+        kept_cases[sub_index].append(case)
+
+    result = []
+    sub_index = 0
+    for component in components:
+        kept_subs = []
+        for sub in component["sub_components"]:
+            if kept_cases[sub_index]:
+                tags = list(dict.fromkeys(_tags(sub) + extra_tags[sub_index]))
+                kept_subs.append(dict(sub, tags=tags, test_cases=kept_cases[sub_index]))
+            sub_index += 1
+        if kept_subs:
+            result.append(dict(component, sub_components=kept_subs))
+
+    report = DedupReport(len(entries), len(keep), exact, near)
+    return dict(test_cases, components=result), report
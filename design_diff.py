@@ -0,0 +1,279 @@
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from component_extractor import ComponentCatalog
+
+# Columns of the feature matrices compared between Figma and the DOM
+FEATURES = [
+    "bg_r", "bg_g", "bg_b", "fg_r", "fg_g", "fg_b",
+    "font_size", "font_weight", "width", "height", "padding_top", "padding_left"
+]
+_COL = {name: index for index, name in enumerate(FEATURES)}
+
+# Figma node types that can correspond to a rendered DOM element
+ELEMENT_TYPES = {"FRAME", "INSTANCE", "COMPONENT", "TEXT", "RECTANGLE", "GROUP"}
+
+_RGB_RE = re.compile(r"rgba?\(([^)]+)\)")
+_NUMBER_RE = re.compile(r"-?\d+(?:\.\d+)?")
+
+
+def _normalize_text(text: Optional[str]) -> str:
+    return " ".join((text or "").split()).lower()
+
+
+def _slug(name: Optional[str]) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", (name or "").lower()).strip("-")
+
+
+def _solid_color(fills: List[Dict[str, Any]]) -> Optional[Tuple[float, float, float]]:
+    """Return the first visible solid fill as 0-255 RGB"""
+    for fill in fills or []:
+        if fill.get("type") == "SOLID" and fill.get("visible", True) and fill.get("opacity", 1) > 0:
+            color = fill["color"]
+            return color["r"] * 255, color["g"] * 255, color["b"] * 255
+    return None
+
+
+def _css_color(value: Optional[str]) -> Optional[Tuple[float, float, float]]:
+    """Parse a computed ``rgb()``/``rgba()`` value, treating transparent as unset"""
+    match = _RGB_RE.match(value or "")
+    if not match:
+        return None
+    parts = [float(part) for part in _NUMBER_RE.findall(match.group(1))]
+    if len(parts) == 4 and parts[3] == 0:
+        return None
+    return tuple(parts[:3])
+
+
+def _css_px(value: Optional[str], index: int = 0) -> float:
+    numbers = _NUMBER_RE.findall(value or "")
+    return float(numbers[index]) if len(numbers) > index else np.nan
+
+
+def figma_elements(frame: Dict[str, Any], catalog: Optional[ComponentCatalog] = None) -> List[Dict[str, Any]]:
+    """Flatten a Figma frame into elements with boxes relative to the frame.
+
+    Pass the ``catalog`` of the file when one is already built; otherwise the
+    frame is indexed on its own.
+    """
+    if catalog is None or frame["id"] not in catalog:
+        catalog = ComponentCatalog.from_document(frame)
+    origin = frame.get("absoluteBoundingBox") or {"x": 0, "y": 0}
+    elements = []
+    for record in catalog.descendants(frame["id"]):
+        node = record.node
+        box = node.get("absoluteBoundingBox")
+        if record.type not in ELEMENT_TYPES or not box or node.get("visible", True) is False:
+            continue
+
+        texts = catalog.texts(record.id)
+        text_node = texts[0].node if texts else None
+        style = (text_node or {}).get("style", {})
+        features = np.full(len(FEATURES), np.nan)
+        if record.type != "TEXT":
+            features[0:3] = _solid_color(node.get("fills")) or np.nan
+        if text_node is not None:
+            features[3:6] = _solid_color(text_node.get("fills")) or np.nan
+        features[_COL["font_size"]] = style.get("fontSize", np.nan)
+        features[_COL["font_weight"]] = style.get("fontWeight", np.nan)
+        features[_COL["width"]] = box["width"]
+        features[_COL["height"]] = box["height"]
+        features[_COL["padding_top"]] = node.get("paddingTop", np.nan)
+        features[_COL["padding_left"]] = node.get("paddingLeft", np.nan)
+
+        elements.append({
+            "id": record.id,
+            "name": record.name,
+            "type": record.type,
+            "text": " ".join(text.characters or "" for text in texts),
+            "box": (box["x"] - origin["x"], box["y"] - origin["y"], box["width"], box["height"]),
+            "features": features
+        })
+    return elements
+
+
+def dom_elements(extracted: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Convert ``webextractor.extract_elements`` output into comparable elements"""
+    elements = []
+    for index, element in enumerate(extracted):
+        styles = element.get("styles", {})
+        rect = element["rect"]
+        features = np.full(len(FEATURES), np.nan)
+        features[0:3] = _css_color(styles.get("background-color")) or np.nan
+        features[3:6] = _css_color(styles.get("color")) or np.nan
+        features[_COL["font_size"]] = _css_px(styles.get("font-size"))
+        features[_COL["font_weight"]] = _css_px(styles.get("font-weight"))
+        features[_COL["width"]] = rect["width"]
+        features[_COL["height"]] = rect["height"]
+        features[_COL["padding_top"]] = _css_px(styles.get("padding-top") or styles.get("padding"))
+        features[_COL["padding_left"]] = _css_px(
+            styles.get("padding-left") or styles.get("padding"), 0 if styles.get("padding-left") else 1
+        )
+        if np.isnan(features[_COL["padding_left"]]):
+            features[_COL["padding_left"]] = features[_COL["padding_top"]]
+
+        elements.append({
+            "index": index,
+            "tag": element.get("tag"),
+            "id": element.get("id"),
+            "classes": element.get("classes", []),
+            "text": element.get("text", ""),
+            "box": (rect["x"], rect["y"], rect["width"], rect["height"]),
+            "features": features
+        })
+    return elements
+
+
+def iou_matrix(boxes_a: np.ndarray, boxes_b: np.ndarray) -> np.ndarray:
+    """Pairwise intersection-over-union of (x, y, width, height) boxes"""
+    ax1, ay1 = boxes_a[:, 0:1], boxes_a[:, 1:2]
+    ax2, ay2 = ax1 + boxes_a[:, 2:3], ay1 + boxes_a[:, 3:4]
+    bx1, by1 = boxes_b[:, 0], boxes_b[:, 1]
+    bx2, by2 = bx1 + boxes_b[:, 2], by1 + boxes_b[:, 3]
+
+    inter_w = np.clip(np.minimum(ax2, bx2) - np.maximum(ax1, bx1), 0, None)
+    inter_h = np.clip(np.minimum(ay2, by2) - np.maximum(ay1, by1), 0, None)
+    intersection = inter_w * inter_h
+    union = (boxes_a[:, 2:3] * boxes_a[:, 3:4]) + (boxes_b[:, 2] * boxes_b[:, 3]) - intersection
+    return np.divide(intersection, union, out=np.zeros_like(intersection), where=union > 0)
+
+
+def align(figma: List[Dict[str, Any]], dom: List[Dict[str, Any]], scale: float = 1.0,
+          min_score: float = 0.3) -> List[Tuple[int, int, float]]:
+    """Pair Figma and DOM elements by text, name and box overlap.
+
+    Scores are computed for all pairs at once; pairs are then taken greedily
+    from the highest score down so each element is matched at most once.
+    """
+    if not figma or not dom:
+        return []
+
+    figma_boxes = np.array([element["box"] for element in figma], dtype=float) * scale
+    dom_boxes = np.array([element["box"] for element in dom], dtype=float)
+
+    figma_text = np.array([_normalize_text(element["text"]) for element in figma])
+    dom_text = np.array([_normalize_text(element["text"]) for element in dom])
+    text_match = (figma_text[:, None] == dom_text[None, :]) & (figma_text[:, None] != "")
+
+    figma_names = np.array([_slug(element["name"]) for element in figma])
+    dom_names = np.array([_slug(element["id"] or (element["classes"] or [""])[0]) for element in dom])
+    name_match = (figma_names[:, None] == dom_names[None, :]) & (dom_names[None, :] != "")
+
+    scores = 0.5 * iou_matrix(figma_boxes, dom_boxes) + 0.3 * text_match + 0.2 * name_match
+
+    pairs = []
+    used_figma, used_dom = set(), set()
+    order = np.argsort(scores, axis=None)[::-1]
+    for flat in order:
+        i, j = np.unravel_index(flat, scores.shape)
+        score = scores[i, j]
+        if score < min_score:
+            break
+        if i in used_figma or j in used_dom:
+            continue
+        used_figma.add(i)
+        used_dom.add(j)
+        pairs.append((int(i), int(j), float(score)))
+    return pairs
+
+
+def compare(figma: List[Dict[str, Any]], dom: List[Dict[str, Any]], pairs: List[Tuple[int, int, float]],
+            scale: float = 1.0, color_tolerance: float = 12.0, size_tolerance: float = 2.0,
+            font_tolerance: float = 1.0) -> List[Dict[str, Any]]:
+    """Compare the properties of every aligned pair and return real mismatches.
+
+    Colors are compared by Euclidean RGB distance, sizes and spacing in CSS
+    pixels; properties missing on either side are skipped.
+    """
+    if not pairs:
+        return []
+
+    figma_idx = np.array([i for i, _, _ in pairs])
+    dom_idx = np.array([j for _, j, _ in pairs])
+    expected = np.stack([figma[i]["features"] for i in figma_idx])
+    actual = np.stack([dom[j]["features"] for j in dom_idx])
+
+    # Figma geometry is in design pixels; bring it to CSS pixels
+    for column in ("width", "height", "padding_top", "padding_left"):
+        expected[:, _COL[column]] *= scale
+
+    checks = {
+        "background-color": (np.linalg.norm(expected[:, 0:3] - actual[:, 0:3], axis=1), color_tolerance),
+        "color": (np.linalg.norm(expected[:, 3:6] - actual[:, 3:6], axis=1), color_tolerance),
+        "font-size": (np.abs(expected[:, _COL["font_size"]] - actual[:, _COL["font_size"]]), font_tolerance),
+        "font-weight": (np.abs(expected[:, _COL["font_weight"]] - actual[:, _COL["font_weight"]]), 50.0),
+        "width": (np.abs(expected[:, _COL["width"]] - actual[:, _COL["width"]]), size_tolerance),
+        "height": (np.abs(expected[:, _COL["height"]] - actual[:, _COL["height"]]), size_tolerance),
+        "padding-top": (np.abs(expected[:, _COL["padding_top"]] - actual[:, _COL["padding_top"]]), size_tolerance),
+        "padding-left": (np.abs(expected[:, _COL["padding_left"]] - actual[:, _COL["padding_left"]]), size_tolerance),
+    }
+    columns = {
+        "background-color": slice(0, 3), "color": slice(3, 6),
+        "font-size": _COL["font_size"], "font-weight": _COL["font_weight"],
+        "width": _COL["width"], "height": _COL["height"],
+        "padding-top": _COL["padding_top"], "padding-left": _COL["padding_left"],
+    }
+
+    mismatches = []
+    for prop, (delta, tolerance) in checks.items():
+        # NaN deltas (property missing on one side) compare False and are skipped
+        for row in np.nonzero(delta > tolerance)[0]:
+            figma_element = figma[figma_idx[row]]
+            dom_element = dom[dom_idx[row]]
+            mismatches.append({
+                "figma_id": figma_element["id"],
+                "figma_name": figma_element["name"],
+                "dom_index": dom_element["index"],
+                "dom_text": dom_element["text"],
+                "property": prop,
+                "expected": np.round(expected[row, columns[prop]], 1).tolist(),
+                "actual": np.round(actual[row, columns[prop]], 1).tolist(),
+                "delta": round(float(delta[row]), 2)
+            })
+    return mismatches
+
+
+def diff_design(frame: Dict[str, Any], extracted: List[Dict[str, Any]], scale: Optional[float] = None,
+                catalog: Optional[ComponentCatalog] = None, **tolerances: float) -> Dict[str, Any]:
+    """Align a Figma frame with extracted DOM elements and report mismatches.
+
+    ``scale`` converts design pixels to CSS pixels; by default it is the ratio
+    of the page width to the frame width.
+    """
+    figma = figma_elements(frame, catalog)
+    dom = dom_elements(extracted)
+    if scale is None:
+        frame_width = (frame.get("absoluteBoundingBox") or {}).get("width")
+        page_width = max((element["box"][0] + element["box"][2] for element in dom), default=0)
+        scale = page_width / frame_width if frame_width and page_width else 1.0
+
+    pairs = align(figma, dom, scale=scale)
+    matched_figma = {i for i, _, _ in pairs}
+    matched_dom = {j for _, j, _ in pairs}
+    return {
+        "scale": scale,
+        "matched": len(pairs),
+        "mismatches": compare(figma, dom, pairs, scale=scale, **tolerances),
+        "unmatched_figma": [figma[i]["name"] for i in range(len(figma)) if i not in matched_figma],
+        "unmatched_dom": [dom[j]["text"] for j in range(len(dom)) if j not in matched_dom]
+    }
+
+
+def build_prompt(report: Dict[str, Any], limit: int = 50) -> str:
+    """Build a compact LLM prompt covering only the detected mismatches"""
+    lines = [
+        "Compare the following Figma design and actual website properties.",
+        "Only these mismatches were detected between matched elements:",
+        ""
+    ]
+    for mismatch in report["mismatches"][:limit]:
+        lines.append(
+            f"- {mismatch['figma_name']} (website text: {mismatch['dom_text']!r}): "
+            f"{mismatch['property']} expected {mismatch['expected']}, got {mismatch['actual']}"
+        )
+    if len(report["mismatches"]) > limit:
+        lines.append(f"- ... and {len(report['mismatches']) - limit} more")
+    lines += ["", "Generate test cases to validate the differences."]
+    return "\n".join(lines)
@@ -0,0 +1,138 @@
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from component_extractor import ComponentCatalog
+from prompt_compactor import compact_nodes
+from response_parser import validate_component
+
+logger = logging.getLogger(__name__)
+
+# Node types that only group screens and are descended through when splitting
+CONTAINER_TYPES = {"DOCUMENT", "CANVAS", "SECTION"}
+# Node types worth generating test cases for on their own
+CHUNK_TYPES = {"FRAME", "INSTANCE", "COMPONENT", "COMPONENT_SET", "GROUP"}
+
+
+class RateLimiter:
+    """Spaces calls evenly so at most ``per_minute`` start in any minute"""
+
+    def __init__(self, per_minute: float):
+        self.interval = 60.0 / per_minute if per_minute else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if wait > 0:
+            time.sleep(wait)
+
+
+def top_level_nodes(catalog: ComponentCatalog) -> List[Dict[str, Any]]:
+    """Return the top-level FRAME/INSTANCE nodes that are generated separately"""
+    chunks = []
+    stack = list(reversed(catalog.roots()))
+    while stack:
+        record = stack.pop()
+        if record.type in CONTAINER_TYPES:
+            stack.extend(reversed(catalog.children(record.id)))
+        elif record.type in CHUNK_TYPES:
+            chunks.append(record)
+
+    # A single selected frame is split into its own frames and instances
+    if len(chunks) == 1:
+        children = [child for child in catalog.children(chunks[0].id) if child.type in CHUNK_TYPES]
+        if len(children) > 1:
+            chunks = children
+    return [record.node for record in chunks]
+
+
+def describe_node(node: Dict[str, Any], names: Optional[Dict[str, str]] = None) -> str:
+    """Render one Figma subtree as a compact UI description for the prompt"""
+    return compact_nodes([node], names)
+
+
+def split_ui_description(ui_description: str) -> List[str]:
+    """Split a UI description into independently generated chunks.
+
+    Figma JSON (a ``files``/``file_nodes`` response or a single node) is split
+    per top-level FRAME/INSTANCE; plain text is split on blank lines.
+    """
+    try:
+        data = json.loads(ui_description)
+    except ValueError:
+        data = None
+
+    if isinstance(data, dict):
+        catalog = ComponentCatalog.from_document(data)
+        nodes = top_level_nodes(catalog)
+        if nodes:
+            names = catalog.component_names()
+            return [describe_node(node, names) for node in nodes]
+        return [ui_description]
+
+    paragraphs = [part.strip() for part in ui_description.split("\n\n") if part.strip()]
+    return paragraphs or [ui_description]
+
+
+def merge_components(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Merge several ``{"components": [...]}`` results, joining same-named components"""
+    merged: Dict[str, Dict[str, Any]] = {}
+    for result in results:
+        for component in result["components"]:
+            name = component["parent_component"]
+            if name in merged:
+                merged[name]["sub_components"].extend(component["sub_components"])
+            else:
+                merged[name] = {
+                    "parent_component": name,
+                    "sub_components": list(component["sub_components"])
+                }
+    return {"components": list(merged.values())}
+
+
+def run_chunks(generator, chunks: List[str], srs_description: str, max_workers: int = 4,
+               rate_limiter: Optional[RateLimiter] = None) -> List[Optional[Dict[str, Any]]]:
+    """Generate every chunk on a bounded pool; failed chunks come back as None"""
+    def run(chunk):
+        if rate_limiter is not None:
+            rate_limiter.acquire()
+        return generator.generate_test_cases(chunk, srs_description)
+
+    results = []
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(chunks)))) as executor:
+        futures = [executor.submit(run, chunk) for chunk in chunks]
+        for index, future in enumerate(futures):
+            try:
+                results.append(future.result())
+            except Exception as e:
+                logger.error(f"Chunk {index} failed: {str(e)}")
+                results.append(None)
+    return results
+
+
+def generate_fanout(generator, ui_description: str, srs_description: str,
+                    max_workers: int = 4, rate_limiter: Optional[RateLimiter] = None) -> Dict[str, Any]:
+    """Generate test cases for each UI chunk concurrently and merge the results.
+
+    Chunks that fail are logged and skipped; an error is raised only if every
+    chunk fails.
+    """
+    chunks = split_ui_description(ui_description)
+    logger.info(f"Fanning out generation over {len(chunks)} chunk(s)")
+
+    results = [result for result in run_chunks(generator, chunks, srs_description, max_workers, rate_limiter)
+               if result is not None]
+    if not results:
+        raise RuntimeError("Test case generation failed for every chunk")
+
+    merged = merge_components(results)
+    if not all(map(validate_component, merged["components"])):
+        raise ValueError("Invalid component structure")
+    return merged
@@ -1,7 +1,15 @@
+import json
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 import requests
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+
+from figma_cache import FigmaCache
+from figma_stream import iter_nodes
+from metrics import CACHE_REQUESTS, span
 
 # Load environment variables from .env file
 load_dotenv()
@@ -9,46 +17,286 @@ load_dotenv()
 # Get Figma token from .env
 FIGMA_ACCESS_TOKEN = os.getenv("FIGMA_ACCESS_TOKEN")
 # print(FIGMA_ACCESS_TOKEN)
-def fetch_figma_data(endpoint_type, param, query_params=None):
-    """Fetch data from the Figma API."""
-    
-    # Define base URL
-    base_url = "https://api.figma.com/v1"
-
-    # Map endpoint types to actual Figma API endpoints
-    endpoint_map = {
-        "files": f"/files/{param}",
-        "images": f"/images/{param}",
-        "projects": f"/projects/{param}",
-        "team_projects": f"/teams/{param}/projects",
-        "components": f"/components/{param}",
-        "component_sets": f"/component_sets/{param}",
-        "styles": f"/styles/{param}",
-        "comments": f"/files/{param}/comments",
-        "user_me": "/me",
-        "file_nodes": f"/files/{param}/nodes",
-        "team_components": f"/teams/{param}/components",
-        "team_styles": f"/teams/{param}/styles"
-    }
-
-    # Get the specific endpoint
-    endpoint = endpoint_map.get(endpoint_type)
+# Define base URL (overridable to point at a local stub server)
+BASE_URL = os.getenv("FIGMA_API_BASE_URL", "https://api.figma.com/v1")
+
+# Map endpoint types to actual Figma API endpoints
+ENDPOINT_MAP = {
+    "files": "/files/{param}",
+    "images": "/images/{param}",
+    "projects": "/projects/{param}",
+    "team_projects": "/teams/{param}/projects",
+    "components": "/components/{param}",
+    "component_sets": "/component_sets/{param}",
+    "styles": "/styles/{param}",
+    "comments": "/files/{param}/comments",
+    "user_me": "/me",
+    "file_nodes": "/files/{param}/nodes",
+    "team_components": "/teams/{param}/components",
+    "team_styles": "/teams/{param}/styles"
+}
+
+# Endpoints whose responses carry a file "version" and can be revalidated
+CACHEABLE_ENDPOINTS = {"files", "file_nodes"}
+
+# Seconds a cached response is trusted before its version is re-checked
+REVALIDATE_AFTER = int(os.getenv("FIGMA_CACHE_REVALIDATE_AFTER", "60"))
+
+# Status codes worth retrying with backoff
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+_cache = None
+_client = None
+
 
+def get_cache():
+    """Return the shared on-disk response cache, creating it on first use."""
+    global _cache
+    if _cache is None:
+        _cache = FigmaCache()
+    return _cache
+
+
+def get_client():
+    """Return the shared pooled Figma client, creating it on first use."""
+    global _client
+    if _client is None:
+        _client = FigmaClient()
+    return _client
+
+
+def build_url(endpoint_type, param, base_url=None):
+    """Return the Figma API URL for an endpoint type, or None if unknown."""
+    endpoint = ENDPOINT_MAP.get(endpoint_type)
     if not endpoint:
+        return None
+    return f"{base_url or BASE_URL}{endpoint.format(param=param)}"
+
+
+def _error(response):
+    return f"Error: {response.status_code} - {response.text}"
+
+
+def _invalid_json(response):
+    # A proxy or captive portal can answer 200 with an HTML page
+    return f"Error: {response.status_code} response is not valid JSON - {response.text[:200]}"
+
+
+class FigmaClient:
+    """Figma API client with keep-alive pooling, retries and batched id fetches."""
+
+    def __init__(self, token=None, base_url=None, max_workers=8, timeout=30,
+                 max_retries=4, backoff=0.5, batch_size=50):
+        self.base_url = base_url or BASE_URL
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.batch_size = batch_size
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers["X-Figma-Token"] = f"{token or FIGMA_ACCESS_TOKEN}"
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _retry_delay(self, attempt, response=None):
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after:
+            try:
+                return float(retry_after)
+            except ValueError:
+                pass
+        return self.backoff * (2 ** attempt)
+
+    def request(self, endpoint_type, param, query_params=None, stream=False):
+        """GET an endpoint, retrying 429/5xx responses and connection errors.
+
+        Raises ValueError for an unknown endpoint type. The last response is
+        returned even if it is still an error after all retries.
+        """
+        url = build_url(endpoint_type, param, self.base_url)
+        if not url:
+            raise ValueError("Invalid endpoint type")
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self.session.get(url, params=query_params, timeout=self.timeout, stream=stream)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == self.max_retries:
+                    raise
+                time.sleep(self._retry_delay(attempt))
+                continue
+
+            if response.status_code not in RETRY_STATUSES or attempt == self.max_retries:
+                return response
+            delay = self._retry_delay(attempt, response)
+            response.close()
+            time.sleep(delay)
+
+    def get(self, endpoint_type, param, query_params=None):
+        """Fetch an endpoint and return (data, error) like fetch_figma_data."""
+        try:
+            response = self.request(endpoint_type, param, query_params)
+        except ValueError as e:
+            return None, str(e)
+        except requests.RequestException as e:
+            return None, f"Error: {e}"
+        if response.status_code == 200:
+            try:
+                return response.json(), None
+            except ValueError:
+                return None, _invalid_json(response)
+        return None, _error(response)
+
+    def get_many(self, requests_list):
+        """Run several (endpoint_type, param, query_params) fetches concurrently."""
+        futures = [self._executor.submit(self.get, *args) for args in requests_list]
+        return [future.result() for future in futures]
+
+    def _fetch_batched(self, endpoint_type, file_key, ids, result_key, query_params=None):
+        ids = list(dict.fromkeys(ids))
+        batches = [ids[i:i + self.batch_size] for i in range(0, len(ids), self.batch_size)]
+        results = self.get_many([
+            (endpoint_type, file_key, dict(query_params or {}, ids=",".join(batch)))
+            for batch in batches
+        ])
+
+        merged = None
+        for data, error in results:
+            if error:
+                return None, error
+            if merged is None:
+                merged = dict(data, **{result_key: dict(data.get(result_key) or {})})
+            else:
+                merged[result_key].update(data.get(result_key) or {})
+        return merged or {result_key: {}}, None
+
+    def fetch_nodes(self, file_key, ids, query_params=None):
+        """Fetch many nodes of a file in batched ``ids=`` calls and merge them."""
+        return self._fetch_batched("file_nodes", file_key, ids, "nodes", query_params)
+
+    def fetch_images(self, file_key, ids, query_params=None):
+        """Request renders for many nodes in batched ``ids=`` calls and merge them."""
+        return self._fetch_batched("images", file_key, ids, "images", query_params)
+
+    def current_version(self, file_key):
+        """Fetch only the top level of a file to read its current version."""
+        data, error = self.get("files", file_key, {"depth": 1})
+        return None if error else data.get("version")
+
+
+def fetch_figma_data(endpoint_type, param, query_params=None, use_cache=True):
+    """Fetch data from the Figma API.
+
+    "files" and "file_nodes" responses are cached on disk. A cached response
+    is returned without downloading again while the file version is unchanged.
+    """
+    with span("figma_fetch"):
+        return _fetch_figma_data(endpoint_type, param, query_params, use_cache)
+
+
+def _current_meta(client, cache, key, param):
+    """Meta of a cached response still matching the file's version, or None.
+
+    The version is re-checked at most once per REVALIDATE_AFTER seconds.
+    """
+    meta = cache.get_meta(key)
+    if meta is None:
+        return None
+    if time.time() - meta.get("checked_at", 0) < REVALIDATE_AFTER:
+        return meta
+    if client.current_version(param) == meta.get("version"):
+        cache.update_meta(key, meta)
+        return meta
+    return None
+
+
+def cached_version(endpoint_type, param, query_params=None):
+    """Version of the cached "files"/"file_nodes" response if it is still current, else None.
+
+    Shares the revalidation of fetch_figma_data, so callers keying their own
+    caches by version add no extra API calls.
+    """
+    if endpoint_type not in CACHEABLE_ENDPOINTS:
+        return None
+    meta = _current_meta(get_client(), get_cache(), FigmaCache.make_key(endpoint_type, param, query_params), param)
+    return meta.get("version") if meta else None
+
+
+def _fetch_figma_data(endpoint_type, param, query_params, use_cache):
+    url = build_url(endpoint_type, param)
+
+    if not url:
         return None, "Invalid endpoint type"
 
-    url = f"{base_url}{endpoint}"
-    
-    # Set headers
-    headers = {
-        "X-Figma-Token": f"{FIGMA_ACCESS_TOKEN}"
-    }
+    client = get_client()
+    cache = get_cache() if use_cache and endpoint_type in CACHEABLE_ENDPOINTS else None
+    if cache:
+        key = FigmaCache.make_key(endpoint_type, param, query_params)
+        cached = cache.get(key) if _current_meta(client, cache, key, param) else None
+        if cached:
+            CACHE_REQUESTS.inc(cache="figma", result="hit")
+            return json.loads(cached[0]), None
+        CACHE_REQUESTS.inc(cache="figma", result="miss")
 
     # Make API request
-    response = requests.get(url, headers=headers, params=query_params)
+    try:
+        response = client.request(endpoint_type, param, query_params)
+    except requests.RequestException as e:
+        return None, f"Error: {e}"
 
     # Return response or error
     if response.status_code == 200:
-        return response.json(), None
+        try:
+            data = response.json()
+        except ValueError:
+            return None, _invalid_json(response)
+        if cache and data.get("version"):
+            cache.put(key, response.content, {
+                "endpoint_type": endpoint_type,
+                "param": param,
+                "version": data["version"],
+                "lastModified": data.get("lastModified")
+            })
+        return data, None
     else:
-        return None, f"Error: {response.status_code} - {response.text}"
\ No newline at end of file
+        return None, _error(response)
+
+
+def stream_figma_nodes(endpoint_type, param, query_params=None, types=None):
+    """Stream the document nodes of a "files" or "file_nodes" response.
+
+    Returns a generator of StreamedNode tuples that parses the body as it
+    downloads, so the full response is never held in memory.
+    """
+    if endpoint_type not in ("files", "file_nodes"):
+        return None, "Only files and file_nodes responses contain document nodes"
+
+    try:
+        response = get_client().request(endpoint_type, param, query_params, stream=True)
+    except requests.RequestException as e:
+        return None, f"Error: {e}"
+
+    if response.status_code != 200:
+        return None, _error(response)
+
+    # Let urllib3 undo gzip transfer encoding while we read the raw body
+    response.raw.decode_content = True
+
+    def _walk():
+        with response:
+            yield from iter_nodes(response.raw, types=types)
+
+    return _walk(), None
@@ -0,0 +1,96 @@
+import hashlib
+import json
+import os
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from atomic_file import write_atomic
+
+# Cache location and size budget, overridable from .env
+CACHE_DIR = os.getenv("FIGMA_CACHE_DIR", ".figma_cache")
+CACHE_MAX_BYTES = int(os.getenv("FIGMA_CACHE_MAX_MB", "512")) * 1024 * 1024
+
+
+class FigmaCache:
+    """Size-capped on-disk LRU cache for raw Figma API response bodies.
+
+    Entries are stored as ``<key>.json`` (the body exactly as downloaded) next
+    to a ``<key>.meta.json`` sidecar holding the file version and the time it
+    was last validated. The body's mtime doubles as the LRU access time.
+    """
+
+    def __init__(self, directory: str = CACHE_DIR, max_bytes: int = CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def make_key(endpoint_type: str, param: str, query_params: Optional[Dict[str, Any]] = None) -> str:
+        """Hash the request identity into a stable cache key"""
+        identity = json.dumps(
+            [endpoint_type, param, sorted((query_params or {}).items())],
+            default=str
+        )
+        return hashlib.sha256(identity.encode('utf-8')).hexdigest()
+
+    def _paths(self, key: str) -> Tuple[str, str]:
+        base = os.path.join(self.directory, key)
+        return f"{base}.json", f"{base}.meta.json"
+
+    def get_meta(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the sidecar of a cached entry without reading its body, or None on a miss"""
+        body_path, meta_path = self._paths(key)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as fp:
+                meta = json.load(fp)
+        except (OSError, ValueError):
+            return None
+        return meta if os.path.exists(body_path) else None
+
+    def get(self, key: str) -> Optional[Tuple[bytes, Dict[str, Any]]]:
+        """Return ``(body, meta)`` for a cached entry, or None on a miss"""
+        body_path, meta_path = self._paths(key)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as fp:
+                meta = json.load(fp)
+            with open(body_path, 'rb') as fp:
+                body = fp.read()
+        except (OSError, ValueError):
+            return None
+        os.utime(body_path)
+        return body, meta
+
+    def put(self, key: str, body: bytes, meta: Dict[str, Any]):
+        """Store a response body and evict old entries beyond the size budget"""
+        body_path, _ = self._paths(key)
+        write_atomic(body_path, body)
+        self.update_meta(key, dict(meta, size=len(body)))
+        self.evict()
+
+    def update_meta(self, key: str, meta: Dict[str, Any]):
+        _, meta_path = self._paths(key)
+        write_atomic(meta_path, json.dumps(dict(meta, checked_at=time.time())).encode('utf-8'))
+
+    def evict(self):
+        """Drop least recently used entries until the cache fits ``max_bytes``"""
+        entries = []
+        total = 0
+        for name in os.listdir(self.directory):
+            if not name.endswith('.json') or name.endswith('.meta.json'):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name[:-len('.json')]))
+            total += stat.st_size
+
+        for _, size, key in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            for path in self._paths(key):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            total -= size
@@ -0,0 +1,148 @@
+import hashlib
+import json
+import logging
+import sys
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+from component_extractor import ComponentCatalog
+from fanout import RateLimiter, describe_node, merge_components, run_chunks, top_level_nodes
+from figma_stream import iter_nodes
+from response_parser import validate_component
+
+logger = logging.getLogger(__name__)
+
+
+class FigmaDiff(NamedTuple):
+    """Node ids that differ between two versions of a Figma file"""
+    added: Set[str]
+    removed: Set[str]
+    changed: Set[str]
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.changed)
+
+
+def node_hash(node: Dict[str, Any]) -> str:
+    """Hash a node's own properties, ignoring its children"""
+    own = {key: value for key, value in node.items() if key != 'children'}
+    return hashlib.sha1(json.dumps(own, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def index_tree(source) -> Dict[str, Tuple[Optional[str], str]]:
+    """Map node id -> (parent id, property hash) for a catalog, parsed dump, path, payload or stream"""
+    if isinstance(source, dict):
+        source = ComponentCatalog.from_document(source)
+    if isinstance(source, ComponentCatalog):
+        if any(record.node is None for record in source.nodes.values()):
+            raise ValueError("index_tree needs a catalog built with ComponentCatalog.from_document")
+        return {record.id: (record.parent_id, node_hash(record.node)) for record in source.nodes.values()}
+    return {
+        streamed.node['id']: (streamed.parent_id, node_hash(streamed.node))
+        for streamed in iter_nodes(source)
+    }
+
+
+def diff_trees(old, new) -> FigmaDiff:
+    """Compare two Figma versions (paths, payloads or streams) node by node"""
+    return diff_indexes(index_tree(old), index_tree(new))
+
+
+def diff_indexes(old_index, new_index) -> FigmaDiff:
+    """Compare two ``index_tree`` results.
+
+    A node counts as changed when its own properties or its parent differ;
+    changes to descendants are reported on the descendants themselves.
+    """
+    added = set(new_index) - set(old_index)
+    removed = set(old_index) - set(new_index)
+    changed = {
+        node_id for node_id in set(old_index) & set(new_index)
+        if old_index[node_id] != new_index[node_id]
+    }
+    return FigmaDiff(added, removed, changed)
+
+
+def _ancestors(node_id: str, index: Dict[str, Tuple[Optional[str], str]]) -> Iterator[str]:
+    while node_id is not None and node_id in index:
+        yield node_id
+        node_id = index[node_id][0]
+
+
+def affected_chunks(old_index, new_index, diff: FigmaDiff, chunk_ids: Set[str]) -> Set[str]:
+    """Return the top-level chunks containing any added, removed or changed node"""
+    affected = set()
+    for node_id in diff.added | diff.changed:
+        affected.update(chunk_ids.intersection(_ancestors(node_id, new_index)))
+    for node_id in diff.removed | diff.changed:
+        affected.update(chunk_ids.intersection(_ancestors(node_id, old_index)))
+    return affected
+
+
+def generate_incremental(generator, old_doc: Dict[str, Any], new_doc: Dict[str, Any], srs_description: str,
+                         previous: Optional[Dict[str, Any]] = None, max_workers: int = 4,
+                         rate_limiter: Optional[RateLimiter] = None) -> Dict[str, Any]:
+    """Regenerate only the top-level components touched since ``old_doc``.
+
+    ``previous`` is an earlier result of this function for ``old_doc``; its
+    per-chunk components are reused for every chunk the diff did not touch.
+    The returned result carries ``chunks`` (node id -> components) so it can
+    serve as ``previous`` for the next version.
+    """
+    # The new version is indexed once for the diff, the chunks and the component names
+    catalog = ComponentCatalog.from_document(new_doc)
+    old_index = index_tree(old_doc)
+    new_index = index_tree(catalog)
+    diff = diff_indexes(old_index, new_index)
+
+    chunks = top_level_nodes(catalog)
+    chunk_ids = {chunk['id'] for chunk in chunks}
+    previous_chunks = (previous or {}).get('chunks', {})
+    affected = affected_chunks(old_index, new_index, diff, chunk_ids)
+    stale = [chunk for chunk in chunks if chunk['id'] in affected or chunk['id'] not in previous_chunks]
+    logger.info(f"{len(diff.added)} added, {len(diff.removed)} removed, {len(diff.changed)} changed nodes; "
+                f"regenerating {len(stale)} of {len(chunks)} component(s)")
+
+    names = catalog.component_names()
+    results = run_chunks(generator, [describe_node(chunk, names) for chunk in stale], srs_description,
+                         max_workers, rate_limiter)
+
+    chunk_components = {}
+    for chunk in chunks:
+        if chunk['id'] in previous_chunks and chunk['id'] not in affected:
+            chunk_components[chunk['id']] = previous_chunks[chunk['id']]
+    for chunk, result in zip(stale, results):
+        if result is not None:
+            chunk_components[chunk['id']] = result['components']
+        elif chunk['id'] in previous_chunks:
+            # Keep the last good components rather than dropping the chunk
+            logger.warning(f"Reusing stale components for {chunk['id']} after a failed regeneration")
+            chunk_components[chunk['id']] = previous_chunks[chunk['id']]
+
+    if stale and not chunk_components:
+        # Same contract as generate_fanout: nothing generated and nothing to fall back on
+        raise RuntimeError("Test case generation failed for every chunk")
+
+    merged = merge_components([{'components': chunk_components[chunk['id']]}
+                               for chunk in chunks if chunk['id'] in chunk_components])
+    if not all(map(validate_component, merged['components'])):
+        raise ValueError("Invalid component structure")
+    merged['chunks'] = chunk_components
+    merged['version'] = new_doc.get('version')
+    merged['regenerated'] = [chunk['id'] for chunk in stale]
+    return merged
+
+
+def main(argv: List[str]):
+    if len(argv) != 2:
+        print("Usage: python figma_diff.py OLD_DUMP.json NEW_DUMP.json")
+        return 1
+    diff = diff_trees(argv[0], argv[1])
+    for label, ids in (('added', diff.added), ('removed', diff.removed), ('changed', diff.changed)):
+        print(f"{label}: {len(ids)}")
+        for node_id in sorted(ids):
+            print(f"  {node_id}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
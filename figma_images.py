@@ -0,0 +1,175 @@
+"""Export rendered Figma frames to a local, content-addressed asset cache.
+
+Renders are requested through the ``images`` endpoint in batches, the
+returned URLs are downloaded concurrently straight to disk, and every file
+is stored once under its SHA-256. A small ref file maps (file key, node id,
+version, format, scale) to that hash, so re-running a comparison against an
+unchanged version neither re-renders nor re-downloads anything.
+"""
+import hashlib
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, NamedTuple, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from atomic_file import atomic_writer, write_atomic
+from figma_api import get_client
+
+# Asset cache location, overridable from .env
+IMAGE_CACHE_DIR = os.getenv("FIGMA_IMAGE_CACHE_DIR", ".figma_images")
+# Concurrent downloads of rendered images
+DOWNLOAD_WORKERS = int(os.getenv("FIGMA_IMAGE_DOWNLOAD_WORKERS", "8"))
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+
+class ExportResult(NamedTuple):
+    paths: Dict[str, str]
+    errors: Dict[str, str]
+    cached: int
+    downloaded: int
+
+
+class ImageCache:
+    """Content-addressed store of rendered images.
+
+    Files live in ``blobs/<sha[:2]>/<sha>.<format>``; ``refs/<key>.json``
+    records which blob holds the render of a node at a given version.
+    Identical renders across versions or nodes share one blob.
+    """
+
+    def __init__(self, directory: str = IMAGE_CACHE_DIR):
+        self.directory = directory
+        os.makedirs(os.path.join(directory, "refs"), exist_ok=True)
+        os.makedirs(os.path.join(directory, "blobs"), exist_ok=True)
+
+    @staticmethod
+    def make_key(file_key: str, node_id: str, version: str, fmt: str, scale: float) -> str:
+        identity = json.dumps([file_key, node_id, version, fmt, scale])
+        return hashlib.sha256(identity.encode('utf-8')).hexdigest()
+
+    def _ref_path(self, key: str) -> str:
+        return os.path.join(self.directory, "refs", f"{key}.json")
+
+    def blob_path(self, digest: str, fmt: str) -> str:
+        return os.path.join(self.directory, "blobs", digest[:2], f"{digest}.{fmt}")
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the local path of a cached render, or None on a miss"""
+        try:
+            with open(self._ref_path(key), 'r', encoding='utf-8') as fp:
+                ref = json.load(fp)
+        except (OSError, ValueError):
+            return None
+        path = self.blob_path(ref["sha256"], ref["format"])
+        return path if os.path.exists(path) else None
+
+    def put_stream(self, key: str, chunks, fmt: str, meta: Dict[str, str]) -> str:
+        """Write chunks to disk while hashing them, then file the blob under its digest"""
+        digest = hashlib.sha256()
+
+        def blob_path():
+            path = self.blob_path(digest.hexdigest(), fmt)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            return path
+
+        with atomic_writer(blob_path, directory=self.directory) as fp:
+            for chunk in chunks:
+                digest.update(chunk)
+                fp.write(chunk)
+        path = self.blob_path(digest.hexdigest(), fmt)
+
+        ref = dict(meta, sha256=digest.hexdigest(), format=fmt)
+        write_atomic(self._ref_path(key), json.dumps(ref).encode('utf-8'))
+        return path
+
+
+def _download_session(workers: int) -> requests.Session:
+    # Render URLs point at S3, so this session carries no Figma token
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=workers)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def export_images(file_key: str, node_ids: List[str], fmt: str = "png", scale: float = 1,
+                  version: Optional[str] = None, client=None, cache: Optional[ImageCache] = None,
+                  workers: int = DOWNLOAD_WORKERS, timeout: int = 60) -> ExportResult:
+    """Render and download ``node_ids`` of a file, reusing cached renders.
+
+    ``version`` defaults to the file's current version. Only nodes without a
+    cached render for that version are sent to the ``images`` endpoint (in
+    the client's batches), and their URLs are downloaded on a pool of
+    ``workers`` connections. Failures are reported per node in ``errors``.
+    """
+    client = client or get_client()
+    cache = cache or ImageCache()
+    version = version or client.current_version(file_key)
+    if version is None:
+        return ExportResult({}, {node_id: "Could not read the file version" for node_id in node_ids}, 0, 0)
+
+    paths, errors = {}, {}
+    keys = {node_id: ImageCache.make_key(file_key, node_id, version, fmt, scale)
+            for node_id in dict.fromkeys(node_ids)}
+    for node_id, key in keys.items():
+        path = cache.get(key)
+        if path:
+            paths[node_id] = path
+    cached = len(paths)
+
+    missing = [node_id for node_id in keys if node_id not in paths]
+    if not missing:
+        return ExportResult(paths, errors, cached, 0)
+
+    data, error = client.fetch_images(file_key, missing, {"format": fmt, "scale": scale, "version": version})
+    if error:
+        errors.update({node_id: error for node_id in missing})
+        return ExportResult(paths, errors, cached, 0)
+    urls = data.get("images") or {}
+
+    def download(node_id):
+        with session.get(urls[node_id], stream=True, timeout=timeout) as response:
+            response.raise_for_status()
+            return cache.put_stream(keys[node_id], response.iter_content(DOWNLOAD_CHUNK_SIZE), fmt, {
+                "file_key": file_key, "node_id": node_id, "version": version, "scale": str(scale)
+            })
+
+    to_download = []
+    for node_id in missing:
+        if urls.get(node_id):
+            to_download.append(node_id)
+        else:
+            # Figma returns null for nodes that could not be rendered
+            errors[node_id] = "Figma returned no render for this node"
+
+    with _download_session(workers) as session, \
+            ThreadPoolExecutor(max_workers=max(1, min(workers, len(to_download) or 1))) as executor:
+        futures = {node_id: executor.submit(download, node_id) for node_id in to_download}
+        for node_id, future in futures.items():
+            try:
+                paths[node_id] = future.result()
+            except (requests.RequestException, OSError) as e:
+                errors[node_id] = f"Error: {e}"
+
+    return ExportResult(paths, errors, cached, len(paths) - cached)
+
+
+def main(argv: List[str]):
+    if len(argv) < 2:
+        print("Usage: python figma_images.py FILE_KEY NODE_ID [NODE_ID ...]")
+        return 1
+    result = export_images(argv[0], argv[1:])
+    print(f"{result.cached} cached, {result.downloaded} downloaded, {len(result.errors)} failed")
+    for node_id, path in sorted(result.paths.items()):
+        print(f"  {node_id}: {path}")
+    for node_id, error in sorted(result.errors.items()):
+        print(f"  {node_id}: {error}")
+    return 1 if result.errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
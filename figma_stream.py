@@ -0,0 +1,221 @@
+import codecs
+import io
+import json
+import os
+import re
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+# Bytes read from the underlying stream per refill of the token buffer
+CHUNK_SIZE = 64 * 1024
+
+_TOKEN_RE = re.compile(r'''
+    [ \t\r\n]*
+    (?:
+        (?P<punct>[{}\[\]:,])
+      | (?P<string>"(?:[^"\\]|\\.)*")
+      | (?P<number>-?(?:0|[1-9][0-9]*)(?:\.[0-9]+)?(?:[eE][+-]?[0-9]+)?)
+      | (?P<literal>true|false|null)
+    )''', re.VERBOSE)
+_NUMBER_TAIL_RE = re.compile(r'[0-9.eE+-]*')
+
+_LITERALS = {'true': True, 'false': False, 'null': None}
+
+
+class StreamedNode(NamedTuple):
+    """A fully parsed Figma node, without its ``children`` list"""
+    node: Dict[str, Any]
+    parent_id: Optional[str]
+    depth: int
+
+
+@contextmanager
+def _open_source(source):
+    """Open a path, bytes payload or file-like object as a readable stream"""
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as fp:
+            yield fp
+    elif isinstance(source, (bytes, bytearray)):
+        yield io.BytesIO(source)
+    elif hasattr(source, 'read'):
+        yield source
+    else:
+        raise TypeError(f"Unsupported Figma source: {type(source).__name__}")
+
+
+def _iter_tokens(fp, chunk_size: int) -> Iterator[Tuple[str, str]]:
+    """Tokenize a JSON stream chunk by chunk without loading it whole"""
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    buf = ''
+    pos = 0
+    eof = False
+    while True:
+        match = _TOKEN_RE.match(buf, pos)
+        # A token touching the end of the buffer may continue in the next chunk
+        if not eof and (match is None or match.end() == len(buf) or (
+                match.lastgroup == 'number'
+                and _NUMBER_TAIL_RE.match(buf, match.end()).end() == len(buf))):
+            chunk = fp.read(chunk_size)
+            if not chunk:
+                eof = True
+                buf = buf[pos:] + decoder.decode(b'', final=True)
+            else:
+                if isinstance(chunk, bytes):
+                    chunk = decoder.decode(chunk)
+                buf = buf[pos:] + chunk
+            pos = 0
+            continue
+        if match is None:
+            if buf[pos:].strip():
+                raise ValueError(f"Invalid JSON near: {buf[pos:pos + 40]!r}")
+            return
+        pos = match.end()
+        yield match.lastgroup, match.group(match.lastgroup)
+
+
+def iter_events(fp, chunk_size: int = CHUNK_SIZE) -> Iterator[Tuple[str, Any]]:
+    """Yield ijson-style ``(event, value)`` pairs from a JSON stream"""
+    stack = []
+    expect_key = False
+    for kind, text in _iter_tokens(fp, chunk_size):
+        if kind == 'punct':
+            if text == '{':
+                stack.append('map')
+                expect_key = True
+                yield 'start_map', None
+            elif text == '[':
+                stack.append('array')
+                yield 'start_array', None
+            elif text == '}':
+                stack.pop()
+                expect_key = False
+                yield 'end_map', None
+            elif text == ']':
+                stack.pop()
+                yield 'end_array', None
+            elif text == ',':
+                expect_key = stack[-1] == 'map'
+        elif kind == 'string':
+            value = json.loads(text)
+            if expect_key:
+                expect_key = False
+                yield 'map_key', value
+            else:
+                yield 'string', value
+        elif kind == 'number':
+            yield 'number', json.loads(text)
+        else:
+            value = _LITERALS[text]
+            yield ('null' if value is None else 'boolean'), value
+
+
+def iter_nodes(source, types: Optional[Iterable[str]] = None,
+               chunk_size: int = CHUNK_SIZE) -> Iterator[StreamedNode]:
+    """Walk the nodes of a Figma ``files`` or ``file_nodes`` payload as it is parsed.
+
+    ``source`` may be a path (e.g. ``website.json``), a bytes payload or any
+    object with ``read()``, such as a streamed ``requests`` response body.
+    Each node is yielded once it is complete, children before their parent,
+    so only the chain of ancestors is ever held in memory.
+    """
+    wanted = set(types) if types else None
+
+    # Frames are [kind, container, pending_key]. "skip" containers are walked
+    # only to reach nodes, "children" holds nodes that are yielded and dropped,
+    # "node" and "value" containers are built into the yielded node.
+    stack = []
+    node_ids = []
+
+    with _open_source(source) as fp:
+        for event, value in iter_events(fp, chunk_size):
+            if event == 'map_key':
+                stack[-1][2] = value
+                continue
+
+            if event in ('start_map', 'start_array'):
+                parent = stack[-1] if stack else None
+                is_map = event == 'start_map'
+                if parent is None:
+                    kind = 'skip'
+                elif parent[0] == 'skip':
+                    kind = 'node' if is_map and parent[2] == 'document' else 'skip'
+                elif parent[0] == 'children':
+                    kind = 'node' if is_map else 'skip'
+                elif parent[0] == 'node' and parent[2] == 'children' and not is_map:
+                    kind = 'children'
+                else:
+                    kind = 'value'
+                container = {} if kind in ('node', 'value') and is_map else []
+                stack.append([kind, container, None])
+                if kind == 'node':
+                    node_ids.append(None)
+                continue
+
+            if event in ('end_map', 'end_array'):
+                kind, container, _ = stack.pop()
+                if kind == 'node':
+                    node_ids.pop()
+                    parent_id = next((i for i in reversed(node_ids) if i is not None), None)
+                    if wanted is None or container.get('type') in wanted:
+                        yield StreamedNode(container, parent_id, len(node_ids))
+                    continue
+                if kind != 'value':
+                    continue
+                value = container
+
+            # A scalar, or a finished value container, lands in its parent
+            if not stack:
+                continue
+            parent = stack[-1]
+            if parent[0] == 'node':
+                parent[1][parent[2]] = value
+                if parent[2] == 'id':
+                    node_ids[-1] = value
+            elif parent[0] == 'value':
+                if isinstance(parent[1], dict):
+                    parent[1][parent[2]] = value
+                else:
+                    parent[1].append(value)
+
+
+def document_roots(data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Return the document trees of a parsed ``files`` or ``file_nodes`` response"""
+    if 'document' in data:
+        return [data['document']]
+    if 'nodes' in data:
+        return [entry['document'] for entry in data['nodes'].values() if entry and 'document' in entry]
+    if 'type' in data and 'id' in data:
+        return [data]
+    return []
+
+
+def walk_nodes(document: Dict[str, Any]) -> Iterator[StreamedNode]:
+    """Iterate an in-memory document tree in the same order as ``iter_nodes``.
+
+    Nodes are yielded as-is, ``children`` included, to avoid copying the tree.
+    """
+    stack = [(document, None, 0, False)]
+    while stack:
+        node, parent_id, depth, expanded = stack.pop()
+        if expanded:
+            yield StreamedNode(node, parent_id, depth)
+            continue
+        stack.append((node, parent_id, depth, True))
+        for child in reversed(node.get('children', [])):
+            stack.append((child, node['id'], depth + 1, False))
+
+
+def find_frame(figma: Dict[str, Any], name: Optional[str] = None) -> Dict[str, Any]:
+    """The outermost frame called ``name`` (or the first one) in a ``files`` or ``file_nodes`` dump"""
+    frames = [
+        streamed for root in document_roots(figma) for streamed in walk_nodes(root)
+        if streamed.node.get('type') == 'FRAME'
+    ]
+    matches = [streamed for streamed in frames if name is None or streamed.node.get('name') == name]
+    if not matches:
+        if not frames:
+            raise ValueError('The Figma dump contains no frames')
+        names = sorted({streamed.node.get('name', '') for streamed in frames if streamed.depth <= 2})
+        raise ValueError(f"No frame named {name!r}; top-level frames: {', '.join(map(repr, names))}")
+    # walk_nodes yields children first, so pick the shallowest match, earliest in document order
+    return min(matches, key=lambda streamed: streamed.depth).node
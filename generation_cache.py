@@ -0,0 +1,131 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+
+def make_key(prompt: str, model: str, temperature: float, **params: Any) -> str:
+    """Hash a whitespace-normalized prompt together with the sampling settings"""
+    normalized = ' '.join(prompt.split())
+    identity = json.dumps([normalized, model, temperature, sorted(params.items())])
+    return hashlib.sha256(identity.encode('utf-8')).hexdigest()
+
+
+class MemoryBackend:
+    """Thread-safe in-process LRU store"""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[str, tuple]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: str, value: str, created: float):
+        with self._lock:
+            self._entries[key] = (value, created)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteBackend:
+    """LRU store in a SQLite file, shared across processes and restarts"""
+
+    def __init__(self, path: str = 'generation_cache.sqlite3', max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS generations ('
+            'key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)'
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS generations_accessed ON generations (accessed)')
+        self._conn.commit()
+
+    def get(self, key: str):
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT value, created FROM generations WHERE key = ?', (key,)
+            ).fetchone()
+            if row is not None:
+                self._conn.execute('UPDATE generations SET accessed = ? WHERE key = ?', (time.time(), key))
+                self._conn.commit()
+            return row
+
+    def set(self, key: str, value: str, created: float):
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO generations (key, value, created, accessed) VALUES (?, ?, ?, ?)',
+                (key, value, created, created)
+            )
+            self._conn.execute(
+                'DELETE FROM generations WHERE key IN ('
+                'SELECT key FROM generations ORDER BY accessed DESC LIMIT -1 OFFSET ?)',
+                (self.max_entries,)
+            )
+            self._conn.commit()
+
+    def delete(self, key: str):
+        with self._lock:
+            self._conn.execute('DELETE FROM generations WHERE key = ?', (key,))
+            self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM generations').fetchone()[0]
+
+
+class GenerationCache:
+    """Memoizes LLM completions with a TTL on top of a pluggable backend"""
+
+    def __init__(self, backend=None, ttl: Optional[float] = 24 * 3600):
+        self.backend = backend if backend is not None else MemoryBackend()
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self.backend.get(key)
+        if entry is not None and self.ttl is not None and time.time() - entry[1] > self.ttl:
+            self.backend.delete(key)
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry[0]
+
+    def set(self, key: str, value: str):
+        self.backend.set(key, value, time.time())
+
+    def stats(self) -> Dict[str, int]:
+        return {'hits': self.hits, 'misses': self.misses, 'entries': len(self.backend)}
+
+
+def cache_from_env() -> Optional[GenerationCache]:
+    """Build the cache selected by GENERATION_CACHE ("memory", "sqlite" or "off")"""
+    kind = os.environ.get('GENERATION_CACHE', 'memory').lower()
+    ttl = float(os.environ.get('GENERATION_CACHE_TTL', 24 * 3600))
+    if kind == 'off':
+        return None
+    if kind == 'sqlite':
+        path = os.environ.get('GENERATION_CACHE_PATH', 'generation_cache.sqlite3')
+        return GenerationCache(SQLiteBackend(path), ttl=ttl)
+    return GenerationCache(MemoryBackend(), ttl=ttl)
@@ -0,0 +1,246 @@
+import logging
+import subprocess
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from metrics import Counter, observe_stage
+from shard_runner import MOCHA_COMMAND, DurationHistory, default_workers, kill_process_group, run_sharded
+
+logger = logging.getLogger(__name__)
+
+# Finished runs by outcome, exposed on /metrics
+TEST_RUNS = Counter("testgen_test_runs_total", "Finished test runs by status", ["status"])
+
+
+class Job:
+    """A queued or finished test run and its captured output"""
+
+    def __init__(self, file_path: str, command: List[str]):
+        self.id = uuid.uuid4().hex
+        self.file_path = file_path
+        self.command = command
+        self.status = 'queued'
+        self.returncode = None
+        self.stdout: List[str] = []
+        self.stderr: List[str] = []
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        # Merged per-test report of a sharded run
+        self.report: Optional[Dict[str, Any]] = None
+        # Called with the job once it has finished
+        self.on_done: Optional[Callable[['Job'], None]] = None
+
+    @property
+    def done(self) -> bool:
+        return self.status in ('passed', 'failed', 'timeout', 'error')
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'job_id': self.id,
+            'status': self.status,
+            'file_path': self.file_path,
+            'returncode': self.returncode,
+            'output': ''.join(self.stdout),
+            'error': ''.join(self.stderr) or self.error,
+            'created': self.created,
+            'started': self.started,
+            'finished': self.finished,
+            'duration': (self.finished - self.started) if self.started and self.finished else None,
+            'report': self.report
+        }
+
+
+class JobRunner:
+    """Runs uploaded test scripts on a fixed-size worker pool.
+
+    Each job gets its own subprocess with a wall-clock timeout; stdout is
+    captured line by line so it can be followed while the job runs. Mocha
+    suites submitted with ``submit_suite`` are split into shards that run in
+    parallel (see ``shard_runner``) and report per-test results.
+    """
+
+    def __init__(self, max_workers: int = 2, timeout: float = 300, max_history: int = 500,
+                 shard_workers: Optional[int] = None):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.max_history = max_history
+        self.shard_workers = shard_workers or default_workers()
+        # Browser processes across all jobs, plain runs and shards alike
+        self._browser_slots = threading.BoundedSemaphore(max(self.shard_workers, max_workers))
+        self._durations = DurationHistory()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._jobs: 'OrderedDict[str, Job]' = OrderedDict()
+        self._changed = threading.Condition()
+
+    def submit(self, file_path: str, command: Optional[List[str]] = None,
+               on_done: Optional[Callable[[Job], None]] = None) -> Job:
+        """Queue a script for execution and return its job immediately"""
+        job = Job(file_path, command or ['node', file_path])
+        self._queue(job, self._run, on_done)
+        return job
+
+    def submit_suite(self, file_paths: List[str], on_done: Optional[Callable[[Job], None]] = None) -> Job:
+        """Queue mocha suites to run as parallel shards; the job gets a merged report"""
+        job = Job(file_paths[0], MOCHA_COMMAND + list(file_paths))
+        self._queue(job, lambda job: self._run_suite(job, file_paths), on_done)
+        return job
+
+    def _queue(self, job: Job, run, on_done):
+        job.on_done = on_done
+        with self._changed:
+            self._jobs[job.id] = job
+            self._prune()
+        self._executor.submit(self._execute, job, run)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def queue_depth(self) -> int:
+        return sum(1 for job in list(self._jobs.values()) if job.status == 'queued')
+
+    def running(self) -> int:
+        return sum(1 for job in list(self._jobs.values()) if job.status == 'running')
+
+    def wait(self, job_id: str, timeout: Optional[float] = None) -> Optional[Job]:
+        """Block until a job finishes (or ``timeout`` elapses) and return it"""
+        job = self.get(job_id)
+        if job is None:
+            return None
+        with self._changed:
+            self._changed.wait_for(lambda: job.done, timeout=timeout)
+        return job
+
+    def follow(self, job_id: str) -> Iterator[str]:
+        """Yield stdout lines of a job as they are produced, until it finishes"""
+        job = self.get(job_id)
+        if job is None:
+            return
+        sent = 0
+        while True:
+            with self._changed:
+                self._changed.wait_for(lambda: job.done or len(job.stdout) > sent, timeout=1.0)
+                lines = job.stdout[sent:]
+                done = job.done
+            sent += len(lines)
+            yield from lines
+            if done and sent >= len(job.stdout):
+                return
+
+    def _notify(self):
+        with self._changed:
+            self._changed.notify_all()
+
+    def _prune(self):
+        # Forget the oldest finished jobs beyond max_history
+        excess = len(self._jobs) - self.max_history
+        for job_id in [job_id for job_id, job in self._jobs.items() if job.done][:max(excess, 0)]:
+            del self._jobs[job_id]
+
+    def _execute(self, job: Job, run):
+        # Whatever goes wrong, the job reaches a terminal status and waiters are woken
+        try:
+            run(job)
+        except Exception as e:
+            logger.exception(f"Job {job.id} crashed")
+            job.status = 'error'
+            job.error = str(e)
+        finally:
+            self._finish(job)
+
+    def _run(self, job: Job):
+        # The job stays queued until a browser slot is free
+        with self._browser_slots:
+            self._run_process(job)
+
+    def _run_process(self, job: Job):
+        job.status = 'running'
+        job.started = time.time()
+        self._notify()
+        try:
+            # Undecodable output is replaced rather than aborting the run; a session of its own
+            # lets a timeout kill the browsers the script started, not just node
+            process = subprocess.Popen(
+                job.command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, errors='replace',
+                bufsize=1, start_new_session=True
+            )
+        except Exception as e:
+            job.status = 'error'
+            job.error = str(e)
+            return
+
+        timed_out = threading.Event()
+
+        def kill():
+            timed_out.set()
+            kill_process_group(process)
+
+        timer = threading.Timer(self.timeout, kill)
+        timer.start()
+        stderr_reader = threading.Thread(target=lambda: job.stderr.extend(process.stderr), daemon=True)
+        stderr_reader.start()
+        try:
+            for line in process.stdout:
+                job.stdout.append(line)
+                self._notify()
+            process.wait()
+            stderr_reader.join()
+        finally:
+            timer.cancel()
+            kill_process_group(process)
+            process.wait()
+
+        job.returncode = process.returncode
+        if timed_out.is_set():
+            job.status = 'timeout'
+            job.error = f"Timed out after {self.timeout} seconds"
+        else:
+            job.status = 'passed' if process.returncode == 0 else 'failed'
+
+    def _run_suite(self, job: Job, file_paths: List[str]):
+        job.status = 'running'
+        job.started = time.time()
+        self._notify()
+
+        def output(line):
+            job.stdout.append(line)
+            self._notify()
+
+        try:
+            report = run_sharded(file_paths, workers=self.shard_workers, timeout=self.timeout,
+                                 history=self._durations, slots=self._browser_slots, on_output=output)
+        except Exception as e:
+            job.status = 'error'
+            job.error = str(e)
+            return
+
+        job.report = report
+        statuses = {shard['status'] for shard in report['shards']}
+        errors = [f"{shard['shard']}: {shard['error']}" for shard in report['shards'] if shard['error']]
+        job.error = '\n'.join(errors) or None
+        if 'timeout' in statuses:
+            job.status = 'timeout'
+        elif report['stats']['failures'] or 'error' in statuses:
+            job.status = 'failed'
+        else:
+            job.status = 'passed'
+        job.returncode = 0 if job.status == 'passed' else 1
+
+    def _finish(self, job: Job):
+        job.finished = time.time()
+        try:
+            TEST_RUNS.inc(status=job.status)
+            if job.status != 'error' and job.started is not None:
+                observe_stage("selenium_run", job.finished - job.started)
+            if job.on_done is not None:
+                try:
+                    job.on_done(job)
+                except Exception:
+                    logger.exception(f"on_done callback failed for job {job.id}")
+        finally:
+            self._notify()
@@ -1,12 +1,91 @@
-import streamlit as st
+import itertools
 import json
-from figma_api import fetch_figma_data
+import os
+
+import streamlit as st
+from figma_api import CACHEABLE_ENDPOINTS, cached_version, fetch_figma_data
+
+# Seconds a fetched response is reused across reruns and sessions
+CACHE_TTL = int(os.environ.get("EXPLORER_CACHE_TTL", 300))
+# Entries of an object or array shown per page in the tree view
+PAGE_SIZE = 50
+
+
+class FetchedResponse:
+    """A parsed response shared by reruns; its JSON bytes are only built when first needed."""
+
+    def __init__(self, data):
+        self.data = data
+        self._payload = None
+
+    @property
+    def payload(self):
+        if self._payload is None:
+            self._payload = json.dumps(self.data, indent=4).encode("utf-8")
+        return self._payload
+
+
+def save_response_to_file(payload, filename="figma_response.json"):
+    """Save the serialized JSON response to a file."""
+    with open(filename, "wb") as file:
+        file.write(payload)
+
+
+def _query_params(node_id):
+    return {'ids': node_id} if node_id else None
+
+
+def fetch_data(endpoint_type, param, node_id):
+    """Fetch a response through the on-disk cache, raising RuntimeError on failure."""
+    data, error = fetch_figma_data(endpoint_type, param, _query_params(node_id))
+    if error:
+        raise RuntimeError(error)
+    return data
 
 
-def save_response_to_file(data, filename="figma_response.json"):
-    """Save JSON response to a file."""
-    with open(filename, "w", encoding="utf-8") as file:
-        json.dump(data, file, indent=4)
+@st.cache_resource(ttl=CACHE_TTL, max_entries=4, show_spinner="Fetching from the Figma API...")
+def load_response(endpoint_type, param, node_id, version, _data=None):
+    """Parse a response once per file version; reruns share the object instead of copying it.
+
+    ``version`` is only part of the cache key, so an edited file gets a new
+    entry. ``_data`` (not hashed) hands over a response already fetched to
+    learn that version.
+    """
+    # Raising keeps failed requests out of the cache
+    return FetchedResponse(fetch_data(endpoint_type, param, node_id) if _data is None else _data)
+
+
+def _label(key, value):
+    """One-line description of an entry, using name and type for Figma nodes."""
+    if isinstance(value, dict):
+        if "type" in value and "name" in value:
+            return f"{key}: {value['name']} ({value['type']})"
+        return f"{key}: {{…}} {len(value)} keys"
+    if isinstance(value, list):
+        return f"{key}: […] {len(value)} items"
+    text = json.dumps(value)
+    return f"{key}: {text[:200]}{'…' if len(text) > 200 else ''}"
+
+
+def render_tree(value, path=(), depth=0):
+    """Render one page of a container's entries; children are rendered only when expanded."""
+    size = len(value)
+    start = 0
+    if size > PAGE_SIZE:
+        pages = (size + PAGE_SIZE - 1) // PAGE_SIZE
+        page = st.number_input(f"{'　' * depth}Page (of {pages}, {size} entries)", min_value=1,
+                               max_value=pages, value=1, key=f"page:{path!r}")
+        start = (page - 1) * PAGE_SIZE
+
+    entries = value.items() if isinstance(value, dict) else enumerate(value)
+    for key, child in itertools.islice(entries, start, start + PAGE_SIZE):
+        child_path = path + (key,)
+        label = "　" * depth + _label(key, child)
+        if isinstance(child, (dict, list)) and child:
+            if st.checkbox(label, key=f"open:{child_path!r}"):
+                render_tree(child, child_path, depth + 1)
+        else:
+            st.text(label)
 
 
 def main():
@@ -26,26 +105,45 @@ def main():
     if endpoint_type == "file_nodes":
         node_id = st.text_input("Enter Node ID")
 
-    # API request when button is clicked
-    if st.button("Fetch Data"):
-        query_params = {'ids': node_id} if node_id else None
-        data, error = fetch_figma_data(endpoint_type, param, query_params)
+    # The request outlives the button click so expanding nodes keeps the response on screen.
+    # Each click reuses figma_api's version check; an edited file is fetched once and keyed by its new version
+    prefetched = None
+    try:
+        if st.button("Fetch Data"):
+            version = cached_version(endpoint_type, param, _query_params(node_id))
+            if version is None and endpoint_type in CACHEABLE_ENDPOINTS:
+                prefetched = fetch_data(endpoint_type, param, node_id)
+                version = prefetched.get("version")
+            st.session_state["request"] = (endpoint_type, param, node_id, version)
+            st.session_state["saved"] = False
 
-        if error:
-            st.error(error)
-        else:
-            st.success("API Request Successful!")
-            st.json(data)  # Display response
-
-            # Save response to a file
-            save_response_to_file(data)
-
-            st.download_button(
-                label="Download JSON",
-                data=json.dumps(data, indent=4),
-                file_name="figma_response.json",
-                mime="application/json"
-            )
+        if "request" not in st.session_state:
+            return
+
+        response = load_response(*st.session_state["request"], _data=prefetched)
+    except RuntimeError as e:
+        st.error(str(e))
+        return
+    data = response.data
+
+    st.success("API Request Successful!")
+
+    # Save response to a file, once per fetch rather than on every rerun
+    if not st.session_state["saved"]:
+        save_response_to_file(response.payload)
+        st.session_state["saved"] = True
+
+    st.download_button(
+        label="Download JSON",
+        data=response.payload,
+        file_name="figma_response.json",
+        mime="application/json"
+    )
+
+    if isinstance(data, (dict, list)):
+        render_tree(data)
+    else:
+        st.text(_label("response", data))
 
 
 if __name__ == "__main__":
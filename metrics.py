@@ -0,0 +1,231 @@
+"""Minimal Prometheus-format metrics and per-request trace ids.
+
+Counters, gauges and histograms are kept in a process-wide registry and
+rendered in the text exposition format by ``render()``. ``instrument_app``
+adds request timing, an ``X-Trace-Id`` header and a ``/metrics`` route to a
+Flask app; ``span(stage)`` times one pipeline stage.
+"""
+import contextvars
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+_INF_LABEL = 'le="+Inf"'
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+# Trace id of the request being handled, if any
+trace_id_var: contextvars.ContextVar = contextvars.ContextVar("trace_id", default=None)
+
+
+def _format_labels(names: Sequence[str], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Metric(ABC):
+    """A named metric registered on creation; subclasses render their samples"""
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        REGISTRY.register(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    @abstractmethod
+    def samples(self) -> Iterator[str]:
+        """Exposition lines for every label combination"""
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for key, value in sorted(values.items()):
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Gauge(_Metric):
+    """Gauge set directly or read from ``callback`` at scrape time"""
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labelnames=(), callback: Optional[Callable[[], float]] = None):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self.callback = callback
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def samples(self):
+        if self.callback is not None:
+            yield f"{self.name} {_format_value(self.callback())}"
+            return
+        with self._lock:
+            values = dict(self._values)
+        for key, value in sorted(values.items()):
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # key -> (per-bucket counts, sum, count)
+        self._values: Dict[Tuple[str, ...], List] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.setdefault(key, [[0] * len(self.buckets), 0.0, 0])
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def samples(self):
+        with self._lock:
+            values = {key: (list(counts), total, count) for key, (counts, total, count) in self._values.items()}
+        for key, (counts, total, count) in sorted(values.items()):
+            for bound, bucket_count in zip(self.buckets, counts):
+                labels = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+                yield f"{self.name}_bucket{labels} {bucket_count}"
+            yield f"{self.name}_bucket{_format_labels(self.labelnames, key, _INF_LABEL)} {count}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, key)} {count}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric):
+        self._metrics[metric.name] = metric
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self._metrics.values()) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = Histogram(
+    "testgen_stage_duration_seconds", "Duration of each pipeline stage", ["stage"])
+LLM_TOKENS = Counter(
+    "testgen_llm_tokens_total", "Tokens sent to and received from the LLM", ["kind"])
+CACHE_REQUESTS = Counter(
+    "testgen_cache_requests_total", "Cache lookups by cache and result", ["cache", "result"])
+HTTP_REQUESTS = Counter(
+    "testgen_http_requests_total", "HTTP requests handled", ["app", "endpoint", "status"])
+HTTP_SECONDS = Histogram(
+    "testgen_http_request_duration_seconds", "Time until the response headers are ready", ["app", "endpoint"])
+HTTP_IN_FLIGHT = Gauge(
+    "testgen_http_requests_in_flight", "HTTP requests currently being handled", ["app"])
+
+
+def render() -> str:
+    return REGISTRY.render()
+
+
+def observe_stage(stage: str, seconds: float):
+    """Record a stage duration measured elsewhere"""
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    trace_id = trace_id_var.get()
+    if trace_id:
+        logger.info(f"[{trace_id}] {stage} took {seconds * 1000:.1f} ms")
+
+
+@contextmanager
+def span(stage: str):
+    """Time a block as one pipeline stage; logged when the request carries a trace id"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.perf_counter() - start)
+
+
+def instrument_app(app, name: str):
+    """Add request metrics, trace ids and a ``/metrics`` route to a Flask app.
+
+    Clients may send ``X-Trace-Id`` to have every stage of their request
+    logged under that id; it is echoed back on the response.
+    """
+    from flask import Response, g, request
+
+    @app.before_request
+    def _start_request():
+        g.metrics_start = time.perf_counter()
+        g.trace_id = request.headers.get("X-Trace-Id")
+        g.metrics_in_flight = True
+        trace_id_var.set(g.trace_id)
+        HTTP_IN_FLIGHT.inc(app=name)
+
+    @app.after_request
+    def _finish_request(response):
+        endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+        HTTP_REQUESTS.inc(app=name, endpoint=endpoint, status=response.status_code)
+        HTTP_SECONDS.observe(time.perf_counter() - g.metrics_start, app=name, endpoint=endpoint)
+        if g.trace_id:
+            response.headers["X-Trace-Id"] = g.trace_id
+        return response
+
+    # Streamed responses tear the request down again when the stream ends
+    @app.teardown_request
+    def _end_request(exc):
+        if g.pop("metrics_in_flight", False):
+            HTTP_IN_FLIGHT.dec(app=name)
+
+    @app.route("/metrics")
+    def metrics():
+        return Response(render(), mimetype="text/plain; version=0.0.4")
@@ -0,0 +1,218 @@
+import json
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from component_extractor import ComponentCatalog
+
+# Purely decorative shapes that never carry testable behaviour
+DECORATIVE_TYPES = {"VECTOR", "BOOLEAN_OPERATION", "LINE", "ELLIPSE", "STAR", "REGULAR_POLYGON"}
+
+# Rough characters-per-token ratio for English text and JSON-ish UI outlines
+CHARS_PER_TOKEN = 4
+
+
+class CompactionResult(NamedTuple):
+    text: str
+    original_tokens: int
+    compact_tokens: int
+
+    @property
+    def saved_tokens(self) -> int:
+        return self.original_tokens - self.compact_tokens
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate used for budgeting prompts"""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _hex(color: Dict[str, float]) -> str:
+    return "#{:02X}{:02X}{:02X}".format(*(round(color[channel] * 255) for channel in "rgb"))
+
+
+def _solid_fill(node: Dict[str, Any]) -> Optional[str]:
+    for fill in node.get("fills", []):
+        if fill.get("type") == "SOLID" and fill.get("visible", True):
+            return _hex(fill["color"])
+    return None
+
+
+def _texts(node: Dict[str, Any]) -> List[str]:
+    texts = []
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        if current.get("type") == "TEXT" and current.get("characters"):
+            texts.append(" ".join(current["characters"].split())[:60])
+        stack.extend(reversed(current.get("children", [])))
+    return texts
+
+
+def _font(style: Dict[str, Any]) -> str:
+    """``family size/weight``, leaving out values the style does not set"""
+    size = style.get("fontSize")
+    font = " ".join(part for part in (style.get("fontFamily"), f"{size:g}" if size is not None else None) if part)
+    weight = style.get("fontWeight")
+    return f"{font}/{weight}" if weight is not None else font
+
+
+def _describe(node: Dict[str, Any], component_names: Dict[str, str]) -> str:
+    """One outline line with only the properties a tester cares about"""
+    parts = [node["type"]]
+    # Text layers are usually named after their content, which is shown anyway
+    if node["type"] != "TEXT":
+        parts.append(json.dumps(node.get("name", "")[:60]))
+
+    component_id = node.get("componentId")
+    if component_id:
+        parts.append(f"of {json.dumps(component_names.get(component_id, component_id))}")
+
+    props = [
+        f"{key.split('#')[0]}={prop.get('value')}"
+        for key, prop in node.get("componentProperties", {}).items()
+        if prop.get("type") != "TEXT"
+    ]
+    if props:
+        parts.append(f"[{', '.join(props)}]")
+
+    box = node.get("absoluteBoundingBox")
+    if box:
+        parts.append(f"{round(box['width'])}x{round(box['height'])}")
+
+    fill = _solid_fill(node)
+    if node["type"] == "TEXT":
+        style = node.get("style", {})
+        text = " ".join(node.get("characters", "").split())
+        parts.append(f"text={json.dumps(text[:120])}")
+        if style:
+            parts.append(f"font={_font(style)}")
+        if fill and fill != "#000000":
+            parts.append(f"color={fill}")
+    elif fill and fill != "#FFFFFF":
+        parts.append(f"bg={fill}")
+
+    if node.get("layoutMode") and node["layoutMode"] != "NONE":
+        padding = [node.get(key) or 0 for key in ("paddingTop", "paddingRight", "paddingBottom", "paddingLeft")]
+        parts.append(f"layout={node['layoutMode'].lower()}")
+        if any(padding):
+            parts.append(f"padding={','.join(f'{value:g}' for value in padding)}")
+        if node.get("itemSpacing"):
+            parts.append(f"gap={node['itemSpacing']:g}")
+    if node.get("cornerRadius"):
+        parts.append(f"radius={node['cornerRadius']:g}")
+    if node.get("interactions"):
+        parts.append("interactive")
+    return " ".join(parts)
+
+
+def _render(node: Dict[str, Any], component_names: Dict[str, str], seen_instances: set,
+            depth: int, max_depth: Optional[int]) -> List[str]:
+    """Render a subtree as indented outline lines"""
+    line = "- " + _describe(node, component_names)
+    children = [
+        child for child in node.get("children", [])
+        if child.get("visible", True) and child.get("type") not in DECORATIVE_TYPES
+    ]
+
+    # Repeated instances of a component variant are described once, then
+    # referenced with just their own labels
+    if node.get("componentId"):
+        signature = (node["componentId"], json.dumps(node.get("componentProperties", {}), sort_keys=True))
+        if signature in seen_instances:
+            texts = _texts(node)
+            label = f" text={json.dumps(' / '.join(texts))}" if texts else ""
+            return [line + label + " (same structure as above)"]
+        seen_instances.add(signature)
+
+    if max_depth is not None and depth >= max_depth:
+        return [line + (f" (+{len(children)} children)" if children else "")]
+
+    lines = [line]
+    rendered_children = [_render(child, component_names, seen_instances, depth + 1, max_depth) for child in children]
+
+    # Collapse runs of identical sibling subtrees into one with a count
+    index = 0
+    while index < len(rendered_children):
+        current = rendered_children[index]
+        run = 1
+        while index + run < len(rendered_children) and rendered_children[index + run] == current:
+            run += 1
+        block = list(current)
+        if run > 1:
+            block[0] += f" x{run}"
+        lines.extend("  " + child_line for child_line in block)
+        index += run
+    return lines
+
+
+def compact_nodes(nodes: List[Dict[str, Any]], component_names: Optional[Dict[str, str]] = None,
+                  max_depth: Optional[int] = None) -> str:
+    """Render Figma subtrees as a deduplicated, indented outline"""
+    seen_instances = set()
+    lines = []
+    for node in nodes:
+        lines.extend(_render(node, component_names or {}, seen_instances, 0, max_depth))
+    return "\n".join(lines)
+
+
+def compact_to_budget(nodes: List[Dict[str, Any]], budget: int,
+                      component_names: Optional[Dict[str, str]] = None) -> str:
+    """Compact subtrees, lowering the depth until the outline fits ``budget`` tokens"""
+    text = compact_nodes(nodes, component_names)
+    max_depth = max((len(line) - len(line.lstrip(" "))) // 2 for line in text.splitlines()) if text else 0
+    while estimate_tokens(text) > budget and max_depth > 0:
+        max_depth -= 1
+        text = compact_nodes(nodes, component_names, max_depth=max_depth)
+
+    if estimate_tokens(text) > budget:
+        # Still too large at the top level: keep whole lines up to the budget
+        kept, used = [], 0
+        for line in text.splitlines():
+            used += estimate_tokens(line) + 1
+            if used > budget:
+                kept.append(f"- ... ({len(text.splitlines()) - len(kept)} more elements omitted)")
+                break
+            kept.append(line)
+        text = "\n".join(kept)
+    return text
+
+
+def truncate_to_budget(text: str, budget: int) -> str:
+    """Keep whole lines of plain text up to ``budget`` tokens, cutting a single long line at a word"""
+    if estimate_tokens(text) <= budget:
+        return text
+    lines = text.splitlines()
+    kept, used = [], 0
+    for line in lines:
+        if used + estimate_tokens(line) + 1 > budget:
+            break
+        kept.append(line)
+        used += estimate_tokens(line) + 1
+    if not kept:
+        # The first line alone is over budget: cut it at a word boundary
+        head = lines[0][:max(budget - 4, 0) * CHARS_PER_TOKEN]
+        return (head.rsplit(" ", 1)[0] if " " in head else head) + " ... (truncated)"
+    return "\n".join(kept + [f"... ({len(lines) - len(kept)} more lines omitted)"])
+
+
+def compact_ui_description(ui_description: str, budget: int) -> CompactionResult:
+    """Turn Figma JSON into a compact outline within ``budget`` tokens.
+
+    Plain-text descriptions are kept as they are, cut to whole lines if they
+    exceed the budget.
+    """
+    original_tokens = estimate_tokens(ui_description)
+    try:
+        data = json.loads(ui_description)
+    except ValueError:
+        data = None
+
+    roots = []
+    if isinstance(data, dict):
+        catalog = ComponentCatalog.from_document(data)
+        roots = [record.node for record in catalog.roots()]
+    if not roots:
+        text = truncate_to_budget(ui_description, budget)
+        return CompactionResult(text, original_tokens, estimate_tokens(text))
+
+    text = compact_to_budget(roots, budget, catalog.component_names())
+    return CompactionResult(text, original_tokens, estimate_tokens(text))
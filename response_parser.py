@@ -0,0 +1,328 @@
+import argparse
+import json
+import os
+import re
+import time
+from typing import Any, Dict, List, NamedTuple, Optional
+
+_COMPONENTS_RE = re.compile(r'"components"\s*:\s*\[')
+_STRUCTURAL_RE = re.compile(r'[{}\[\]"]')
+_STRING_RE = re.compile(r'["\\]')
+
+
+class ComponentStreamParser:
+    """Incrementally extracts finished ``components[]`` entries from streamed JSON.
+
+    Feed completion text as it arrives; each call returns the components whose
+    closing brace has been seen since the previous call. Only the text of the
+    component currently being generated is buffered.
+    """
+
+    def __init__(self):
+        self._buf = ''
+        self._pos = 0
+        self._in_array = False
+        self._done = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._start = None
+
+    def feed(self, text: str) -> List[Dict[str, Any]]:
+        if self._done or not text:
+            return []
+        self._buf += text
+        components = []
+
+        if not self._in_array:
+            match = _COMPONENTS_RE.search(self._buf)
+            if not match:
+                # Keep enough of the tail to match a key split across chunks
+                self._buf = self._buf[-64:]
+                return components
+            self._in_array = True
+            self._pos = match.end()
+
+        buf = self._buf
+        i = self._pos
+        end = len(buf)
+        while i < end:
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                    i += 1
+                    continue
+                # Jump straight to the next quote or backslash
+                match = _STRING_RE.search(buf, i)
+                if not match:
+                    i = end
+                    break
+                i = match.start()
+                if buf[i] == '\\':
+                    self._escape = True
+                else:
+                    self._in_string = False
+                i += 1
+                continue
+
+            match = _STRUCTURAL_RE.search(buf, i)
+            if not match:
+                i = end
+                break
+            i = match.start()
+            char = buf[i]
+            if char == '"':
+                self._in_string = True
+            elif char in '{[':
+                if self._depth == 0 and char == '{':
+                    self._start = i
+                self._depth += 1
+            else:
+                self._depth -= 1
+                if self._depth < 0:
+                    self._done = True
+                    break
+                if self._depth == 0 and char == '}' and self._start is not None:
+                    text = buf[self._start:i + 1]
+                    try:
+                        components.append(json.loads(text))
+                    except json.JSONDecodeError:
+                        try:
+                            components.append(json.loads(strip_trailing_commas(text)))
+                        except json.JSONDecodeError:
+                            pass
+                    self._start = None
+            i += 1
+
+        # Drop everything before the component still being generated
+        keep_from = self._start if self._start is not None else i
+        self._buf = buf[keep_from:]
+        self._pos = i - keep_from
+        if self._start is not None:
+            self._start = 0
+        return components
+
+    def finish(self) -> List[Dict[str, Any]]:
+        """Salvage the component that was cut off when the stream ended, if any"""
+        if self._done or self._start is None:
+            return []
+        component = _close_truncated(self._buf[self._start:])
+        self._start = None
+        return [component] if component is not None else []
+
+
+class ParseResult(NamedTuple):
+    data: Optional[Dict[str, Any]]
+    repaired: bool
+    dropped: int
+
+
+REQUIRED_SUB_KEYS = ("summary", "priority", "tags", "test_cases")
+
+
+def strip_trailing_commas(text: str) -> str:
+    """Remove commas directly before a closing bracket, outside of strings"""
+    out = []
+    in_string = escape = False
+    # A comma is held back (with any whitespace after it) until the next token shows it is legal
+    pending = None
+    for char in text:
+        if in_string:
+            out.append(char)
+            if escape:
+                escape = False
+            elif char == '\\':
+                escape = True
+            elif char == '"':
+                in_string = False
+            continue
+        if pending is not None:
+            if char in ' \t\r\n':
+                pending.append(char)
+                continue
+            if char not in '}]':
+                out.append(',')
+            out.extend(pending[1:])
+            pending = None
+        if char == ',':
+            pending = [',']
+            continue
+        if char == '"':
+            in_string = True
+        out.append(char)
+    if pending is not None:
+        out.extend(pending)
+    return ''.join(out)
+
+
+def _close_truncated(fragment: str) -> Optional[Dict[str, Any]]:
+    """Cut a truncated object back to its last complete value and close it"""
+    stack = []
+    in_string = escape = False
+    cut, cut_stack = None, None
+    for index, char in enumerate(fragment):
+        if in_string:
+            if escape:
+                escape = False
+            elif char == '\\':
+                escape = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in '{[':
+            stack.append('}' if char == '{' else ']')
+        elif char in '}]':
+            if stack:
+                stack.pop()
+            cut, cut_stack = index + 1, ''.join(reversed(stack))
+    if cut is None:
+        return None
+    try:
+        return json.loads(strip_trailing_commas(fragment[:cut] + cut_stack))
+    except json.JSONDecodeError:
+        return None
+
+
+def validate_component(component: Any) -> Optional[Dict[str, Any]]:
+    """Return the component with invalid sub-components removed, or None if unusable"""
+    if not isinstance(component, dict) or not isinstance(component.get("parent_component"), str):
+        return None
+    sub_components = [
+        sub for sub in component.get("sub_components") or []
+        if isinstance(sub, dict) and all(key in sub for key in REQUIRED_SUB_KEYS)
+        and isinstance(sub["test_cases"], list)
+    ]
+    if not sub_components:
+        return None
+    if len(sub_components) != len(component["sub_components"]):
+        component = dict(component, sub_components=sub_components)
+    return component
+
+
+def parse_response(response: str) -> ParseResult:
+    """Parse and validate an LLM response, repairing common defects.
+
+    Well-formed JSON takes the fast path. Anything else (code fences, prose
+    around the object, trailing commas, output truncated by max_tokens) is
+    scanned once; every complete component is kept and a truncated final
+    component is closed at its last complete value.
+    """
+    repaired = False
+    components = None
+    # Whole response first, then the outermost braces (strips fences and prose)
+    for candidate in (response, response[response.find('{'):response.rfind('}') + 1]):
+        try:
+            data = json.loads(candidate)
+        except json.JSONDecodeError:
+            repaired = True
+            continue
+        if isinstance(data, dict) and isinstance(data.get("components"), list):
+            components = data["components"]
+        break
+
+    if components is None:
+        repaired = True
+        parser = ComponentStreamParser()
+        components = parser.feed(response) + parser.finish()
+
+    valid = [component for component in map(validate_component, components) if component is not None]
+    dropped = len(components) - len(valid)
+    if not valid:
+        return ParseResult(None, repaired, dropped)
+    return ParseResult({"components": valid}, repaired or dropped > 0, dropped)
+
+
+def _legacy_parse(response: str) -> Optional[Dict[str, Any]]:
+    """Reference parser: whole-response json.loads, then the outermost braces, else nothing"""
+    for candidate in (response, response[response.find('{'):response.rfind('}') + 1]):
+        try:
+            data = json.loads(candidate)
+        except json.JSONDecodeError:
+            continue
+        return data if isinstance(data, dict) and all(map(validate_component, data.get("components", []))) else None
+    return None
+
+
+def sample_response(components: int = 12, sub_components: int = 3, test_cases: int = 4) -> str:
+    """A well-formed response of roughly the size a 4000-token generation produces"""
+    return json.dumps({"components": [
+        {
+            "parent_component": f"component-{c}",
+            "sub_components": [
+                {
+                    "summary": f"Verify behaviour {s} of component {c}",
+                    "priority": f"P{s % 3 + 1}",
+                    "tags": ["UI", "Functional"],
+                    "test_cases": [
+                        {"action": f"Step {t}: interact with \"control {t}\"",
+                         "expected_result": f"Control {t} responds as specified"}
+                        for t in range(test_cases)
+                    ]
+                }
+                for s in range(sub_components)
+            ]
+        }
+        for c in range(components)
+    ]}, indent=2)
+
+
+def malformed_variants(response: str) -> Dict[str, str]:
+    """Derive the defects seen in recorded completions from one valid response"""
+    variants = {
+        "valid": response,
+        "code fence": f"```json\n{response}\n```",
+        "prose wrapper": f"Here are the test cases:\n\n{response}\n\nLet me know if you need more.",
+        "trailing commas": re.sub(r'(["\]}])(\s*\n\s*[\]}])', r'\1,\2', response),
+    }
+    for fraction in (0.25, 0.5, 0.75, 0.95):
+        variants[f"truncated at {fraction:.0%}"] = response[:int(len(response) * fraction)]
+    return variants
+
+
+def load_corpus(paths: List[str]) -> Dict[str, str]:
+    """Read recorded responses from files or from every file in the given directories"""
+    corpus = {}
+    for path in paths:
+        files = [os.path.join(path, name) for name in sorted(os.listdir(path))] if os.path.isdir(path) else [path]
+        for file_path in files:
+            with open(file_path, encoding="utf-8") as f:
+                corpus[file_path] = f.read()
+    return corpus
+
+
+def benchmark(corpus: Dict[str, str], repeat: int = 20) -> List[Dict[str, Any]]:
+    """Compare components recovered and parse time of the legacy and tolerant parsers"""
+    rows = []
+    for name, response in corpus.items():
+        row = {"response": name, "chars": len(response)}
+        for label, parse in (("legacy", _legacy_parse), ("tolerant", lambda text: parse_response(text).data)):
+            start = time.perf_counter()
+            for _ in range(repeat):
+                data = parse(response)
+            row[f"{label}_ms"] = (time.perf_counter() - start) / repeat * 1000
+            row[f"{label}_components"] = len(data["components"]) if data else 0
+        rows.append(row)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark LLM response repair on malformed completions.")
+    parser.add_argument("corpus", nargs="*",
+                        help="Recorded responses (files or directories); defaults to a synthetic corpus")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus) if args.corpus else malformed_variants(sample_response())
+    rows = benchmark(corpus, args.repeat)
+    print(f"{'response':<28} {'chars':>7} {'legacy':>16} {'tolerant':>16}")
+    for row in rows:
+        print(f"{os.path.basename(row['response'])[:28]:<28} {row['chars']:>7} "
+              f"{row['legacy_components']:>4} {row['legacy_ms']:>8.2f} ms "
+              f"{row['tolerant_components']:>4} {row['tolerant_ms']:>8.2f} ms")
+    recovered = sum(row["tolerant_components"] for row in rows)
+    print(f"\nComponents recovered: legacy {sum(row['legacy_components'] for row in rows)}, tolerant {recovered}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+import gzip
+import json
+import os
+import re
+import time
+import uuid
+from typing import Any, Dict, Optional
+
+from atomic_file import atomic_writer
+
+# Where generated results live and how much disk they may use, overridable from env
+RESULTS_DIR = os.environ.get("RESULTS_DIR", "results")
+RESULTS_MAX_BYTES = int(os.environ.get("RESULTS_MAX_MB", "256")) * 1024 * 1024
+
+# Artifacts stored per result: kind -> file suffix
+ARTIFACTS = {"json": "json.gz", "summary": "txt.gz", "stats": "stats.json.gz"}
+
+_RESULT_ID_RE = re.compile(r'^[0-9a-f]{32}$')
+
+
+class ResultStore:
+    """Gzip-compressed on-disk store of generated suites, evicted oldest-first.
+
+    Each result is written as ``<id>.json.gz`` (the test cases), ``<id>.txt.gz``
+    (the summary), ``<id>.stats.json.gz`` (the summary statistics, when given)
+    and ``<id>.meta.json`` holding the timestamp and the uncompressed size of
+    each artifact.
+    """
+
+    def __init__(self, directory: str = RESULTS_DIR, max_bytes: int = RESULTS_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, result_id: str, suffix: str) -> str:
+        return os.path.join(self.directory, f"{result_id}.{suffix}")
+
+    @staticmethod
+    def _write_atomic(path: str, data: bytes, compress: bool):
+        with atomic_writer(path) as fp:
+            if compress:
+                with gzip.GzipFile(fileobj=fp, mode='wb', compresslevel=6, mtime=0) as gz:
+                    gz.write(data)
+            else:
+                fp.write(data)
+
+    def save(self, test_cases: Dict[str, Any], summary: str, timestamp: str,
+             stats: Optional[Dict[str, Any]] = None) -> str:
+        """Store a generated suite and return its result id"""
+        result_id = uuid.uuid4().hex
+        payloads = {
+            "json": json.dumps(test_cases, indent=2).encode('utf-8'),
+            "summary": summary.encode('utf-8')
+        }
+        if stats is not None:
+            payloads["stats"] = json.dumps(stats).encode('utf-8')
+        for kind, data in payloads.items():
+            self._write_atomic(self._path(result_id, ARTIFACTS[kind]), data, compress=True)
+
+        meta = {
+            "timestamp": timestamp,
+            "created": time.time(),
+            "sizes": {kind: len(data) for kind, data in payloads.items()}
+        }
+        self._write_atomic(self._path(result_id, "meta.json"), json.dumps(meta).encode('utf-8'), compress=False)
+        self.evict()
+        return result_id
+
+    def meta(self, result_id: str) -> Optional[Dict[str, Any]]:
+        """Return the metadata of a stored result, or None if unknown"""
+        if not _RESULT_ID_RE.match(result_id):
+            return None
+        try:
+            with open(self._path(result_id, "meta.json"), 'r', encoding='utf-8') as fp:
+                return json.load(fp)
+        except (OSError, ValueError):
+            return None
+
+    def open(self, result_id: str, kind: str):
+        """Open an artifact for reading as a seekable, decompressing stream"""
+        return gzip.open(self._path(result_id, ARTIFACTS[kind]), 'rb')
+
+    def load(self, result_id: str, kind: str = "json") -> Optional[bytes]:
+        meta = self.meta(result_id)
+        if meta is None or kind not in meta["sizes"]:
+            return None
+        with self.open(result_id, kind) as fp:
+            return fp.read()
+
+    def evict(self):
+        """Delete the oldest results until the store fits ``max_bytes``"""
+        results = {}
+        for name in os.listdir(self.directory):
+            result_id, _, suffix = name.partition('.')
+            if not _RESULT_ID_RE.match(result_id):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            created, size = results.get(result_id, (stat.st_mtime, 0))
+            results[result_id] = (min(created, stat.st_mtime), size + stat.st_size)
+
+        total = sum(size for _, size in results.values())
+        for result_id, (_, size) in sorted(results.items(), key=lambda item: item[1][0]):
+            if total <= self.max_bytes:
+                break
+            for suffix in (*ARTIFACTS.values(), "meta.json"):
+                try:
+                    os.remove(self._path(result_id, suffix))
+                except OSError:
+                    pass
+            total -= size
@@ -0,0 +1,345 @@
+"""Run mocha suites as parallel shards and merge their results.
+
+A suite is split into one shard per top-level ``describe`` block (or per file
+when a file has at most one, or its test titles cannot be read statically).
+Each shard selects its tests by their exact full titles. Shards are started longest-first according to
+the recorded duration history and run on a pool capped by the CPU count and
+by a browser semaphore shared between jobs, each in its own mocha process and therefore with its own browser session.
+Per-shard JSON reports are merged into one report with per-test timings,
+and the observed durations are fed back into the history.
+"""
+import json
+import os
+import re
+import shlex
+import signal
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from atomic_file import atomic_writer
+
+# How mocha is invoked, overridable for a global install or a different runner wrapper
+MOCHA_COMMAND = shlex.split(os.environ.get("MOCHA_COMMAND", "npx mocha"))
+# Where per-shard durations are remembered between runs
+HISTORY_PATH = os.environ.get("SHARD_HISTORY_PATH", os.path.join("uploads", ".shard_durations.json"))
+# Assumed duration of a test that has never run
+DEFAULT_TEST_SECONDS = 5.0
+
+_DESCRIBE_RE = re.compile(r"describe(?:\.only)?\s*\(\s*(['\"`])((?:\\.|(?!\1).)*)\1")
+_TEST_RE = re.compile(r"\b(?:it|test)(?:\.only)?\s*\(")
+_CALL_RE = re.compile(r"(describe|context|it|test|specify)(?:\.only|\.skip)?\s*(?=\()")
+_LITERAL_RE = re.compile(r"\(\s*(['\"])((?:\\.|(?!\1).)*)\1\s*[,)]|\(\s*`((?:\\.|[^`$\\])*)`\s*[,)]")
+_JS_SPECIAL_RE = re.compile(r"[\\^$.*+?()[\]{}|/]")
+
+
+class Shard(NamedTuple):
+    file: str
+    # Top-level describe title, or None for the whole file
+    title: Optional[str]
+    tests: int
+    # Full titles ("<describe> ... <test>") of every test the shard selects
+    titles: Tuple[str, ...] = ()
+
+    @property
+    def key(self) -> str:
+        return f"{os.path.basename(self.file)}::{self.title if self.title is not None else '*'}"
+
+
+class _Suite(NamedTuple):
+    # Top-level describe title -> full titles of the tests under it
+    blocks: Dict[str, List[str]]
+    # False when a title is computed, or tests sit outside any describe
+    static: bool
+
+
+def _scan_suite(source: str) -> _Suite:
+    """Collect full test titles per top-level describe, skipping strings and comments"""
+    blocks: Dict[str, List[str]] = {}
+    static = True
+    # Open describe calls as (title, depth outside their parenthesis)
+    stack: List[Tuple[Optional[str], int]] = []
+    depth = 0
+    index = 0
+    length = len(source)
+    while index < length:
+        char = source[index]
+        if source.startswith("//", index):
+            index = source.find("\n", index)
+            index = length if index == -1 else index
+            continue
+        if source.startswith("/*", index):
+            index = source.find("*/", index + 2)
+            index = length if index == -1 else index + 2
+            continue
+        if char in "'\"`":
+            end = index + 1
+            while end < length and source[end] != char:
+                end += 2 if source[end] == "\\" else 1
+            index = end + 1
+            continue
+        call = _CALL_RE.match(source, index)
+        if call and (index == 0 or not (source[index - 1].isalnum() or source[index - 1] in "_.$")):
+            literal = _LITERAL_RE.match(source, call.end())
+            title = None
+            if literal:
+                title = re.sub(r"\\(.)", r"\1", literal.group(2) if literal.group(2) is not None else literal.group(3))
+            if call.group(1) in ("describe", "context"):
+                if not stack and title is not None:
+                    blocks.setdefault(title, [])
+                stack.append((title, depth))
+            elif title is None or not stack or any(parent is None for parent, _ in stack):
+                static = False
+            else:
+                blocks[stack[0][0]].append(" ".join([parent for parent, _ in stack] + [title]))
+            if title is None:
+                static = False
+            # Continue at the parenthesis so it is counted below
+            index = call.end()
+            continue
+        if char in "{([":
+            depth += 1
+        elif char in "})]":
+            depth -= 1
+            if stack and char == ")" and depth == stack[-1][1]:
+                stack.pop()
+        index += 1
+    return _Suite(blocks, static)
+
+
+def is_mocha_suite(path: str) -> bool:
+    """Whether a script is a mocha-style suite rather than a plain node script"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return bool(_DESCRIBE_RE.search(f.read()))
+    except (OSError, UnicodeDecodeError):
+        return False
+
+
+def find_shards(files: List[str]) -> List[Shard]:
+    """One shard per top-level describe, or per file when its tests cannot be listed exactly.
+
+    Every test belongs to exactly one shard: a file whose full test titles
+    are computed at runtime, sit outside a describe, or repeat across blocks
+    is run as a single shard.
+    """
+    shards = []
+    for path in files:
+        with open(path, "r", encoding="utf-8") as f:
+            source = f.read()
+        suite = _scan_suite(source)
+        titles = [title for tests in suite.blocks.values() for title in tests]
+        if not suite.static or len(suite.blocks) <= 1 or len(set(titles)) != len(titles):
+            shards.append(Shard(path, None, len(_TEST_RE.findall(source))))
+            continue
+        shards.extend(Shard(path, title, len(tests), tuple(tests))
+                      for title, tests in suite.blocks.items() if tests)
+    return shards
+
+
+class DurationHistory:
+    """Smoothed wall-clock seconds per shard, stored as JSON"""
+
+    def __init__(self, path: str = HISTORY_PATH, smoothing: float = 0.5):
+        self.path = path
+        self.smoothing = smoothing
+        self._lock = threading.Lock()
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                self._durations: Dict[str, float] = json.load(f)
+        except (OSError, ValueError):
+            self._durations = {}
+
+    def estimate(self, shard: Shard) -> float:
+        if shard.key in self._durations:
+            return self._durations[shard.key]
+        return max(shard.tests, 1) * DEFAULT_TEST_SECONDS
+
+    def update(self, durations: Dict[str, float]):
+        with self._lock:
+            for key, seconds in durations.items():
+                previous = self._durations.get(key)
+                self._durations[key] = seconds if previous is None else \
+                    self.smoothing * seconds + (1 - self.smoothing) * previous
+            directory = os.path.dirname(self.path) or "."
+            os.makedirs(directory, exist_ok=True)
+            with atomic_writer(self.path, directory, mode="w", encoding="utf-8") as f:
+                json.dump(self._durations, f, indent=2, sort_keys=True)
+
+
+def kill_process_group(process: subprocess.Popen):
+    """Kill a child started with ``start_new_session`` along with mocha, chromedriver and the browsers it spawned"""
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        # The whole group has already exited
+        pass
+
+
+def default_workers() -> int:
+    return max(1, min(os.cpu_count() or 1, int(os.environ.get("SHARD_WORKERS", os.cpu_count() or 1))))
+
+
+def _shard_command(shard: Shard, report_path: str) -> List[str]:
+    command = MOCHA_COMMAND + [shard.file, "--reporter", "json", "--reporter-option", f"output={report_path}"]
+    if shard.title is not None:
+        # mocha matches --grep against each test's full title; anchoring on the complete
+        # titles keeps "Login" from also selecting the tests of "Login form"
+        pattern = "|".join(_JS_SPECIAL_RE.sub(lambda match: "\\" + match.group(0), title) for title in shard.titles)
+        command += ["--grep", f"^(?:{pattern})$"]
+    return command
+
+
+def _run_shard(index: int, count: int, shard: Shard, deadline: float, slots: Optional[threading.Semaphore],
+               on_output: Callable[[str], None]) -> Dict[str, Any]:
+    """Run one shard once a browser slot is free, within what is left of ``deadline`` (monotonic)"""
+    if slots is not None:
+        slots.acquire()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            report_path = os.path.join(tmp, "report.json")
+            env = dict(os.environ, SHARD_INDEX=str(index), SHARD_COUNT=str(count), HEADLESS="1")
+            start = time.monotonic()
+            remaining = deadline - start
+            if remaining <= 0:
+                return {"shard": shard, "seconds": 0.0, "status": "timeout",
+                        "stderr": "The job ran out of time before this shard started", "report": None}
+            try:
+                # A session of its own lets a timeout kill the browsers too, which would otherwise
+                # keep the output pipe open long after the deadline
+                process = subprocess.Popen(_shard_command(shard, report_path), env=env, stdout=subprocess.PIPE,
+                                           stderr=subprocess.PIPE, text=True, errors="replace", bufsize=1,
+                                           start_new_session=True)
+            except OSError as e:
+                return {"shard": shard, "seconds": 0.0, "status": "error", "stderr": str(e), "report": None}
+
+            timed_out = threading.Event()
+
+            def kill():
+                timed_out.set()
+                kill_process_group(process)
+
+            timer = threading.Timer(remaining, kill)
+            timer.start()
+            stderr: List[str] = []
+            stderr_reader = threading.Thread(target=lambda: stderr.extend(process.stderr), daemon=True)
+            stderr_reader.start()
+            try:
+                # Forward output as it is produced so the job can be followed live
+                for line in process.stdout:
+                    on_output(f"[{shard.key}] {line}")
+                process.wait()
+                stderr_reader.join()
+            finally:
+                timer.cancel()
+                # Also reaps browsers left behind by a shard that exited on its own
+                kill_process_group(process)
+                process.wait()
+            seconds = time.monotonic() - start
+
+            status = None
+            if timed_out.is_set():
+                status = "timeout"
+                stderr = [f"Timed out after {remaining:.0f} seconds"]
+            try:
+                with open(report_path, "r", encoding="utf-8") as f:
+                    report = json.load(f)
+            except (OSError, ValueError):
+                report = None
+    finally:
+        if slots is not None:
+            slots.release()
+
+    if report is None and status is None:
+        status = "error"
+    return {"shard": shard, "seconds": seconds, "status": status, "stderr": "".join(stderr), "report": report}
+
+
+def merge_reports(results: List[Dict[str, Any]], wall_seconds: float) -> Dict[str, Any]:
+    """Combine per-shard mocha JSON reports into one report"""
+    tests, shards = [], []
+    # (file, full title) of every test already reported, to catch a test selected by two shards
+    seen = set()
+    duplicates = 0
+    for result in results:
+        shard = result["shard"]
+        report = result["report"] or {}
+        pending = {test["fullTitle"] for test in report.get("pending", [])}
+        for test in report.get("tests", []):
+            identity = (os.path.abspath(test.get("file") or shard.file), test["fullTitle"])
+            if identity in seen:
+                duplicates += 1
+                continue
+            seen.add(identity)
+            if test["fullTitle"] in pending:
+                state = "pending"
+            elif test.get("err"):
+                state = "failed"
+            else:
+                state = "passed"
+            tests.append({
+                "shard": shard.key,
+                "file": test.get("file") or shard.file,
+                "title": test["fullTitle"],
+                "state": state,
+                "duration_ms": test.get("duration"),
+                "error": (test.get("err") or {}).get("message"),
+            })
+        shards.append({
+            "shard": shard.key,
+            "seconds": round(result["seconds"], 3),
+            "status": result["status"] or ("failed" if report.get("stats", {}).get("failures") else "passed"),
+            "error": result["stderr"].strip() if result["status"] else None,
+        })
+
+    states = [test["state"] for test in tests]
+    return {
+        "stats": {
+            "tests": len(tests),
+            "passes": states.count("passed"),
+            "failures": states.count("failed"),
+            "pending": states.count("pending"),
+            "shards": len(shards),
+            "shard_errors": sum(1 for shard in shards if shard["status"] in ("error", "timeout")),
+            # Tests reported by more than one shard, counted once above
+            "duplicates": duplicates,
+            "wall_seconds": round(wall_seconds, 3),
+            "shard_seconds": round(sum(shard["seconds"] for shard in shards), 3),
+        },
+        "shards": shards,
+        "tests": tests,
+    }
+
+
+def run_sharded(files: List[str], workers: Optional[int] = None, timeout: float = 300,
+                history: Optional[DurationHistory] = None, slots: Optional[threading.Semaphore] = None,
+                on_output: Callable[[str], None] = lambda line: None) -> Dict[str, Any]:
+    """Shard ``files``, run the shards in parallel and return the merged report.
+
+    ``timeout`` bounds the whole run: each shard gets only the time left when
+    it starts. ``slots`` is shared by every caller that launches browsers, so
+    concurrent runs together never exceed its size.
+    """
+    history = history or DurationHistory()
+    shards = find_shards(files)
+    # Longest first, so the pool ends with short shards and finishes evenly
+    shards.sort(key=history.estimate, reverse=True)
+    workers = max(1, min(workers or default_workers(), len(shards)))
+    on_output(f"Running {len(shards)} shard(s) on {workers} worker(s)\n")
+
+    start = time.monotonic()
+    deadline = start + timeout
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_run_shard, index, len(shards), shard, deadline, slots, on_output)
+                   for index, shard in enumerate(shards)]
+        results = [future.result() for future in futures]
+    report = merge_reports(results, time.monotonic() - start)
+
+    history.update({result["shard"].key: result["seconds"] for result in results if result["status"] is None})
+    on_output(f"{report['stats']['passes']} passed, {report['stats']['failures']} failed, "
+              f"{report['stats']['pending']} pending in {report['stats']['wall_seconds']}s "
+              f"({report['stats']['shard_seconds']}s of shard time)\n")
+    return report
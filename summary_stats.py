@@ -0,0 +1,147 @@
+import html
+import json
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+# Display names of the priorities the prompt asks for; any other value is listed after these
+PRIORITY_LABELS = {"P1": "Critical", "P2": "Important", "P3": "Nice-to-have"}
+
+
+class SummaryStats:
+    """Aggregated counts of a generated suite, built in one pass over its components.
+
+    Components can be added one at a time as they are streamed, and the model
+    round-trips through ``to_dict``/``from_dict`` so it can be stored with the
+    result instead of being recomputed from the test cases.
+    """
+
+    def __init__(self):
+        self.total_test_cases = 0
+        self.priorities: Counter = Counter({priority: 0 for priority in PRIORITY_LABELS})
+        self.tags: Counter = Counter()
+        # One entry per component: name, test case count and (summary, tests, priority) per sub-component
+        self.components: List[Dict[str, Any]] = []
+
+    @property
+    def total_components(self) -> int:
+        return len(self.components)
+
+    def add_component(self, component: Dict[str, Any]):
+        subs = []
+        component_cases = 0
+        for sub in component["sub_components"]:
+            cases = len(sub["test_cases"])
+            priority = str(sub["priority"])
+            tags = sub["tags"] if isinstance(sub["tags"], list) else [sub["tags"]]
+            component_cases += cases
+            self.priorities[priority] += cases
+            for tag in tags:
+                self.tags[str(tag)] += cases
+            subs.append([sub["summary"][:50], cases, priority])
+
+        self.total_test_cases += component_cases
+        self.components.append({
+            "name": component["parent_component"],
+            "test_cases": component_cases,
+            "sub_components": subs
+        })
+
+    @classmethod
+    def from_test_cases(cls, test_cases: Dict[str, Any]) -> "SummaryStats":
+        stats = cls()
+        for component in test_cases["components"]:
+            stats.add_component(component)
+        return stats
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "total_components": self.total_components,
+            "total_test_cases": self.total_test_cases,
+            "priorities": dict(self.priorities),
+            "tags": dict(sorted(self.tags.items())),
+            "components": self.components
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SummaryStats":
+        stats = cls()
+        stats.total_test_cases = data["total_test_cases"]
+        stats.priorities.update(data["priorities"])
+        stats.tags.update(data["tags"])
+        stats.components = data["components"]
+        return stats
+
+
+def _priority_rows(stats: SummaryStats):
+    for priority, count in stats.priorities.items():
+        label = PRIORITY_LABELS.get(priority)
+        yield (f"{label} ({priority})" if label else priority), count
+
+
+def render_text(stats: SummaryStats) -> str:
+    """Plain-text report, as shown in the UI and offered for download"""
+    lines = [
+        "",
+        "=== Test Case Generation Summary ===",
+        "",
+        "📊 Overall Statistics:",
+        f"- Total Components: {stats.total_components}",
+        f"- Total Test Cases: {stats.total_test_cases}",
+        "",
+        "🎯 Priority Distribution:",
+    ]
+    lines.extend(f"- {label}: {count} test cases" for label, count in _priority_rows(stats))
+
+    lines.extend(["", "🏷 Tag Coverage:"])
+    lines.extend(f"- {tag}: {stats.tags[tag]} test cases" for tag in sorted(stats.tags))
+
+    lines.extend(["", "📝 Component Breakdown:"])
+    for component in stats.components:
+        lines.extend([
+            "",
+            f"🔹 {component['name'].upper()}",
+            f"  - Sub-components: {len(component['sub_components'])}",
+            f"  - Total test cases: {component['test_cases']}"
+        ])
+        lines.extend(f"  - {summary}... ({cases} tests, {priority})"
+                     for summary, cases, priority in component["sub_components"])
+    return "\n".join(lines)
+
+
+def render_json(stats: SummaryStats, indent: Optional[int] = 2) -> str:
+    return json.dumps(stats.to_dict(), indent=indent)
+
+
+def render_html(stats: SummaryStats) -> str:
+    """Standalone HTML report"""
+    escape = html.escape
+    parts = [
+        "<!DOCTYPE html>",
+        "<html><head><meta charset=\"utf-8\"><title>Test Case Generation Summary</title></head><body>",
+        "<h1>Test Case Generation Summary</h1>",
+        "<h2>Overall Statistics</h2>",
+        f"<ul><li>Total Components: {stats.total_components}</li>"
+        f"<li>Total Test Cases: {stats.total_test_cases}</li></ul>",
+        "<h2>Priority Distribution</h2>",
+        "<table><tr><th>Priority</th><th>Test cases</th></tr>",
+    ]
+    parts.extend(f"<tr><td>{escape(label)}</td><td>{count}</td></tr>" for label, count in _priority_rows(stats))
+    parts.append("</table><h2>Tag Coverage</h2><table><tr><th>Tag</th><th>Test cases</th></tr>")
+    parts.extend(f"<tr><td>{escape(tag)}</td><td>{stats.tags[tag]}</td></tr>" for tag in sorted(stats.tags))
+    parts.append("</table><h2>Component Breakdown</h2>")
+    for component in stats.components:
+        parts.append(f"<h3>{escape(component['name'])}</h3>"
+                     f"<p>{len(component['sub_components'])} sub-components, "
+                     f"{component['test_cases']} test cases</p><ul>")
+        parts.extend(f"<li>{escape(summary)}&hellip; ({cases} tests, {escape(priority)})</li>"
+                     for summary, cases, priority in component["sub_components"])
+        parts.append("</ul>")
+    parts.append("</body></html>")
+    return "\n".join(parts)
+
+
+RENDERERS = {
+    "text": (render_text, "text/plain", "txt"),
+    "json": (render_json, "application/json", "json"),
+    "html": (render_html, "text/html", "html"),
+}
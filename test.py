@@ -1,16 +1,35 @@
 import os
-import subprocess
+import threading
 
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request
 from flask_cors import CORS
 
+from job_runner import JobRunner
+from shard_runner import is_mocha_suite
+from upload_store import UploadStore, target_fingerprint
+from metrics import Gauge, instrument_app
+
 app = Flask(__name__)
+instrument_app(app, "runner")
 # Enable CORS for all routes and origins
 CORS(app, resources={r"/*": {"origins": "*"}})
 
 # Directory to save uploaded test files
 UPLOAD_FOLDER = 'uploads'
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+# Uploads stored by content hash, with finished results kept for identical re-submissions
+store = UploadStore(UPLOAD_FOLDER)
+# Result key -> id of the job currently producing that result
+inflight = {}
+inflight_lock = threading.Lock()
+
+# Fixed-size pool of test runs so concurrent uploads cannot spawn unbounded browsers
+runner = JobRunner(
+    max_workers=int(os.environ.get('RUNNER_WORKERS', 2)),
+    timeout=float(os.environ.get('RUNNER_TIMEOUT', 300))
+)
+Gauge('testgen_runner_queue_depth', 'Test runs waiting for a worker', callback=runner.queue_depth)
+Gauge('testgen_runner_running', 'Test runs currently executing', callback=runner.running)
 
 @app.route('/upload', methods=['POST'])
 def upload_file():
@@ -32,28 +51,87 @@ def upload_file():
 
     print(f"Received file: {file.filename}")
     
-    # Save the uploaded file
-    file_path = os.path.join(UPLOAD_FOLDER, file.filename)
-    file.save(file_path)
+    # Save the uploaded file under its content hash
+    data = file.read()
+    file_path = store.put(data, file.filename)
     print(f"File saved to {file_path}")
 
-    # Run the Selenium test
-    try:
-        print(f"Running command: node {file_path}")
-        result = subprocess.run(['node', file_path], capture_output=True, text=True)
-        output = result.stdout
-        error = result.stderr
-        print(f"Command return code: {result.returncode}")
-        print(f"Command output: {output}")
-        print(f"Command error: {error}")
-
-        if result.returncode == 0:
-            return jsonify({'message': 'Test executed successfully', 'output': output, 'file_path': file_path}), 200
+    # Mocha suites run as parallel shards unless shard=0 is passed
+    sharded = flag('shard', default=True) and is_mocha_suite(file_path)
+    # The same script against an unchanged target reuses the last result; fresh=1 forces a new run.
+    # Reuse is opt-in: pass target=<build id>, or fingerprint=1 to have the pages the script opens fetched
+    fingerprint = request.values.get('target') or (target_fingerprint(data) if flag('fingerprint') else None)
+    key = store.result_key(file_path, 'mocha' if sharded else 'node', fingerprint) \
+        if fingerprint is not None else None
+
+    if key and not flag('fresh'):
+        result = store.get_result(key)
+        if result is not None:
+            print(f"Reusing result of job {result['job_id']} for {file_path}")
+            return result_response(dict(result, cached=True), file_path)
+
+    def record(job):
+        store.put_result(key, job.to_dict())
+        with inflight_lock:
+            if inflight.get(key) == job.id:
+                del inflight[key]
+
+    with inflight_lock:
+        # Identical submissions while a run is in progress share that run
+        job = runner.get(inflight.get(key)) if key and not flag('fresh') else None
+        if job is None or job.done:
+            on_done = record if key else None
+            if sharded:
+                job = runner.submit_suite([file_path], on_done=on_done)
+            else:
+                job = runner.submit(file_path, on_done=on_done)
+            if key:
+                inflight[key] = job.id
+            print(f"Queued job {job.id}: {' '.join(job.command)}")
         else:
-            return jsonify({'error': 'Test execution failed', 'details': error}), 500
-    except Exception as e:
-        print(f"Exception occurred: {str(e)}")
-        return jsonify({'error': str(e)}), 500
+            print(f"Joining running job {job.id} for {file_path}")
+
+    # Pass wait=1 to block until the run finishes
+    if flag('wait'):
+        job = runner.wait(job.id)
+        print(f"Job {job.id} finished with status {job.status}")
+        return result_response(dict(job.to_dict(), cached=False), file_path)
+
+    return jsonify({
+        'message': 'Test queued',
+        'job_id': job.id,
+        'file_path': file_path,
+        'status_url': f'/jobs/{job.id}',
+        'stream_url': f'/jobs/{job.id}/stream'
+    }), 202
+
+def flag(name, default=False):
+    value = request.values.get(name)
+    if value is None or value == '':
+        return default
+    return value not in ('0', 'false')
+
+def result_response(result, file_path):
+    if result['status'] == 'passed':
+        return jsonify({'message': 'Test executed successfully', 'output': result['output'],
+                        'file_path': file_path, 'job_id': result['job_id'], 'report': result['report'],
+                        'cached': result['cached']}), 200
+    return jsonify({'error': 'Test execution failed', 'details': result['error'],
+                    'job_id': result['job_id'], 'report': result['report'], 'cached': result['cached']}), 500
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    job = runner.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    return jsonify(job.to_dict()), 200
+
+@app.route('/jobs/<job_id>/stream', methods=['GET'])
+def job_stream(job_id):
+    # Live stdout of the job, flushed line by line until it finishes
+    if runner.get(job_id) is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    return Response(runner.follow(job_id), mimetype='text/plain')
 
 # Simple test endpoint
 @app.route('/test', methods=['GET'])
@@ -1,11 +1,22 @@
-from flask import Flask, render_template, request, jsonify, send_file, Response
+from flask import Flask, render_template, request, jsonify, Response, stream_with_context
+import asyncio
 import json
 import logging
 import os
+import time
 from datetime import datetime
-from typing import Any, Dict, List
-import io
-from groq import Groq
+from typing import Any, Dict, Iterator
+from groq import AsyncGroq, Groq
+
+from dedup import deduplicate
+from fanout import RateLimiter, generate_fanout
+from figma_diff import generate_incremental
+from generation_cache import GenerationCache, cache_from_env, make_key
+from metrics import CACHE_REQUESTS, LLM_TOKENS, instrument_app, observe_stage, span
+from prompt_compactor import compact_ui_description, estimate_tokens
+from response_parser import ComponentStreamParser, parse_response, validate_component
+from result_store import ResultStore
+from summary_stats import RENDERERS, SummaryStats, render_text
 
 # Configure logging
 logging.basicConfig(
@@ -18,71 +29,15 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
+instrument_app(app, "generator")
 
-class TestCaseGenerator:
-    """Generates test cases using Groq API"""
-    def __init__(self):
-        # API key should ideally be stored as an environment variable
-        api_key = os.environ.get("GROQ_API_KEY", "your_api_key_here")
-        self.client = Groq(api_key=api_key)
-        self.model = "llama-3.3-70b-versatile"
-
-    def _generate_with_groq(self, prompt: str) -> str:
-        """Generate test cases using Groq API with better error handling"""
-        try:
-            completion = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a test automation expert. Always respond with valid JSON following the specified structure."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                temperature=0.2,
-                max_tokens=4000
-            )
-            
-            # Debug logging
-            logger.info("Raw API Response received")
-            response_content = completion.choices[0].message.content
-            logger.info(f"Response content type: {type(response_content)}")
-            
-            # Try to clean the response if it's not pure JSON
-            cleaned_response = self._clean_response(response_content)
-            return cleaned_response
+# Bytes read from a stored artifact per streamed download chunk
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
 
-        except Exception as e:
-            logger.error(f"Error in Groq API call: {str(e)}")
-            raise
+SYSTEM_PROMPT = "You are a test automation expert. Always respond with valid JSON following the specified structure."
 
-    def _clean_response(self, response: str) -> str:
-        """Clean the API response to ensure valid JSON"""
-        try:
-            # If response is already valid JSON, return it
-            json.loads(response)
-            return response
-        except json.JSONDecodeError:
-            logger.info("Cleaning malformed JSON response")
-            
-            # Try to extract JSON content between curly braces
-            try:
-                start_idx = response.find('{')
-                end_idx = response.rfind('}') + 1
-                if start_idx != -1 and end_idx != 0:
-                    cleaned = response[start_idx:end_idx]
-                    # Validate the cleaned JSON
-                    json.loads(cleaned)
-                    return cleaned
-            except:
-                pass
-
-            # If extraction failed, return a minimal valid structure
-            logger.warning("Falling back to minimal structure")
-            return '''
+# Used by _clean_response when no JSON could be recovered
+FALLBACK_RESPONSE = '''
             {
               "components": [
                 {
@@ -105,22 +60,235 @@ class TestCaseGenerator:
             }
             '''
 
+class TestCaseGenerator:
+    """Generates test cases using Groq API"""
+    def __init__(self, cache: GenerationCache = None, fanout_workers: int = 4,
+                 requests_per_minute: float = 30, prompt_token_budget: int = 6000,
+                 dedup_threshold: float = 0.8):
+        # API key should ideally be stored as an environment variable
+        api_key = os.environ.get("GROQ_API_KEY", "your_api_key_here")
+        self.client = Groq(api_key=api_key)
+        self.async_client = AsyncGroq(api_key=api_key)
+        self.model = "llama-3.3-70b-versatile"
+        self.temperature = 0.2
+        self.max_tokens = 4000
+        self.cache = cache
+        self.fanout_workers = fanout_workers
+        self.prompt_token_budget = prompt_token_budget
+        self.rate_limiter = RateLimiter(requests_per_minute)
+        # Similarity above which test cases are collapsed; 0 disables deduplication
+        self.dedup_threshold = dedup_threshold
+
+    def _cache_key(self, prompt: str):
+        if self.cache is None:
+            return None
+        return make_key(prompt, self.model, self.temperature,
+                        max_tokens=self.max_tokens, system=SYSTEM_PROMPT)
+
+    def _completion_params(self, prompt: str) -> Dict[str, Any]:
+        return dict(
+            model=self.model,
+            messages=[
+                {
+                    "role": "system",
+                    "content": SYSTEM_PROMPT
+                },
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ],
+            temperature=self.temperature,
+            max_tokens=self.max_tokens
+        )
+
+    def _create_completion(self, prompt: str, stream: bool = False):
+        return self.client.chat.completions.create(stream=stream, **self._completion_params(prompt))
+
+    def _cached(self, cache_key):
+        if cache_key is None:
+            return None
+        cached = self.cache.get(cache_key)
+        CACHE_REQUESTS.inc(cache="generation", result="miss" if cached is None else "hit")
+        return cached
+
+    @staticmethod
+    def _record_usage(usage, prompt: str, response: str):
+        # Groq reports exact counts; fall back to the compactor's estimate without them
+        if usage is not None:
+            LLM_TOKENS.inc(usage.prompt_tokens, kind="prompt")
+            LLM_TOKENS.inc(usage.completion_tokens, kind="completion")
+        else:
+            LLM_TOKENS.inc(estimate_tokens(SYSTEM_PROMPT + prompt), kind="prompt")
+            LLM_TOKENS.inc(estimate_tokens(response), kind="completion")
+
+    @staticmethod
+    def _load_cached(cached: str) -> Dict[str, Any]:
+        # Entries are only written after parsing and validation, so plain json.loads suffices
+        try:
+            return json.loads(cached)
+        except json.JSONDecodeError:
+            result = parse_response(cached)
+            if result.data is None:
+                raise ValueError("Invalid test case structure: no valid components")
+            return result.data
+
+    def _generate_with_groq(self, prompt: str) -> Dict[str, Any]:
+        """Generate test cases using Groq API with better error handling"""
+        cache_key = self._cache_key(prompt)
+        cached = self._cached(cache_key)
+        if cached is not None:
+            logger.info("Returning cached test cases")
+            return self._load_cached(cached)
+
+        try:
+            with span("llm_call"):
+                completion = self._create_completion(prompt)
+            
+            # Debug logging
+            logger.info("Raw API Response received")
+            response_content = completion.choices[0].message.content
+            self._record_usage(getattr(completion, "usage", None), prompt, response_content)
+            logger.info(f"Response content type: {type(response_content)}")
+            
+            # Try to clean the response if it's not pure JSON
+            return self._clean_response(response_content, cache_key)
+
+        except Exception as e:
+            logger.error(f"Error in Groq API call: {str(e)}")
+            raise
+
+    def _clean_response(self, response: str, cache_key=None) -> Dict[str, Any]:
+        """Parse and validate the API response once, keeping every complete component"""
+        with span("parse"):
+            result = parse_response(response)
+        if result.data is None:
+            # Nothing usable could be recovered; never memoize the fallback, so the next request retries
+            logger.warning("Falling back to minimal structure")
+            return json.loads(FALLBACK_RESPONSE)
+        if result.repaired:
+            logger.info(f"Repaired malformed JSON response: kept {len(result.data['components'])} "
+                        f"component(s), dropped {result.dropped}")
+            response = json.dumps(result.data)
+        if cache_key is not None:
+            self.cache.set(cache_key, response)
+        return result.data
+
     def generate_test_cases(self, ui_description: str, srs_description: str) -> Dict[str, Any]:
         """Generate test cases with enhanced error handling"""
         try:
             combined_prompt = self._create_prompt(ui_description, srs_description)
-            response = self._generate_with_groq(combined_prompt)
-            
-            # Log the response for debugging
-            logger.info("Attempting to parse response")
-            
-            structured_test_cases = self._structure_response(response)
-            return structured_test_cases
+            return self._generate_with_groq(combined_prompt)
         except Exception as e:
             logger.error(f"Error generating test cases: {str(e)}")
             raise
 
+    async def agenerate_test_cases(self, ui_description: str, srs_description: str) -> Dict[str, Any]:
+        """Async variant of generate_test_cases using the async Groq client"""
+        try:
+            # Compaction, the SQLite cache and parsing are CPU or disk bound; keep them off the event loop
+            prompt = await asyncio.to_thread(self._create_prompt, ui_description, srs_description)
+            cache_key = self._cache_key(prompt)
+            cached = await asyncio.to_thread(self._cached, cache_key)
+            if cached is not None:
+                logger.info("Returning cached test cases")
+                return await asyncio.to_thread(self._load_cached, cached)
+
+            with span("llm_call"):
+                completion = await self.async_client.chat.completions.create(**self._completion_params(prompt))
+            response_content = completion.choices[0].message.content
+            self._record_usage(getattr(completion, "usage", None), prompt, response_content)
+            return await asyncio.to_thread(self._clean_response, response_content, cache_key)
+        except Exception as e:
+            logger.error(f"Error generating test cases: {str(e)}")
+            raise
+
+    def generate_test_cases_fanout(self, ui_description: str, srs_description: str) -> Dict[str, Any]:
+        """Generate test cases per top-level component concurrently and merge them"""
+        return generate_fanout(self, ui_description, srs_description,
+                               max_workers=self.fanout_workers, rate_limiter=self.rate_limiter)
+
+    def generate_test_cases_incremental(self, old_doc: Dict[str, Any], new_doc: Dict[str, Any],
+                                        srs_description: str, previous: Dict[str, Any] = None) -> Dict[str, Any]:
+        """Regenerate only the components of ``new_doc`` that changed since ``old_doc``"""
+        return generate_incremental(self, old_doc, new_doc, srs_description, previous=previous,
+                                    max_workers=self.fanout_workers, rate_limiter=self.rate_limiter)
+
+    def stream_test_cases(self, ui_description: str, srs_description: str) -> Iterator[Dict[str, Any]]:
+        """Yield each generated component as soon as the model finishes it"""
+        prompt = self._create_prompt(ui_description, srs_description)
+        cache_key = self._cache_key(prompt)
+        cached = self._cached(cache_key)
+        if cached is not None:
+            logger.info("Returning cached test cases")
+            yield from self._load_cached(cached)["components"]
+            return
+
+        parser = ComponentStreamParser()
+        chunks = []
+        emitted = []
+        usage = None
+        start = time.perf_counter()
+        try:
+            for chunk in self._create_completion(prompt, stream=True):
+                # Groq attaches usage to the final chunk of a stream
+                x_groq = getattr(chunk, "x_groq", None)
+                usage = getattr(x_groq, "usage", None) or usage
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content or ""
+                # The first chunk usually carries only the role, with no content
+                if not delta:
+                    continue
+                if not chunks:
+                    observe_stage("llm_first_token", time.perf_counter() - start)
+                chunks.append(delta)
+                for component in parser.feed(delta):
+                    component = validate_component(component)
+                    if component is not None:
+                        emitted.append(component)
+                        yield component
+        except Exception as e:
+            logger.error(f"Error in Groq streaming call: {str(e)}")
+            raise
+        # Includes the time spent handing components to the consumer
+        observe_stage("llm_call", time.perf_counter() - start)
+        self._record_usage(usage, prompt, "".join(chunks))
+
+        # A completion cut off by max_tokens still yields its last partial component
+        for component in map(validate_component, parser.finish()):
+            if component is not None:
+                emitted.append(component)
+                yield component
+
+        if emitted:
+            # The components were already validated one by one; no need to parse the text again
+            if cache_key is not None:
+                self.cache.set(cache_key, json.dumps({"components": emitted}))
+            return
+        # Nothing could be picked out incrementally, so emit the cleaned result
+        yield from self._clean_response("".join(chunks), cache_key)["components"]
+
+    def deduplicate(self, test_cases: Dict[str, Any]) -> Dict[str, Any]:
+        """Collapse duplicate and near-duplicate test cases across the suite"""
+        if not self.dedup_threshold:
+            return test_cases
+        with span("dedup"):
+            test_cases, report = deduplicate(test_cases, self.dedup_threshold)
+        if report.removed:
+            logger.info(f"Removed {report.removed} of {report.test_cases_before} test cases "
+                        f"({report.exact_duplicates} exact, {report.near_duplicates} near duplicates)")
+        return test_cases
+
     def _create_prompt(self, ui_description: str, srs_description: str) -> str:
+        # Raw Figma JSON is reduced to a deduplicated outline within the token budget
+        with span("prompt_build"):
+            compaction = compact_ui_description(ui_description, self.prompt_token_budget)
+        if compaction.saved_tokens:
+            logger.info(f"Compacted UI description from ~{compaction.original_tokens} to "
+                        f"~{compaction.compact_tokens} tokens ({compaction.saved_tokens} saved)")
+        ui_description = compaction.text
+
         return f"""Generate test cases in valid JSON format for the following UI and SRS descriptions.
 The response must be a valid JSON object and nothing else.
 
@@ -154,89 +322,23 @@ The response must strictly follow this JSON structure:
 
 Generate comprehensive test cases for each component mentioned in the UI description, following the requirements in the SRS."""
 
-    def _structure_response(self, response: str) -> Dict[str, Any]:
-        """Structure the API response into required format"""
-        try:
-            test_cases = json.loads(response)
-            self._validate_structure(test_cases)
-            return test_cases
-        except json.JSONDecodeError as e:
-            logger.error(f"Error parsing JSON response: {str(e)}")
-            raise
-        except Exception as e:
-            logger.error(f"Error structuring response: {str(e)}")
-            raise
-
-    def _validate_structure(self, test_cases: Dict[str, Any]):
-        """Validate the test case structure"""
-        required_keys = {"components"}
-        if not all(key in test_cases for key in required_keys):
-            raise ValueError("Invalid test case structure: missing required keys")
-
-        for component in test_cases["components"]:
-            if "parent_component" not in component or "sub_components" not in component:
-                raise ValueError("Invalid component structure")
-
-            for sub_component in component["sub_components"]:
-                required_sub_keys = {"summary", "priority", "tags", "test_cases"}
-                if not all(key in sub_component for key in required_sub_keys):
-                    raise ValueError("Invalid sub-component structure")
-
-    def generate_detailed_summary(self, test_cases: Dict[str, Any]) -> str:
+    def generate_detailed_summary(self, test_cases: Dict[str, Any], stats: SummaryStats = None) -> str:
         """Generate a detailed summary of test cases"""
-        summary = "\n=== Test Case Generation Summary ===\n"
-        
-        # Overall statistics
-        total_components = len(test_cases['components'])
-        total_test_cases = sum(
-            len(sub['test_cases']) 
-            for component in test_cases['components'] 
-            for sub in component['sub_components']
-        )
-        
-        summary += f"\n📊 Overall Statistics:"
-        summary += f"\n- Total Components: {total_components}"
-        summary += f"\n- Total Test Cases: {total_test_cases}"
-        
-        # Priority distribution
-        priority_count = {"P1": 0, "P2": 0, "P3": 0}
-        for component in test_cases['components']:
-            for sub in component['sub_components']:
-                priority_count[sub['priority']] += len(sub['test_cases'])
-        
-        summary += f"\n\n🎯 Priority Distribution:"
-        summary += f"\n- Critical (P1): {priority_count['P1']} test cases"
-        summary += f"\n- Important (P2): {priority_count['P2']} test cases"
-        summary += f"\n- Nice-to-have (P3): {priority_count['P3']} test cases"
-        
-        # Tag analysis
-        all_tags = set()
-        tag_count = {}
-        for component in test_cases['components']:
-            for sub in component['sub_components']:
-                for tag in sub['tags']:
-                    all_tags.add(tag)
-                    tag_count[tag] = tag_count.get(tag, 0) + len(sub['test_cases'])
-        
-        summary += f"\n\n🏷 Tag Coverage:"
-        for tag in sorted(all_tags):
-            summary += f"\n- {tag}: {tag_count[tag]} test cases"
-        
-        # Component breakdown
-        summary += f"\n\n📝 Component Breakdown:"
-        for component in test_cases['components']:
-            sub_case_count = sum(len(sub['test_cases']) for sub in component['sub_components'])
-            summary += f"\n\n🔹 {component['parent_component'].upper()}"
-            summary += f"\n  - Sub-components: {len(component['sub_components'])}"
-            summary += f"\n  - Total test cases: {sub_case_count}"
-            for sub in component['sub_components']:
-                summary += f"\n  - {sub['summary'][:50]}... ({len(sub['test_cases'])} tests, {sub['priority']})"
-        
-        return summary
+        with span("summary"):
+            return render_text(stats or SummaryStats.from_test_cases(test_cases))
+
 
+# Initialize the store that serves downloads of generated results
+result_store = ResultStore()
 
 # Initialize test case generator
-generator = TestCaseGenerator()
+generator = TestCaseGenerator(
+    cache=cache_from_env(),
+    fanout_workers=int(os.environ.get("FANOUT_WORKERS", 4)),
+    requests_per_minute=float(os.environ.get("GROQ_REQUESTS_PER_MINUTE", 30)),
+    prompt_token_budget=int(os.environ.get("PROMPT_TOKEN_BUDGET", 6000)),
+    dedup_threshold=float(os.environ.get("DEDUP_THRESHOLD", 0.8))
+)
 
 @app.route('/')
 def home():
@@ -252,19 +354,26 @@ def generate():
         if not ui_description or not srs_description:
             return jsonify({'error': 'Both UI and SRS descriptions are required'}), 400
         
-        # Generate test cases
+        # Generate test cases, optionally one request per top-level component
         logger.info("Generating test cases...")
-        test_cases = generator.generate_test_cases(ui_description, srs_description)
+        if data.get('mode') == 'fanout':
+            test_cases = generator.generate_test_cases_fanout(ui_description, srs_description)
+        else:
+            test_cases = generator.generate_test_cases(ui_description, srs_description)
+        test_cases = generator.deduplicate(test_cases)
         
         # Generate summary
-        detailed_summary = generator.generate_detailed_summary(test_cases)
+        stats = SummaryStats.from_test_cases(test_cases)
+        detailed_summary = generator.generate_detailed_summary(test_cases, stats)
         
-        # Store generated data in session for download
+        # Store generated data server-side for download
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         result = {
+            'result_id': result_store.save(test_cases, detailed_summary, timestamp, stats.to_dict()),
             'timestamp': timestamp,
             'test_cases': test_cases,
-            'summary': detailed_summary
+            'summary': detailed_summary,
+            'stats': stats.to_dict()
         }
         
         return jsonify(result)
@@ -273,52 +382,120 @@ def generate():
         logger.error(f"Error processing request: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
-@app.route('/download/json/<timestamp>')
-def download_json(timestamp):
+@app.route('/generate/stream', methods=['POST'])
+def generate_stream():
+    """Stream components as NDJSON lines, followed by a final "done" line"""
+    data = request.get_json()
+    ui_description = data.get('ui_description', '')
+    srs_description = data.get('srs_description', '')
+
+    if not ui_description or not srs_description:
+        return jsonify({'error': 'Both UI and SRS descriptions are required'}), 400
+
+    def events():
+        components = []
+        # Summary statistics are accumulated as components arrive
+        stats = SummaryStats()
+        try:
+            logger.info("Streaming test cases...")
+            for component in generator.stream_test_cases(ui_description, srs_description):
+                components.append(component)
+                stats.add_component(component)
+                yield json.dumps({'type': 'component', 'component': component}) + '\n'
+
+            test_cases = generator.deduplicate({'components': components})
+            if test_cases['components'] != components:
+                stats = SummaryStats.from_test_cases(test_cases)
+            detailed_summary = generator.generate_detailed_summary(test_cases, stats)
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            yield json.dumps({
+                'type': 'done',
+                'result_id': result_store.save(test_cases, detailed_summary, timestamp, stats.to_dict()),
+                'timestamp': timestamp,
+                'test_cases': test_cases,
+                'summary': detailed_summary,
+                'stats': stats.to_dict()
+            }) + '\n'
+        except Exception as e:
+            logger.error(f"Error streaming test cases: {str(e)}")
+            yield json.dumps({'type': 'error', 'error': str(e)}) + '\n'
+
+    return Response(stream_with_context(events()), mimetype='application/x-ndjson')
+
+def _artifact_response(result_id: str, kind: str, filename: str, mimetype: str):
+    """Stream a stored artifact, honouring If-None-Match and single byte ranges"""
+    meta = result_store.meta(result_id)
+    if meta is None:
+        return "Result not found", 404
+
+    # Stored results never change, so the id doubles as a strong ETag
+    etag = f"{result_id}-{kind}"
+    if etag in request.if_none_match:
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
+
+    length = meta['sizes'][kind]
+    start, stop = 0, length
+    status = 200
+    # Stored artifacts never change, so only a foreign If-Range ETag voids the range
+    # Multiple ranges are not served as multipart; ignoring the header yields the full body
+    if request.range and len(request.range.ranges) == 1 and request.if_range.etag in (None, etag):
+        byte_range = request.range.range_for_length(length)
+        if byte_range is None:
+            return Response(status=416, headers={'Content-Range': f'bytes */{length}'})
+        start, stop = byte_range
+        status = 206
+
+    def body():
+        with result_store.open(result_id, kind) as fp:
+            fp.seek(start)
+            remaining = stop - start
+            while remaining > 0:
+                chunk = fp.read(min(DOWNLOAD_CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+
+    response = Response(body(), status=status, mimetype=mimetype)
+    response.headers['Content-Length'] = str(stop - start)
+    response.headers['Accept-Ranges'] = 'bytes'
+    response.headers['Content-Disposition'] = f'attachment; filename={filename}'
+    if status == 206:
+        response.headers['Content-Range'] = f'bytes {start}-{stop - 1}/{length}'
+    response.set_etag(etag)
+    return response
+
+@app.route('/download/json/<result_id>')
+def download_json(result_id):
     try:
-        # Get data from session
-        test_cases = request.args.get('test_cases')
-        if not test_cases:
-            return "No test cases found", 404
-            
-        # Create an in-memory file
-        test_cases_json = json.loads(test_cases)
-        file_data = json.dumps(test_cases_json, indent=2)
-        file_stream = io.BytesIO(file_data.encode('utf-8'))
-        
-        filename = f'test_cases_{timestamp}.json'
-        
-        return send_file(
-            file_stream,
-            as_attachment=True,
-            download_name=filename,
-            mimetype='application/json'
-        )
-        
+        meta = result_store.meta(result_id)
+        timestamp = meta['timestamp'] if meta else result_id
+        return _artifact_response(result_id, 'json', f'test_cases_{timestamp}.json', 'application/json')
     except Exception as e:
         logger.error(f"Error downloading JSON: {str(e)}")
         return str(e), 500
 
-@app.route('/download/summary/<timestamp>')
-def download_summary(timestamp):
+@app.route('/download/summary/<result_id>')
+def download_summary(result_id):
     try:
-        # Get data from session
-        summary = request.args.get('summary')
-        if not summary:
-            return "No summary found", 404
-            
-        # Create an in-memory file
-        file_stream = io.BytesIO(summary.encode('utf-8'))
-        
-        filename = f'test_cases_summary_{timestamp}.txt'
-        
-        return send_file(
-            file_stream,
-            as_attachment=True,
-            download_name=filename,
-            mimetype='text/plain'
-        )
-        
+        meta = result_store.meta(result_id)
+        timestamp = meta['timestamp'] if meta else result_id
+        fmt = request.args.get('format', 'text')
+        if fmt == 'text':
+            return _artifact_response(result_id, 'summary', f'test_cases_summary_{timestamp}.txt', 'text/plain')
+        if fmt not in RENDERERS:
+            return f"Unknown summary format: {fmt}", 400
+
+        # Other formats are rendered from the stored statistics, never from the test cases
+        stored = result_store.load(result_id, 'stats')
+        if stored is None:
+            return "Result not found", 404
+        render, mimetype, extension = RENDERERS[fmt]
+        response = Response(render(SummaryStats.from_dict(json.loads(stored))), mimetype=mimetype)
+        response.headers['Content-Disposition'] = f'attachment; filename=test_cases_summary_{timestamp}.{extension}'
+        return response
     except Exception as e:
         logger.error(f"Error downloading summary: {str(e)}")
         return str(e), 500
@@ -425,7 +602,7 @@ if __name__ == "__main__":
             document.getElementById('results').style.display = 'none';
             
             try {
-                const response = await fetch('/generate', {
+                const response = await fetch('/generate/stream', {
                     method: 'POST',
                     headers: {
                         'Content-Type': 'application/json',
@@ -440,7 +617,44 @@ if __name__ == "__main__":
                     throw new Error(`HTTP error! status: ${response.status}`);
                 }
                 
-                const data = await response.json();
+                // Components arrive one NDJSON line at a time; render each as it lands
+                const components = [];
+                const reader = response.body.getReader();
+                const decoder = new TextDecoder();
+                let buffered = '';
+                let data = null;
+                
+                document.getElementById('summaryDisplay').textContent = 'Generating...';
+                document.getElementById('jsonDisplay').textContent = '';
+                
+                while (true) {
+                    const { value, done } = await reader.read();
+                    if (done) break;
+                    buffered += decoder.decode(value, { stream: true });
+                    
+                    const lines = buffered.split('\\n');
+                    buffered = lines.pop();
+                    for (const line of lines) {
+                        if (!line.trim()) continue;
+                        const event = JSON.parse(line);
+                        if (event.type === 'component') {
+                            components.push(event.component);
+                            // Hide loading, show results
+                            document.getElementById('loading').style.display = 'none';
+                            document.getElementById('results').style.display = 'block';
+                            document.getElementById('summaryDisplay').textContent = `Generating... ${components.length} component(s) received`;
+                            document.getElementById('jsonDisplay').textContent = JSON.stringify({ components: components }, null, 2);
+                        } else if (event.type === 'done') {
+                            data = event;
+                        } else if (event.type === 'error') {
+                            throw new Error(event.error);
+                        }
+                    }
+                }
+                
+                if (!data) {
+                    throw new Error('Stream ended before generation finished');
+                }
                 
                 // Hide loading, show results
                 document.getElementById('loading').style.display = 'none';
@@ -450,15 +664,15 @@ if __name__ == "__main__":
                 document.getElementById('summaryDisplay').textContent = data.summary;
                 document.getElementById('jsonDisplay').textContent = JSON.stringify(data.test_cases, null, 2);
                 
-                // Set up download buttons
-                const timestamp = data.timestamp;
+                // Set up download buttons; results are kept server-side under their id
+                const resultId = data.result_id;
                 
                 document.getElementById('downloadSummary').onclick = function() {
-                    window.location.href = `/download/summary/${timestamp}?summary=${encodeURIComponent(data.summary)}`;
+                    window.location.href = `/download/summary/${resultId}`;
                 };
                 
                 document.getElementById('downloadJson').onclick = function() {
-                    window.location.href = `/download/json/${timestamp}?test_cases=${encodeURIComponent(JSON.stringify(data.test_cases))}`;
+                    window.location.href = `/download/json/${resultId}`;
                 };
                 
             } catch (error) {
@@ -0,0 +1,106 @@
+"""Content-addressed storage of uploaded test scripts and reuse of their results.
+
+Scripts are written once to ``objects/<sha[:2]>/<sha><ext>`` with an atomic
+rename, so same-named uploads no longer overwrite each other. A finished run
+is recorded under a key made of the script digest, how it was run and a
+fingerprint of the target it tests, supplied by the client or computed on
+request. Re-submitting the same script against an unchanged target returns
+that record instead of starting node and a browser. Failures are kept only
+briefly, so a flaky or since-fixed environment is retried soon.
+"""
+import hashlib
+import json
+import os
+import re
+import time
+from typing import Any, Dict, Optional
+
+import requests
+
+from atomic_file import write_atomic
+
+UPLOAD_FOLDER = os.environ.get('UPLOAD_FOLDER', 'uploads')
+# Seconds a recorded result may be reused, bounding staleness the fingerprint cannot see
+RESULT_TTL = float(os.environ.get('UPLOAD_RESULT_TTL', 24 * 3600))
+# Failures may come from the environment rather than the script, so they are replayed only briefly
+FAILED_RESULT_TTL = float(os.environ.get('UPLOAD_FAILED_RESULT_TTL', 60))
+# Only outcomes of the script itself are worth replaying
+CACHEABLE_STATUSES = ('passed', 'failed')
+
+_TARGET_RE = re.compile(r"\.get\(\s*(['\"`])([^'\"`]+)\1")
+
+
+def target_fingerprint(script: bytes, timeout: float = 5) -> Optional[str]:
+    """Hash of every page the script opens with ``driver.get``, or None if one cannot be read.
+
+    Remote pages are fetched and hashed by status and body; local paths and
+    ``file://`` URLs by their content, relative to the working directory
+    the browser is started from. A script that opens nothing gets an
+    empty fingerprint.
+    """
+    digest = hashlib.sha256()
+    text = script.decode('utf-8', errors='replace')
+    for target in sorted(set(match.group(2) for match in _TARGET_RE.finditer(text))):
+        digest.update(target.encode('utf-8'))
+        try:
+            if target.startswith(('http://', 'https://')):
+                response = requests.get(target, timeout=timeout)
+                digest.update(str(response.status_code).encode())
+                digest.update(response.content)
+            else:
+                path = target[len('file://'):] if target.startswith('file://') else target
+                with open(path, 'rb') as fp:
+                    digest.update(fp.read())
+        except (requests.RequestException, OSError):
+            return None
+    return digest.hexdigest()
+
+
+class UploadStore:
+    def __init__(self, directory: str = UPLOAD_FOLDER, ttl: float = RESULT_TTL,
+                 failed_ttl: float = FAILED_RESULT_TTL):
+        self.directory = directory
+        self.ttl = ttl
+        self.failed_ttl = failed_ttl
+        os.makedirs(os.path.join(directory, 'objects'), exist_ok=True)
+        os.makedirs(os.path.join(directory, 'results'), exist_ok=True)
+
+    @staticmethod
+    def _extension(filename: str) -> str:
+        # Keep compound suffixes like ".test.js" so tooling still recognises the file
+        name = os.path.basename(filename).lstrip('.')
+        return re.sub(r'[^\w.]', '', name[name.index('.'):]) if '.' in name else ''
+
+    def put(self, data: bytes, filename: str) -> str:
+        """Store an upload under its digest and return its path; identical content is written once"""
+        digest = hashlib.sha256(data).hexdigest()
+        path = os.path.join(self.directory, 'objects', digest[:2], digest + self._extension(filename))
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            write_atomic(path, data)
+        return path
+
+    @staticmethod
+    def result_key(path: str, mode: str, fingerprint: str) -> str:
+        # The object file name already carries the script digest
+        identity = json.dumps([os.path.basename(path), mode, fingerprint])
+        return hashlib.sha256(identity.encode('utf-8')).hexdigest()
+
+    def _result_path(self, key: str) -> str:
+        return os.path.join(self.directory, 'results', f"{key}.json")
+
+    def get_result(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return a recorded run that is still fresh, or None"""
+        try:
+            with open(self._result_path(key), 'r', encoding='utf-8') as fp:
+                result = json.load(fp)
+        except (OSError, ValueError):
+            return None
+        ttl = self.ttl if result.get('status') == 'passed' else self.failed_ttl
+        if time.time() - result.get('finished', 0) > ttl:
+            return None
+        return result
+
+    def put_result(self, key: str, result: Dict[str, Any]):
+        if result.get('status') in CACHEABLE_STATUSES:
+            write_atomic(self._result_path(key), json.dumps(result).encode('utf-8'))
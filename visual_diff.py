@@ -0,0 +1,426 @@
+"""Pixel-level visual regression between Figma renders and browser screenshots.
+
+Components are paired with ``design_diff.align`` and each pair is mapped onto
+the screenshot by the page scale plus a per-component offset, refined by
+phase correlation. Every region (the whole frame and each component) is cut
+into tiles that a process pool compares with vectorized NumPy: CIE76 colour
+difference per pixel and a windowed SSIM. Images are shared with the workers
+as memory-mapped ``.npy`` files, so a worker only ever holds one tile.
+
+The output is a heatmap PNG per region and a JSON report with a score per
+component: SSIM scaled by the fraction of pixels within tolerance.
+
+Usage:
+    python visual_diff.py RENDER.png SCREENSHOT.png --figma website.json --elements elements.json
+    python visual_diff.py RENDER.png --url http://localhost:8000 --figma website.json
+"""
+import argparse
+import json
+import logging
+import os
+import re
+import shutil
+import struct
+import sys
+import tempfile
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple, Union
+
+import numpy as np
+
+from design_diff import align, dom_elements, figma_elements
+from figma_stream import find_frame
+
+logger = logging.getLogger(__name__)
+
+# Side of the square tiles compared by one worker task
+TILE_SIZE = int(os.getenv("VISUAL_DIFF_TILE_SIZE", "512"))
+# Worker processes; 0 uses every CPU
+WORKERS = int(os.getenv("VISUAL_DIFF_WORKERS", "0"))
+# CIE76 distance above which a pixel counts as changed; about 2.3 is just noticeable,
+# the extra headroom absorbs antialiasing differences between renderers
+DELTA_E_TOLERANCE = 5.0
+SSIM_WINDOW = 7
+# Largest per-component offset correction, in render pixels
+MAX_SHIFT = 8
+# Regions smaller than this on either side are too small to score
+MIN_REGION = 4
+
+_HALO = SSIM_WINDOW // 2
+_SSIM_C1 = (0.01 * 255) ** 2
+_SSIM_C2 = (0.03 * 255) ** 2
+_RGB_TO_XYZ = np.array([
+    [0.4124, 0.3576, 0.1805],
+    [0.2126, 0.7152, 0.0722],
+    [0.0193, 0.1192, 0.9505],
+], dtype=np.float32)
+_D65_WHITE = np.array([0.95047, 1.0, 1.08883], dtype=np.float32)
+
+Image = Union[str, np.ndarray]
+
+
+class Region(NamedTuple):
+    name: str
+    figma_id: Optional[str]
+    dom_index: Optional[int]
+    # x, y, width, height in render pixels
+    box: Tuple[int, int, int, int]
+    # screenshot = scale * render + offset, per axis: (sx, sy, tx, ty)
+    transform: Tuple[float, float, float, float]
+
+
+# --- image I/O ---
+
+def _store_image(image: Image, path: str) -> Tuple[int, int]:
+    """Write an RGB copy of ``image`` (a path or array) to a ``.npy`` file and return its height and width"""
+    if isinstance(image, np.ndarray):
+        rgb = np.repeat(image[..., None], 3, axis=2) if image.ndim == 2 else image[..., :3]
+        out = np.lib.format.open_memmap(path, mode="w+", dtype=np.uint8, shape=rgb.shape[:2] + (3,))
+        out[:] = rgb
+        out.flush()
+        return rgb.shape[:2]
+
+    # Pillow is only needed to decode image files
+    from PIL import Image as PILImage
+    PILImage.MAX_IMAGE_PIXELS = None
+    with PILImage.open(image) as source:
+        width, height = source.size
+        out = np.lib.format.open_memmap(path, mode="w+", dtype=np.uint8, shape=(height, width, 3))
+        band = max(1, (1 << 24) // (width * 4))
+        for top in range(0, height, band):
+            out[top:top + band] = np.asarray(source.crop((0, top, width, min(top + band, height))).convert("RGB"))
+        out.flush()
+    return height, width
+
+
+def write_png(path: str, image: np.ndarray, band: int = 256):
+    """Encode an RGB uint8 array (or memmap) as PNG, compressing it band by band"""
+    height, width = image.shape[:2]
+    compressor = zlib.compressobj(6)
+    chunks = []
+    for top in range(0, height, band):
+        rows = np.asarray(image[top:top + band], dtype=np.uint8).reshape(-1, width * 3)
+        # Filter type 0 (none) in front of every row
+        filtered = np.hstack([np.zeros((len(rows), 1), dtype=np.uint8), rows])
+        chunks.append(compressor.compress(filtered.tobytes()))
+    chunks.append(compressor.flush())
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+
+    with open(path, "wb") as fp:
+        fp.write(b"\x89PNG\r\n\x1a\n")
+        fp.write(chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)))
+        fp.write(chunk(b"IDAT", b"".join(chunks)))
+        fp.write(chunk(b"IEND", b""))
+
+
+# --- per-pixel measures ---
+
+def _to_lab(rgb: np.ndarray) -> np.ndarray:
+    linear = rgb / 255.0
+    linear = np.where(linear <= 0.04045, linear / 12.92, ((linear + 0.055) / 1.055) ** 2.4)
+    xyz = (linear @ _RGB_TO_XYZ.T) / _D65_WHITE
+    f = np.where(xyz > (6 / 29) ** 3, np.cbrt(xyz), xyz / (3 * (6 / 29) ** 2) + 4 / 29)
+    return np.stack([116 * f[..., 1] - 16, 500 * (f[..., 0] - f[..., 1]), 200 * (f[..., 1] - f[..., 2])], axis=-1)
+
+
+def delta_e(expected: np.ndarray, actual: np.ndarray) -> np.ndarray:
+    """CIE76 colour difference of two float RGB images"""
+    return np.linalg.norm(_to_lab(expected) - _to_lab(actual), axis=-1)
+
+
+def _box_mean(values: np.ndarray, size: int) -> np.ndarray:
+    """Mean over a size x size window around every pixel, via an integral image"""
+    pad = size // 2
+    padded = np.pad(values.astype(np.float64), pad, mode="edge")
+    integral = np.pad(padded.cumsum(0).cumsum(1), ((1, 0), (1, 0)))
+    sums = integral[size:, size:] - integral[:-size, size:] - integral[size:, :-size] + integral[:-size, :-size]
+    return sums / (size * size)
+
+
+def ssim_map(expected: np.ndarray, actual: np.ndarray, size: int = SSIM_WINDOW) -> np.ndarray:
+    """Per-pixel structural similarity of two grayscale images"""
+    mu_x, mu_y = _box_mean(expected, size), _box_mean(actual, size)
+    var_x = _box_mean(expected * expected, size) - mu_x * mu_x
+    var_y = _box_mean(actual * actual, size) - mu_y * mu_y
+    cov = _box_mean(expected * actual, size) - mu_x * mu_y
+    return ((2 * mu_x * mu_y + _SSIM_C1) * (2 * cov + _SSIM_C2)) / \
+        ((mu_x * mu_x + mu_y * mu_y + _SSIM_C1) * (var_x + var_y + _SSIM_C2))
+
+
+def _gray(rgb: np.ndarray) -> np.ndarray:
+    return rgb @ np.array([0.299, 0.587, 0.114], dtype=np.float32)
+
+
+def _heat(expected: np.ndarray, distance: np.ndarray, tolerance: float) -> np.ndarray:
+    """Dimmed grayscale of the design with changed pixels coloured from red (small) to yellow (large)"""
+    base = np.repeat(_gray(expected)[..., None] * 0.35, 3, axis=2)
+    strength = np.clip(distance / (4 * tolerance), 0, 1)
+    color = np.stack([np.minimum(1, 2 * strength), np.maximum(0, 2 * strength - 1), np.zeros_like(strength)],
+                     axis=-1) * 255
+    changed = (distance > tolerance)[..., None]
+    return np.where(changed, base + 0.65 * color, base).clip(0, 255).astype(np.uint8)
+
+
+def _sample(image: np.ndarray, transform: Tuple[float, float, float, float], x: int, y: int,
+            width: int, height: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Bilinearly sample ``image`` on a render-pixel grid; returns the samples and an in-bounds mask"""
+    sx, sy, tx, ty = transform
+    image_height, image_width = image.shape[:2]
+    # Map pixel centres through the transform
+    xs = sx * (np.arange(x, x + width) + 0.5) + tx - 0.5
+    ys = sy * (np.arange(y, y + height) + 0.5) + ty - 0.5
+    valid = ((ys >= -0.5) & (ys <= image_height - 0.5))[:, None] & ((xs >= -0.5) & (xs <= image_width - 0.5))[None, :]
+    xs = xs.clip(0, image_width - 1)
+    ys = ys.clip(0, image_height - 1)
+
+    x0, y0 = np.floor(xs).astype(int), np.floor(ys).astype(int)
+    x1, y1 = np.minimum(x0 + 1, image_width - 1), np.minimum(y0 + 1, image_height - 1)
+    wx, wy = (xs - x0).astype(np.float32), (ys - y0).astype(np.float32)
+
+    # Only the covering window is read from the memmap
+    left, top = x0.min(), y0.min()
+    window = np.asarray(image[top:y1.max() + 1, left:x1.max() + 1], dtype=np.float32)
+    x0, x1, y0, y1 = x0 - left, x1 - left, y0 - top, y1 - top
+    rows = window[y0] * (1 - wy)[:, None, None] + window[y1] * wy[:, None, None]
+    return rows[:, x0] * (1 - wx)[None, :, None] + rows[:, x1] * wx[None, :, None], valid
+
+
+# --- alignment ---
+
+def refine_offset(render: np.ndarray, screenshot: np.ndarray, region: Region, size: int = 256,
+                  max_shift: int = MAX_SHIFT) -> Region:
+    """Correct a region's offset by phase correlation over its central crop.
+
+    The correction is kept only if it lowers the mean absolute difference,
+    which guards against flat regions where the correlation peak is noise.
+    """
+    x, y, width, height = region.box
+    if width < 2 * max_shift or height < 2 * max_shift:
+        return region
+    crop_w, crop_h = min(width, size), min(height, size)
+    cx, cy = x + (width - crop_w) // 2, y + (height - crop_h) // 2
+
+    expected = _gray(np.asarray(render[cy:cy + crop_h, cx:cx + crop_w], dtype=np.float32))
+    actual = _gray(_sample(screenshot, region.transform, cx, cy, crop_w, crop_h)[0])
+    window = np.outer(np.hanning(crop_h), np.hanning(crop_w))
+    spectrum = np.fft.rfft2((expected - expected.mean()) * window) * \
+        np.conj(np.fft.rfft2((actual - actual.mean()) * window))
+    correlation = np.fft.irfft2(spectrum / (np.abs(spectrum) + 1e-9), s=(crop_h, crop_w))
+    peak_y, peak_x = np.unravel_index(np.argmax(correlation), correlation.shape)
+    # The peak sits at minus the displacement of the screenshot, modulo the crop size
+    dy = -int(peak_y if peak_y <= crop_h // 2 else peak_y - crop_h)
+    dx = -int(peak_x if peak_x <= crop_w // 2 else peak_x - crop_w)
+    if (dx == 0 and dy == 0) or abs(dx) > max_shift or abs(dy) > max_shift:
+        return region
+
+    sx, sy, tx, ty = region.transform
+    shifted = (sx, sy, tx + sx * dx, ty + sy * dy)
+    before = np.abs(expected - actual).mean()
+    after = np.abs(expected - _gray(_sample(screenshot, shifted, cx, cy, crop_w, crop_h)[0])).mean()
+    return region._replace(transform=shifted) if after < before else region
+
+
+def build_regions(frame: Dict[str, Any], extracted: List[Dict[str, Any]], render_size: Tuple[int, int],
+                  pixel_ratio: float = 1.0, render_scale: Optional[float] = None) -> List[Region]:
+    """The whole frame plus one region per Figma component aligned with a DOM element.
+
+    ``render_scale`` is render pixels per design pixel (by default the render
+    width over the frame width); ``pixel_ratio`` is screenshot pixels per CSS
+    pixel. The design-to-CSS scale is the page width over the frame width, as
+    in ``design_diff.diff_design``.
+    """
+    render_height, render_width = render_size
+    frame_width = (frame.get("absoluteBoundingBox") or {}).get("width") or render_width
+    render_scale = render_scale or render_width / frame_width
+
+    figma = figma_elements(frame)
+    dom = dom_elements(extracted)
+    page_width = max((element["box"][0] + element["box"][2] for element in dom), default=0)
+    css_scale = page_width / frame_width if page_width else 1.0
+    # Screenshot pixels per render pixel
+    scale = css_scale * pixel_ratio / render_scale
+
+    regions = [Region("page", None, None, (0, 0, render_width, render_height), (scale, scale, 0.0, 0.0))]
+    for i, j, _ in align(figma, dom, scale=css_scale):
+        fx, fy, fw, fh = (value * render_scale for value in figma[i]["box"])
+        x0, y0 = max(int(round(fx)), 0), max(int(round(fy)), 0)
+        x1, y1 = min(int(round(fx + fw)), render_width), min(int(round(fy + fh)), render_height)
+        if x1 - x0 < MIN_REGION or y1 - y0 < MIN_REGION:
+            continue
+        dx, dy = dom[j]["box"][0] * pixel_ratio, dom[j]["box"][1] * pixel_ratio
+        # Same scale as the page, placed where the browser put the element
+        regions.append(Region(figma[i]["name"], figma[i]["id"], dom[j]["index"], (x0, y0, x1 - x0, y1 - y0),
+                              (scale, scale, dx - scale * fx, dy - scale * fy)))
+    return regions
+
+
+# --- tiled comparison ---
+
+def _compare_tile(task) -> Tuple[int, List[float]]:
+    index, render_path, screenshot_path, heat_path, region, tile, tolerance = task
+    render = np.load(render_path, mmap_mode="r")
+    screenshot = np.load(screenshot_path, mmap_mode="r")
+    x, y, width, height = region.box
+    tx0, ty0, tx1, ty1 = tile
+
+    # Read a halo around the tile so SSIM windows at its edges see real neighbours
+    hx0, hy0 = max(tx0 - _HALO, 0), max(ty0 - _HALO, 0)
+    hx1, hy1 = min(tx1 + _HALO, width), min(ty1 + _HALO, height)
+    expected = np.asarray(render[y + hy0:y + hy1, x + hx0:x + hx1], dtype=np.float32)
+    actual, valid = _sample(screenshot, region.transform, x + hx0, y + hy0, hx1 - hx0, hy1 - hy0)
+
+    distance = np.where(valid, delta_e(expected, actual), 100.0)
+    similarity = np.where(valid, ssim_map(_gray(expected), _gray(actual)), 0.0)
+    inner = (slice(ty0 - hy0, ty1 - hy0), slice(tx0 - hx0, tx1 - hx0))
+    distance, similarity = distance[inner], similarity[inner]
+
+    heat = np.load(heat_path, mmap_mode="r+")
+    heat[ty0:ty1, tx0:tx1] = _heat(expected[inner], distance, tolerance)
+    heat.flush()
+    return index, [distance.size, float((distance > tolerance).sum()), float(distance.sum()),
+                   float(distance.max()), float(similarity.sum())]
+
+
+def _tiles(width: int, height: int, size: int) -> List[Tuple[int, int, int, int]]:
+    return [(x, y, min(x + size, width), min(y + size, height))
+            for y in range(0, height, size) for x in range(0, width, size)]
+
+
+def _slug(name: str, max_length: int = 40) -> str:
+    # Text layers are named after their content, which can exceed the file system's name limit
+    return re.sub(r"[^a-z0-9]+", "-", name.lower())[:max_length].strip("-") or "component"
+
+
+def compare_images(render: Image, screenshot: Image, frame: Dict[str, Any], extracted: List[Dict[str, Any]],
+                   out_dir: str, pixel_ratio: float = 1.0, render_scale: Optional[float] = None,
+                   tolerance: float = DELTA_E_TOLERANCE, tile_size: int = TILE_SIZE,
+                   workers: int = WORKERS) -> Dict[str, Any]:
+    """Compare a Figma frame render with a page screenshot and write heatmaps to ``out_dir``.
+
+    ``render`` and ``screenshot`` are image paths or RGB arrays; ``frame`` is
+    the Figma frame node and ``extracted`` the ``webextractor`` elements of
+    the page. Returns the report also saved as ``out_dir/report.json``.
+    """
+    os.makedirs(os.path.join(out_dir, "components"), exist_ok=True)
+    scratch = tempfile.mkdtemp(dir=out_dir, prefix=".tiles-")
+    try:
+        render_path = os.path.join(scratch, "render.npy")
+        screenshot_path = os.path.join(scratch, "screenshot.npy")
+        render_size = _store_image(render, render_path)
+        _store_image(screenshot, screenshot_path)
+
+        render_map = np.load(render_path, mmap_mode="r")
+        screenshot_map = np.load(screenshot_path, mmap_mode="r")
+        regions = build_regions(frame, extracted, render_size, pixel_ratio, render_scale)
+        # The page keeps the plain scale; only components are nudged onto their content
+        regions[1:] = [refine_offset(render_map, screenshot_map, region) for region in regions[1:]]
+
+        tasks, heat_paths = [], []
+        for index, region in enumerate(regions):
+            heat_path = os.path.join(scratch, f"heat-{index}.npy")
+            np.lib.format.open_memmap(heat_path, mode="w+", dtype=np.uint8,
+                                      shape=(region.box[3], region.box[2], 3)).flush()
+            heat_paths.append(heat_path)
+            tasks.extend((index, render_path, screenshot_path, heat_path, region, tile, tolerance)
+                         for tile in _tiles(region.box[2], region.box[3], tile_size))
+
+        totals = np.zeros((len(regions), 5))
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1) as executor:
+            for index, stats in executor.map(_compare_tile, tasks, chunksize=max(1, len(tasks) // 64)):
+                pixels, changed, distance_sum, distance_max, similarity_sum = stats
+                totals[index, [0, 1, 2, 4]] += (pixels, changed, distance_sum, similarity_sum)
+                totals[index, 3] = max(totals[index, 3], distance_max)
+
+        results = []
+        for index, region in enumerate(regions):
+            pixels, changed, distance_sum, distance_max, similarity_sum = totals[index]
+            ssim = float(np.clip(similarity_sum / pixels, 0, 1))
+            changed_fraction = float(changed / pixels)
+            if index == 0:
+                heatmap = os.path.join(out_dir, "heatmap.png")
+            else:
+                heatmap = os.path.join(out_dir, "components", f"{_slug(region.name)}-{_slug(region.figma_id)}.png")
+            try:
+                write_png(heatmap, np.load(heat_paths[index], mmap_mode="r"))
+            except OSError as e:
+                # One unwritable heatmap should not cost the rest of the report
+                logger.warning(f"Could not write heatmap for {region.name!r}: {e}")
+                heatmap = None
+            results.append({
+                "name": region.name,
+                "figma_id": region.figma_id,
+                "dom_index": region.dom_index,
+                "box": list(region.box),
+                "offset": [round(float(region.transform[2]), 1), round(float(region.transform[3]), 1)],
+                "score": round(ssim * (1 - changed_fraction), 4),
+                "ssim": round(ssim, 4),
+                "changed_fraction": round(changed_fraction, 4),
+                "mean_delta_e": round(float(distance_sum / pixels), 2),
+                "max_delta_e": round(float(distance_max), 2),
+                "heatmap": heatmap
+            })
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    report = {"page": results[0], "components": sorted(results[1:], key=lambda result: result["score"])}
+    with open(os.path.join(out_dir, "report.json"), "w", encoding="utf-8") as fp:
+        json.dump(report, fp, indent=2)
+    return report
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description="Pixel-diff a Figma frame render against a browser screenshot.")
+    parser.add_argument("render", help="PNG of the frame, e.g. from figma_images.py")
+    parser.add_argument("screenshot", nargs="?", help="Full-page screenshot; omit when using --url")
+    parser.add_argument("--figma", default="website.json", help="Figma file dump containing the frame")
+    parser.add_argument("--frame", help="Frame name (default: the first frame)")
+    parser.add_argument("--elements", help="JSON list of elements from webextractor.extract_elements")
+    parser.add_argument("--url", help="Capture the screenshot and elements from this page instead")
+    parser.add_argument("--selector", default="body *")
+    parser.add_argument("--pixel-ratio", type=float, default=1.0, help="Screenshot pixels per CSS pixel")
+    parser.add_argument("--render-scale", type=float, help="Render pixels per design pixel (default: inferred)")
+    parser.add_argument("--tolerance", type=float, default=DELTA_E_TOLERANCE)
+    parser.add_argument("--threshold", type=float, default=0.9, help="Lowest passing component score")
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--out", default="visual_diff")
+    args = parser.parse_args(argv)
+
+    with open(args.figma, "r", encoding="utf-8") as fp:
+        figma = json.load(fp)
+    try:
+        frame = find_frame(figma, args.frame)
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.url:
+        from webextractor import capture_page
+        png, extracted, args.pixel_ratio = capture_page(args.url, args.selector)
+        os.makedirs(args.out, exist_ok=True)
+        screenshot = os.path.join(args.out, "screenshot.png")
+        with open(screenshot, "wb") as fp:
+            fp.write(png)
+    elif args.screenshot and args.elements:
+        screenshot = args.screenshot
+        with open(args.elements, "r", encoding="utf-8") as fp:
+            extracted = json.load(fp)
+    else:
+        parser.error("pass SCREENSHOT with --elements, or --url")
+
+    report = compare_images(args.render, screenshot, frame, extracted, args.out, pixel_ratio=args.pixel_ratio,
+                            render_scale=args.render_scale, tolerance=args.tolerance, workers=args.workers)
+    page = report["page"]
+    print(f"Page: score {page['score']:.3f}, {page['changed_fraction']:.1%} of pixels changed")
+    failing = [result for result in report["components"] if result["score"] < args.threshold]
+    for result in failing:
+        print(f"  {result['name']} ({result['figma_id']}): score {result['score']:.3f}, "
+              f"mean dE {result['mean_delta_e']}, heatmap {result['heatmap']}")
+    print(f"{len(report['components']) - len(failing)}/{len(report['components'])} components "
+          f"at or above {args.threshold}")
+    return 1 if failing else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
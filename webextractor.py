@@ -1,12 +1,225 @@
+import argparse
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
 from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
+
+# Computed style properties collected for every matched element
+DEFAULT_PROPERTIES = [
+    "background-color", "color", "font-family", "font-size", "font-weight",
+    "line-height", "padding", "padding-top", "padding-left", "margin", "border-radius", "width", "height"
+]
+
+# Collects text, computed styles and bounding boxes for all matches in one round-trip
+EXTRACT_SCRIPT = """
+const [selector, properties] = arguments;
+return Array.from(document.querySelectorAll(selector)).map((el) => {
+    const style = window.getComputedStyle(el);
+    const rect = el.getBoundingClientRect();
+    const styles = {};
+    for (const prop of properties) {
+        styles[prop] = style.getPropertyValue(prop);
+    }
+    return {
+        tag: el.tagName.toLowerCase(),
+        id: el.id || null,
+        classes: Array.from(el.classList),
+        text: el.innerText,
+        styles: styles,
+        rect: {x: rect.x + window.scrollX, y: rect.y + window.scrollY, width: rect.width, height: rect.height}
+    };
+});
+"""
+
+
+def create_driver(headless=True):
+    """Launch a Chrome session, headless by default."""
+    options = webdriver.ChromeOptions()
+    if headless:
+        options.add_argument("--headless=new")
+    options.add_argument("--disable-gpu")
+    options.add_argument("--no-sandbox")
+    return webdriver.Chrome(options=options)
+
+
+class BrowserPool:
+    """Pool of pre-launched browser sessions reused across extraction runs."""
+
+    def __init__(self, size=2, headless=True):
+        self.size = size
+        self.headless = headless
+        self._idle = queue.Queue()
+        self._drivers = []
+        self._lock = threading.Lock()
+        for _ in range(size):
+            driver = create_driver(headless)
+            self._drivers.append(driver)
+            self._idle.put(driver)
+
+    @contextmanager
+    def acquire(self, timeout=None):
+        """Borrow a warm session; it is returned to the pool afterwards, or dropped if it failed."""
+        driver = self._idle.get(timeout=timeout)
+        try:
+            if driver is None:
+                # A failed session was dropped earlier; launch its replacement now
+                driver = create_driver(self.headless)
+                with self._lock:
+                    self._drivers.append(driver)
+            yield driver
+        except WebDriverException:
+            # The session may be dead or left in an unknown state; never hand it out again
+            self._discard(driver)
+            driver = None
+            raise
+        finally:
+            # An empty slot keeps the pool size, even when relaunching failed
+            self._idle.put(driver)
+
+    def _discard(self, driver):
+        if driver is None:
+            return
+        with self._lock:
+            if driver in self._drivers:
+                self._drivers.remove(driver)
+        try:
+            driver.quit()
+        except WebDriverException:
+            pass
+
+    def close(self):
+        with self._lock:
+            drivers, self._drivers = self._drivers, []
+        for driver in drivers:
+            driver.quit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def extract_elements(driver, selector="button", properties=None):
+    """Extract every matching element with a single injected script."""
+    return driver.execute_script(EXTRACT_SCRIPT, selector, properties or DEFAULT_PROPERTIES)
+
+
+def extract_elements_per_property(driver, selector="button", properties=None):
+    """Reference extractor issuing one WebDriver call per element and property."""
+    results = []
+    for element in driver.find_elements("css selector", selector):
+        rect = element.rect
+        results.append({
+            "tag": element.tag_name,
+            "text": element.text,
+            "styles": {prop: element.value_of_css_property(prop) for prop in properties or DEFAULT_PROPERTIES},
+            "rect": rect
+        })
+    return results
+
+
+def extract_page(url, selector="button", properties=None, pool=None):
+    """Load a page and extract matching elements, using a pooled session if given."""
+    if pool is None:
+        driver = create_driver()
+        try:
+            driver.get(url)
+            return extract_elements(driver, selector, properties)
+        finally:
+            driver.quit()
+
+    with pool.acquire() as driver:
+        driver.get(url)
+        return extract_elements(driver, selector, properties)
+
+
+def capture_page(url, selector="body *", properties=None, pool=None):
+    """Load a page and return a full-page PNG screenshot, its elements and the device pixel ratio."""
+    def capture(driver):
+        window = driver.get_window_size()
+        try:
+            driver.get(url)
+            # Grow the window to the document so the screenshot covers the whole page
+            width, height = driver.execute_script(
+                "return [document.documentElement.scrollWidth, document.documentElement.scrollHeight];"
+            )
+            driver.set_window_size(max(width, 1), max(height, 1))
+            elements = extract_elements(driver, selector, properties)
+            ratio = driver.execute_script("return window.devicePixelRatio;")
+            return driver.get_screenshot_as_png(), elements, ratio
+        finally:
+            # Pooled sessions go back at their original size for the next borrower
+            driver.set_window_size(window["width"], window["height"])
+
+    if pool is None:
+        driver = create_driver()
+        try:
+            return capture(driver)
+        finally:
+            driver.quit()
+
+    with pool.acquire() as driver:
+        return capture(driver)
+
+
+def benchmark(url, selector="button", repeat=5):
+    """Time cold vs warm sessions and per-property vs batched extraction."""
+    timings = {}
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        driver = create_driver()
+        driver.get(url)
+        extract_elements_per_property(driver, selector)
+        driver.quit()
+    timings["cold session, per-property calls"] = (time.perf_counter() - start) / repeat
+
+    with BrowserPool(size=1) as pool:
+        with pool.acquire() as driver:
+            driver.get(url)
+            start = time.perf_counter()
+            for _ in range(repeat):
+                extract_elements_per_property(driver, selector)
+            timings["warm session, per-property calls"] = (time.perf_counter() - start) / repeat
+
+            start = time.perf_counter()
+            for _ in range(repeat):
+                extract_elements(driver, selector)
+            timings["warm session, batched script"] = (time.perf_counter() - start) / repeat
+
+        start = time.perf_counter()
+        for _ in range(repeat):
+            extract_page(url, selector, pool=pool)
+        timings["warm session, page load + batched script"] = (time.perf_counter() - start) / repeat
+
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract element text and styles from a web page.")
+    parser.add_argument("url", nargs="?", default="https://yourwebsite.com")
+    parser.add_argument("--selector", default="button")
+    parser.add_argument("--benchmark", action="store_true",
+                        help="Compare extraction strategies (defaults to the local index.html fixture)")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
 
-driver = webdriver.Chrome()
-driver.get("https://yourwebsite.com")
+    if args.benchmark:
+        url = args.url if args.url != parser.get_default("url") else \
+            "file://" + os.path.abspath("index.html")
+        for name, seconds in benchmark(url, args.selector, args.repeat).items():
+            print(f"{name}: {seconds * 1000:.1f} ms")
+        return
 
-buttons = driver.find_elements("tag name", "button")
+    for element in extract_page(args.url, args.selector):
+        print("Button Text:", element["text"])
+        print("Button Color:", element["styles"]["background-color"])
 
-for button in buttons:
-    print("Button Text:", button.text)
-    print("Button Color:", button.value_of_css_property("background-color"))
 
-driver.quit()
+if __name__ == "__main__":
+    main()